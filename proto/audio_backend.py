@@ -0,0 +1,414 @@
+"""
+Audio outputs for the two engines, so playback logic can run without a
+sound card.
+
+MusicPlayer drives a "music backend" with the pygame.mixer.music API
+(load/play(start)/pause/unpause/stop/unload/set_volume/get_busy/get_pos):
+  - PygameBackend: pygame.mixer.music itself
+  - NullBackend: plays nothing; play/pause/seek move a clock and a track
+    ends when the clock passes its length
+
+PCMPlayer writes int16 blocks to a "sink" (ready/write/frames_played/
+pause/resume/flush/close):
+  - MixerSink: a reserved pygame mixer channel
+  - NullSink: discards blocks, consuming them at `rate` frames per clock
+    second (or instantly with realtime=False)
+  - WavSink: a NullSink that also writes what was consumed to a WAV file
+
+The clock is any zero-argument callable returning seconds; ManualClock
+lets tests step time by hand instead of sleeping.
+"""
+import os
+import time
+import wave
+import threading
+from collections import deque
+import numpy as np
+import pygame
+from mutagen import File
+
+NULL_FORMATS = ('mp3', 'ogg', 'wav', 'flac', 'opus')  # What SDL_mixer usually opens itself
+SINK_BUFFER_FRAMES = 4096  # Frames a null sink accepts ahead of the clock (~2 PCM blocks)
+
+
+class BackendError(Exception):
+    pass
+
+
+class ManualClock:
+    """A clock that only moves when advance() is called."""
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class PygameBackend:
+    error = pygame.error
+
+    def __init__(self):
+        pygame.mixer.init()
+        self.music = pygame.mixer.music
+
+    def load(self, source, namehint=None):
+        if namehint:
+            self.music.load(source, namehint)
+        else:
+            self.music.load(source)
+
+    def play(self, start=0.0):
+        self.music.play(start=start)
+
+    def pause(self):
+        self.music.pause()
+
+    def unpause(self):
+        self.music.unpause()
+
+    def stop(self):
+        self.music.stop()
+
+    def unload(self):
+        self.music.unload()
+
+    def set_volume(self, volume):
+        self.music.set_volume(volume)
+
+    def get_busy(self):
+        return self.music.get_busy()
+
+    def get_pos(self):
+        return self.music.get_pos()
+
+
+class NullBackend:
+    """
+    Stand-in for pygame.mixer.music that outputs nothing. The track length
+    comes from mutagen; formats outside `formats` fail to load the way
+    they do in SDL_mixer, so MusicPlayer still takes its conversion path.
+    """
+    error = BackendError
+
+    def __init__(self, clock=time.monotonic, formats=NULL_FORMATS):
+        self.clock = clock
+        self.formats = formats
+        self.volume = 1.0
+        self.length = 0.0
+        self.loaded = False
+        self._offset = 0.0  # play(start=...)
+        self._started = None  # Clock time of play(), moved forward by pauses
+        self._paused_at = None
+
+    def load(self, source, namehint=None):
+        name = source if isinstance(source, str) else getattr(source, 'name', '')
+        ext = (namehint or os.path.splitext(str(name))[1][1:]).lower()
+        if ext not in self.formats:
+            raise BackendError(f"Unsupported format: {ext or name}")
+        try:
+            audio = File(source)
+        except Exception as e:
+            raise BackendError(str(e))
+        finally:
+            if hasattr(source, 'seek'):
+                source.seek(0)
+        if audio is None or audio.info is None:
+            raise BackendError(f"Unrecognized audio: {name}")
+        self.stop()
+        self.length = audio.info.length
+        self.loaded = True
+
+    def _elapsed(self):
+        end = self._paused_at if self._paused_at is not None else self.clock()
+        return end - self._started
+
+    def play(self, start=0.0):
+        if not self.loaded:
+            raise BackendError("music not loaded")
+        self._offset = start
+        self._started = self.clock()
+        self._paused_at = None
+
+    def pause(self):
+        if self.get_busy():
+            self._paused_at = self.clock()
+
+    def unpause(self):
+        if self._paused_at is not None:
+            self._started += self.clock() - self._paused_at
+            self._paused_at = None
+
+    def stop(self):
+        self._started = None
+        self._paused_at = None
+
+    def unload(self):
+        self.stop()
+        self.loaded = False
+        self.length = 0.0
+
+    def set_volume(self, volume):
+        self.volume = volume
+
+    def get_busy(self):
+        # Like pygame 2, a paused track is not busy
+        return self._started is not None and self._paused_at is None and \
+            self._offset + self._elapsed() < self.length
+
+    def get_pos(self):
+        """Milliseconds since play(), or -1 once stopped or finished."""
+        if self._started is None:
+            return -1
+        elapsed = self._elapsed()
+        if self._offset + elapsed >= self.length:
+            return -1
+        return int(elapsed * 1000)
+
+
+def make_backend(output="device"):
+    """Music backend for MusicPlayer: 'device' or 'null'."""
+    if output == "null":
+        return NullBackend()
+    if output != "device":
+        raise ValueError(f"The pygame engine can't write to {output}; use --engine pcm")
+    return PygameBackend()
+
+
+class MixerSink:
+    """
+    Feeds int16 blocks to one reserved pygame mixer channel using its
+    one-slot queue, and counts frames the device has actually consumed.
+    """
+
+    def __init__(self):
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+        self.rate, size, self.channels = pygame.mixer.get_init()
+        pygame.mixer.set_reserved(1)
+        self._channel = pygame.mixer.Channel(0)
+        self._pending = deque()  # [sound, frames] in play order; head is playing
+        self._played = 0  # Frames of finished blocks since the last flush
+        self._started = None  # Monotonic time the head block started
+        self._paused_at = None
+        self._lock = threading.Lock()
+
+    def _update(self):
+        now = time.monotonic()
+        if not self._pending:
+            return
+        if not self._channel.get_busy() and self._paused_at is None:
+            # Everything we queued has finished
+            for _, frames in self._pending:
+                self._played += frames
+            self._pending.clear()
+            self._started = None
+            return
+        current = self._channel.get_sound()
+        while self._pending and self._pending[0][0] is not current:
+            self._played += self._pending.popleft()[1]
+            self._started = now
+
+    def ready(self):
+        with self._lock:
+            self._update()
+            return len(self._pending) < 2 and self._paused_at is None
+
+    def write(self, block):
+        with self._lock:
+            self._update()
+            sound = pygame.mixer.Sound(buffer=np.ascontiguousarray(block).tobytes())
+            if not self._pending:
+                self._channel.play(sound)
+                self._started = time.monotonic()
+            else:
+                self._channel.queue(sound)
+            self._pending.append((sound, len(block)))
+
+    def frames_played(self):
+        with self._lock:
+            self._update()
+            played = self._played
+            if self._pending and self._started is not None:
+                end = self._paused_at if self._paused_at is not None else time.monotonic()
+                played += min(self._pending[0][1], int((end - self._started) * self.rate))
+            return played
+
+    def frames_queued(self):
+        with self._lock:
+            self._update()
+            return sum(frames for _, frames in self._pending)
+
+    def pause(self):
+        with self._lock:
+            if self._paused_at is None:
+                self._channel.pause()
+                self._paused_at = time.monotonic()
+
+    def resume(self):
+        with self._lock:
+            if self._paused_at is not None:
+                self._channel.unpause()
+                if self._started is not None:
+                    self._started += time.monotonic() - self._paused_at
+                self._paused_at = None
+
+    def flush(self):
+        """Drop queued audio and restart the played-frames count at zero."""
+        with self._lock:
+            self._channel.stop()
+            self._pending.clear()
+            self._played = 0
+            self._started = None
+            if self._paused_at is not None:
+                self._channel.unpause()
+                self._paused_at = None
+
+    def close(self):
+        self.flush()
+
+
+class NullSink:
+    """
+    PCMPlayer sink without a device. Written frames are consumed at `rate`
+    frames per clock second while not paused, as a sound card would (an
+    empty buffer consumes nothing, like an underrun); with realtime=False
+    they count as played the moment they are written.
+    """
+
+    def __init__(self, rate=44100, channels=2, clock=time.monotonic, realtime=True,
+                 buffer_frames=SINK_BUFFER_FRAMES):
+        self.rate = rate
+        self.channels = channels
+        self.clock = clock
+        self.realtime = realtime
+        self.buffer_frames = buffer_frames
+        self.underruns = 0  # Times the clock found nothing left to consume
+        self._written = 0
+        self._played = 0.0
+        self._mark = clock()  # Clock time _played was last brought up to date
+        self._paused = False
+        self._lock = threading.Lock()
+
+    def _update(self):
+        # Called with the lock held
+        now = self.clock()
+        if not self._paused and self.realtime:
+            available = self._written - self._played
+            due = (now - self._mark) * self.rate
+            if due > available and available > 0:
+                self.underruns += 1
+            consumed = min(available, due)
+            if consumed > 0:
+                before = int(self._played)
+                self._played += consumed
+                self._consumed(before, int(self._played))
+        self._mark = now
+
+    def _consumed(self, start, end):
+        """Frames [start, end) since the last flush have just been played."""
+
+    def ready(self):
+        with self._lock:
+            self._update()
+            return not self._paused and self._written - self._played < self.buffer_frames
+
+    def write(self, block):
+        with self._lock:
+            self._update()
+            self._written += len(block)
+            if not self.realtime:
+                before = int(self._played)
+                self._played = float(self._written)
+                self._consumed(before, self._written)
+
+    def frames_played(self):
+        with self._lock:
+            self._update()
+            return int(self._played)
+
+    def frames_queued(self):
+        with self._lock:
+            self._update()
+            return self._written - int(self._played)
+
+    def pause(self):
+        with self._lock:
+            self._update()
+            self._paused = True
+
+    def resume(self):
+        with self._lock:
+            self._update()
+            self._paused = False
+
+    def flush(self):
+        """Drop queued audio and restart the played-frames count at zero."""
+        with self._lock:
+            self._written = 0
+            self._played = 0.0
+            self._mark = self.clock()
+            self._paused = False
+
+    def close(self):
+        self.flush()
+
+
+class WavSink(NullSink):
+    """NullSink that records every consumed frame to a 16-bit WAV file (what a listener would have heard)."""
+
+    def __init__(self, path, rate=44100, channels=2, clock=time.monotonic, realtime=True,
+                 buffer_frames=SINK_BUFFER_FRAMES):
+        self._blocks = deque()  # Written blocks not fully consumed yet
+        self._head = 0  # Frames of _blocks[0] already recorded
+        self.recorded = 0
+        self._wav = wave.open(path, 'wb')
+        self._wav.setnchannels(channels)
+        self._wav.setsampwidth(2)
+        self._wav.setframerate(rate)
+        super().__init__(rate, channels, clock, realtime, buffer_frames)
+
+    def write(self, block):
+        with self._lock:
+            self._blocks.append(np.ascontiguousarray(block, dtype=np.int16))
+        super().write(block)
+
+    def _consumed(self, start, end):
+        if self._wav is None:
+            return
+        frames = end - start
+        while frames > 0 and self._blocks:
+            block = self._blocks[0]
+            take = min(frames, len(block) - self._head)
+            self._wav.writeframes(block[self._head:self._head + take].tobytes())
+            self.recorded += take
+            frames -= take
+            self._head += take
+            if self._head == len(block):
+                self._blocks.popleft()
+                self._head = 0
+
+    def flush(self):
+        with self._lock:
+            self._blocks.clear()
+            self._head = 0
+        super().flush()
+
+    def close(self):
+        super().close()
+        with self._lock:
+            if self._wav is not None:
+                self._wav.close()
+                self._wav = None
+
+
+def make_sink(output="device"):
+    """Sink for PCMPlayer: 'device', 'null' or a path ending in .wav."""
+    if output == "null":
+        return NullSink()
+    if output.lower().endswith('.wav'):
+        return WavSink(output)
+    return MixerSink()
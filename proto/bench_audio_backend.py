@@ -0,0 +1,88 @@
+import os
+import time
+import wave
+import shutil
+import tempfile
+import subprocess
+import numpy as np
+import imageio_ffmpeg
+from audio_backend import NullBackend, NullSink, WavSink
+from player import MusicPlayer
+from pcm_engine import PCMPlayer
+from bench_pcm_engine import DURATION, make_source, seek_latency, position_error, report
+
+# Usage: python bench_audio_backend.py
+# Runs without an audio device: the null outputs consume audio against the real clock
+LOAD_ROUNDS = 5
+
+
+def make_tone(path, freq, seconds):
+    subprocess.run([imageio_ffmpeg.get_ffmpeg_exe(), '-y', '-loglevel', 'error', '-f', 'lavfi',
+                    '-i', f"sine=frequency={freq}:duration={seconds}:sample_rate=44100", '-ac', '2', path], check=True)
+
+
+def load_play_latency(player, path):
+    """load_file() + play() until the position moves."""
+    samples = []
+    for _ in range(LOAD_ROUNDS):
+        start = time.perf_counter()
+        player.load_file(path)
+        player.play()
+        while player.get_position() <= 0.001 and time.perf_counter() - start < 10:
+            time.sleep(0.0005)
+        samples.append(time.perf_counter() - start)
+        player.stop()
+    return samples
+
+
+def transition_gap(work, crossfade=0.0):
+    """Longest run of silence (ms) in a WAV recording of two tones played back to back."""
+    a, b = os.path.join(work, "a.flac"), os.path.join(work, "b.flac")
+    make_tone(a, 440, 2)
+    make_tone(b, 660, 2)
+    out = os.path.join(work, "out.wav")
+    player = PCMPlayer(sink=WavSink(out, realtime=False), crossfade=crossfade)
+    player.set_volume(1.0)
+    player.load_file(a)
+    player.queue_next(b)
+    player._next.wait_for(44100, timeout=5)
+    player.play()
+    while player.is_playing():
+        time.sleep(0.01)
+    player.close()
+    with wave.open(out, 'rb') as f:
+        left = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16).reshape(-1, 2)[:, 0] / 32768.0
+    window = 32
+    frames = len(left) - len(left) % window
+    quiet = np.sqrt((left[:frames].reshape(-1, window) ** 2).mean(axis=1)) < 1e-3
+    longest = run = 0
+    for q in quiet:
+        run = run + 1 if q else 0
+        longest = max(longest, run)
+    return longest * window / 44.1
+
+
+if __name__ == "__main__":
+    work = tempfile.mkdtemp(prefix="backend_bench_")
+    try:
+        source = make_source(work)
+        flac = os.path.join(work, "source.flac")
+        make_tone(flac, 440, 30)
+        engines = [("MusicPlayer + NullBackend", MusicPlayer(backend=NullBackend())),
+                   ("PCMPlayer + NullSink", PCMPlayer(sink=NullSink()))]
+        print(f"{DURATION} s source, no audio device")
+        for label, player in engines:
+            print(label)
+            report("load + play (mp3)", load_play_latency(player, source))
+            report("load + play (flac)", load_play_latency(player, flac))
+            player.load_file(source)
+            player.play()
+            time.sleep(0.5)
+            report("seek near", seek_latency(player, [1.0, 2.5, 0.5, 3.0, 1.5]))
+            report("seek far", seek_latency(player, [150.0, 200.0, 180.0, 220.0, 160.0]))
+            report("position error", position_error(player))
+            player.stop()
+            player.cleanup_temp()
+        print(f"PCMPlayer + WavSink: longest silence at a gapless transition {transition_gap(work):.1f} ms")
+    finally:
+        shutil.rmtree(work)
@@ -0,0 +1,56 @@
+import os
+import sys
+import random
+import shutil
+import resource
+import tempfile
+from cache_bundle import export_bundle, import_bundle, format_report
+
+# Usage: python bench_cache_bundle.py [tracks]
+TRACKS = 4000
+TRACKS_PER_ALBUM = 10
+COVER_BYTES = 80000  # Typical 600x600 JPEG
+LYRIC_LINES = 60
+
+
+def build_cache(root, tracks):
+    """A cache as MetadataManager leaves it: one cover per track (shared per album) and LRC lyrics."""
+    rng = random.Random(0)
+    os.makedirs(os.path.join(root, "images"))
+    os.makedirs(os.path.join(root, "lyrics"))
+    cover = None
+    for i in range(tracks):
+        if i % TRACKS_PER_ALBUM == 0:
+            cover = rng.randbytes(COVER_BYTES)  # JPEG data doesn't compress
+        with open(os.path.join(root, "images", f"{i:08x}_online.jpg"), 'wb') as f:
+            f.write(cover)
+        lines = "".join(f"[{n // 60:02d}:{n % 60:02d}.00]第{n}句歌词 line {rng.random():.6f}\n"
+                        for n in range(LYRIC_LINES))
+        with open(os.path.join(root, "lyrics", f"{i:08x}.txt"), 'w', encoding='utf-8') as f:
+            f.write(lines)
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+if __name__ == "__main__":
+    tracks = int(sys.argv[1]) if len(sys.argv) > 1 else TRACKS
+    work = tempfile.mkdtemp(prefix="bundle_bench_")
+    try:
+        source = os.path.join(work, "cache")
+        build_cache(source, tracks)
+        bundle = os.path.join(work, "cache.bundle")
+        print(f"{tracks} tracks, peak RSS after setup {peak_rss_mb():.0f} MB")
+
+        report = export_bundle(source, bundle)
+        print(format_report(report))
+
+        target = os.path.join(work, "new")
+        report = import_bundle(bundle, target)
+        print("cold:        " + format_report(report))
+        report = import_bundle(bundle, target)
+        print("incremental: " + format_report(report))
+        print(f"peak RSS {peak_rss_mb():.0f} MB")
+    finally:
+        shutil.rmtree(work)
@@ -0,0 +1,31 @@
+import time
+import numpy as np
+from dsp import DSPChain, PRESETS
+
+BLOCK_FRAMES = 2048  # Same block size as pcm_engine
+SECONDS = 30
+
+
+def bench(rate, preset):
+    chain = DSPChain(rate, 2, preset)
+    rng = np.random.default_rng(0)
+    audio = (rng.standard_normal((SECONDS * rate, 2)) * 0.2).astype(np.float32)
+    blocks = [audio[i:i + BLOCK_FRAMES] for i in range(0, len(audio), BLOCK_FRAMES)]
+    worst = 0.0
+    start = time.perf_counter()
+    for block in blocks:
+        t = time.perf_counter()
+        chain.process(block)
+        worst = max(worst, time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    budget = BLOCK_FRAMES / rate
+    print(f"  {rate / 1000:5.1f} kHz {preset:<6} {elapsed / SECONDS * 1000:6.2f} ms per audio second "
+          f"({SECONDS / elapsed:5.0f}x real time), worst block {worst * 1000:.2f} ms of {budget * 1000:.1f} ms budget")
+
+
+if __name__ == "__main__":
+    print(f"{BLOCK_FRAMES}-frame stereo blocks")
+    for rate in (44100, 48000, 96000):
+        for preset in ("平坦", "低音增强", "摇滚"):
+            bench(rate, preset)
+    print(f"presets: {', '.join(PRESETS)}")
@@ -0,0 +1,23 @@
+import os
+import sys
+import shutil
+import tempfile
+from synthlib import generate
+from export import export_tracks, format_report
+
+# Usage: python bench_export.py [tracks per format] [codec]
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    codec = sys.argv[2] if len(sys.argv) > 2 else "mp3"
+    work = tempfile.mkdtemp(prefix="export_bench_")
+    try:
+        paths = [t['path'] for t in generate(os.path.join(work, "library"), count)]
+        print(f"{len(paths)} tracks -> {codec}, {os.cpu_count()} CPU(s)")
+        workers = sorted({1, 2, os.cpu_count() or 1})
+        for n in workers:
+            dest = os.path.join(work, f"out_{n}")
+            print(f"workers={n:<3} {format_report(export_tracks(paths, dest, codec, workers=n))}")
+        # Everything is up to date now; this is the cost of a no-op re-export
+        print(f"re-run      {format_report(export_tracks(paths, dest, codec, workers=workers[-1]))}")
+    finally:
+        shutil.rmtree(work)
@@ -0,0 +1,140 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+import numpy as np
+import imageio_ffmpeg
+from fingerprint import FP_RATE, FP_SECONDS, FingerprintIndex, FingerprintStore, find_duplicates, minhash
+
+N_TRACKS = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+DUPLICATE_RATE = 0.1  # Share of the library that is a re-encode of another track
+N_FILES = 40  # Originals for the end-to-end (ffmpeg) part
+REENCODES = [['-b:a', '128k'], ['-b:a', '64k'], ['-q:a', '3'], ['-ss', '0.5', '-b:a', '192k'], ['-af', 'volume=-6dB']]
+EXTENSIONS = ['mp3', 'mp3', 'ogg', 'mp3', 'm4a']
+
+
+def song(seed, seconds):
+    """Melody of decaying harmonic notes plus a little noise, at FP_RATE."""
+    rng = np.random.default_rng(seed)
+    out = np.zeros(int(seconds * FP_RATE), np.float32)
+    t = 0
+    while t < len(out):
+        length = int(rng.uniform(0.12, 0.5) * FP_RATE)
+        freq = 220 * 2 ** (rng.integers(0, 36) / 12)
+        tt = np.arange(min(length, len(out) - t)) / FP_RATE
+        for h in (1, 2, 3):
+            out[t:t + len(tt)] += (0.3 / h) * np.sin(2 * np.pi * freq * h * tt) * np.exp(-3 * tt)
+        t += length
+    return out + 0.01 * rng.standard_normal(len(out)).astype(np.float32)
+
+
+def end_to_end(work):
+    """Real files through ffmpeg: fingerprint throughput and cluster accuracy."""
+    ffmpeg = imageio_ffmpeg.get_ffmpeg_exe()
+    truth = {}
+    paths = []
+    for i in range(N_FILES):
+        raw = os.path.join(work, "raw.f32")
+        song(i, FP_SECONDS + 5).tofile(raw)
+        original = os.path.join(work, f"{i * 7}.flac")
+        subprocess.run([ffmpeg, '-y', '-loglevel', 'error', '-f', 'f32le', '-ar', str(FP_RATE), '-ac', '1', '-i', raw,
+                        '-ar', '44100', '-ac', '2', original], check=True)
+        paths.append(original)
+        truth[original] = i
+        if i % 2 == 0:
+            variant = (i // 2) % len(REENCODES)
+            copy = os.path.join(work, f"{i * 7 + 1}.{EXTENSIONS[variant]}")
+            subprocess.run([ffmpeg, '-y', '-loglevel', 'error', '-i', original] + REENCODES[variant] + [copy], check=True)
+            paths.append(copy)
+            truth[copy] = i
+    for workers in sorted({1, os.cpu_count() or 1}):
+        store = FingerprintStore(os.path.join(work, f"fp{workers}.json"))
+        start = time.perf_counter()
+        clusters = find_duplicates(paths, store, workers=workers)
+        elapsed = time.perf_counter() - start
+        print(f"{len(paths)} files, {workers} worker(s): {elapsed:.2f} s ({len(paths) / elapsed:.1f} tracks/s, "
+              f"{len(paths) * FP_SECONDS / elapsed:.0f}x real time)")
+    start = time.perf_counter()
+    find_duplicates(paths, store)
+    print(f"  again from the store: {(time.perf_counter() - start) * 1000:.0f} ms")
+    expected = N_FILES // 2
+    correct = sum(1 for c in clusters if len(c) == 2 and truth[c[0]] == truth[c[1]])
+    print(f"  clusters: {len(clusters)} found, {correct} correct, {expected} expected")
+
+
+def synthetic_sets(n, rng):
+    """
+    Landmark sets for n tracks without decoding audio: each original draws
+    landmarks from a shared Zipf-like vocabulary (so unrelated tracks overlap
+    a little, as the real ones do) and each re-encode keeps a random 45-95%
+    of its original's landmarks and gains some new ones, matching the
+    similarities measured on real re-encodes above.
+    """
+    originals = int(n * (1 - DUPLICATE_RATE))
+    sets = []
+    truth = []
+    for i in range(originals):
+        size = rng.integers(500, 1000)
+        sets.append(np.unique((rng.zipf(1.3, size) * 2654435761 + rng.integers(0, 1 << 22, size) * (rng.random(size) > 0.05))
+                              % (1 << 22)).astype(np.uint32))
+        truth.append(i)
+    for _ in range(n - originals):
+        source = int(rng.integers(0, originals))
+        base = sets[source]
+        keep = rng.random(base.size) < rng.uniform(0.45, 0.95)
+        extra = rng.integers(0, 1 << 22, int(base.size * 0.1)).astype(np.uint32)
+        sets.append(np.unique(np.concatenate([base[keep], extra])))
+        truth.append(source)
+    return sets, truth
+
+
+def index_scaling(rng):
+    sets, truth = synthetic_sets(N_TRACKS, rng)
+    start = time.perf_counter()
+    signatures = [minhash(s) for s in sets]
+    print(f"MinHash of {N_TRACKS} landmark sets: {time.perf_counter() - start:.2f} s")
+
+    index = FingerprintIndex()
+    start = time.perf_counter()
+    for i, signature in enumerate(signatures):
+        index.add(i, signature)
+    print(f"LSH index build: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    start = time.perf_counter()
+    clusters = index.clusters()
+    elapsed = time.perf_counter() - start
+    found = {frozenset(c) for c in clusters}
+    groups = {}
+    for i, source in enumerate(truth):
+        groups.setdefault(source, set()).add(i)
+    expected = {frozenset(g) for g in groups.values() if len(g) > 1}
+    exact = len(found & expected)
+    members = sum(len(c) for c in clusters)
+    print(f"clusters(): {elapsed:.2f} s, {len(clusters)} groups ({members} tracks), "
+          f"{exact}/{len(expected)} expected groups recovered exactly")
+
+    start = time.perf_counter()
+    probes = rng.integers(0, N_TRACKS, 1000)
+    for p in probes:
+        index.query(signatures[p])
+    per_query = (time.perf_counter() - start) / len(probes)
+
+    # Brute force for comparison: one query against every signature
+    matrix = np.stack(signatures)
+    start = time.perf_counter()
+    for p in probes[:100]:
+        np.count_nonzero(matrix == signatures[p], axis=1)
+    brute = (time.perf_counter() - start) / 100
+    print(f"query: LSH {per_query * 1e6:.0f} us vs brute-force scan {brute * 1e6:.0f} us "
+          f"(all-pairs by brute force would be ~{brute * N_TRACKS:.0f} s)")
+
+
+if __name__ == "__main__":
+    work = tempfile.mkdtemp(prefix="fingerprint_bench_")
+    try:
+        end_to_end(work)
+    finally:
+        shutil.rmtree(work)
+    index_scaling(np.random.default_rng(0))
@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+import statistics
+from history import PlayHistory, START
+
+# Usage: python bench_history.py [events] [tracks]
+EVENTS = 1000000
+TRACKS = 20000
+QUERY_ROUNDS = 200
+
+
+def timed(fn, rounds=QUERY_ROUNDS):
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e6
+
+
+if __name__ == "__main__":
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else EVENTS
+    tracks = int(sys.argv[2]) if len(sys.argv) > 2 else TRACKS
+    rng = random.Random(0)
+    paths = [f"/music/artist{i % 500}/album{i % 40}/{i:06d}.flac" for i in range(tracks)]
+    artists = [f"artist{i % 500}" for i in range(tracks)]
+    # Zipf-ish popularity, like a real listening history
+    picks = [min(int(rng.paretovariate(1.2)) - 1, tracks - 1) for _ in range(events // 2)]
+    work = tempfile.mkdtemp(prefix="history_bench_")
+    try:
+        log = os.path.join(work, "history.log")
+        history = PlayHistory(log)
+        start = time.perf_counter()
+        ts = 1.7e9
+        for i in picks:
+            ts += 1
+            history.record(START, paths[i], artists[i], timestamp=ts)
+            history.finish(paths[i], rng.random() * 1.2, artists[i], timestamp=ts)
+        ingest = time.perf_counter() - start
+        print(f"record()        {events / ingest:12,.0f} events/s on the caller ({ingest / events * 1e6:.2f} us each)")
+
+        start = time.perf_counter()
+        history.close()
+        print(f"flush + rollup  {time.perf_counter() - start:12.2f} s  (log {os.path.getsize(log) / 1e6:.0f} MB)")
+
+        print(f"most_played(10)      {timed(lambda: history.most_played(10)):10.0f} us")
+        print(f"recently_skipped(10) {timed(lambda: history.recently_skipped(10)):10.0f} us")
+        print(f"artist_counts(10)    {timed(lambda: history.artist_counts(10)):10.0f} us")
+        print(f"track_stats()        {timed(lambda: history.track_stats(paths[0])):10.0f} us")
+
+        start = time.perf_counter()
+        PlayHistory(log).close()
+        print(f"reopen (rollup)      {time.perf_counter() - start:10.2f} s")
+        os.remove(history.rollup_path)
+        start = time.perf_counter()
+        replay = PlayHistory(log)
+        print(f"reopen (full replay) {time.perf_counter() - start:10.2f} s  ({replay.replayed:,} events)")
+        replay.close()
+    finally:
+        shutil.rmtree(work)
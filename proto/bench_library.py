@@ -0,0 +1,63 @@
+import tracemalloc
+import random
+import gc
+from library import Library
+
+N_TRACKS = 200000
+N_DIRS = 2000
+N_ARTISTS = 5000
+
+
+def synthetic_entries(n):
+    rnd = random.Random(42)
+    for i in range(n):
+        artist = f"Artist {rnd.randrange(N_ARTISTS)}"
+        album = f"{artist} - Album {rnd.randrange(8)}"
+        path = f"F:/music/{artist}/Album {rnd.randrange(N_DIRS // N_ARTISTS + 1)}\\{i:06d} Track title {i}.mp3"
+        # Build fresh strings each time, as tag parsing does
+        yield path, {
+            'title': f"Track title {i}",
+            'artist': "".join(artist),
+            'album': "".join(album),
+            'cover_path': None,
+            'lyrics': None,
+            'cover_data': None,
+        }
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, current
+
+
+def build_baseline():
+    playlist = []
+    metas = []
+    for path, meta in synthetic_entries(N_TRACKS):
+        playlist.append(path)
+        metas.append(meta)
+    return playlist, metas
+
+
+def build_library():
+    library = Library()
+    playlist = []
+    for path, meta in synthetic_entries(N_TRACKS):
+        tid = library.add(path)
+        library.update(tid, meta, duration=240.0)
+        playlist.append(tid)
+    return library, playlist
+
+
+if __name__ == "__main__":
+    _, before = measure(build_baseline)
+    _, after = measure(build_library)
+    print(f"Tracks: {N_TRACKS}")
+    print(f"Path list + meta dicts: {before / 2**20:7.1f} MiB  ({before / N_TRACKS:6.0f} B/track)")
+    print(f"Library (slots):        {after / 2**20:7.1f} MiB  ({after / N_TRACKS:6.0f} B/track)")
+    print(f"Reduction: {100 * (1 - after / before):.0f}%")
@@ -0,0 +1,45 @@
+import os
+import time
+import shutil
+import tempfile
+import subprocess
+import numpy as np
+import imageio_ffmpeg
+from loudness import ANALYSIS_RATE, LoudnessStore, analyze_many, measure
+
+N_TRACKS = 8
+DURATION = 120
+
+
+def make_tracks(directory):
+    paths = []
+    for i in range(N_TRACKS):
+        path = os.path.join(directory, f"track{i}.mp3")
+        subprocess.run([imageio_ffmpeg.get_ffmpeg_exe(), '-y', '-loglevel', 'error', '-f', 'lavfi',
+                        '-i', f"sine=frequency={220 + 40 * i}:duration={DURATION}:sample_rate=44100",
+                        '-af', f"volume={-6 - 2 * i}dB", '-ac', '2', path], check=True)
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    t = np.arange(DURATION * ANALYSIS_RATE) / ANALYSIS_RATE
+    pcm = np.repeat(np.sin(2 * np.pi * 997 * t)[:, None] * 0.1, 2, axis=1)
+    start = time.perf_counter()
+    measure(pcm)
+    elapsed = time.perf_counter() - start
+    print(f"measure() on {DURATION} s stereo PCM: {elapsed * 1000:.1f} ms ({DURATION / elapsed:.0f}x real time)")
+
+    work = tempfile.mkdtemp(prefix="loudness_bench_")
+    try:
+        paths = make_tracks(work)
+        for workers in sorted({1, os.cpu_count() or 1}):
+            store = LoudnessStore(os.path.join(work, f"loudness{workers}.json"))
+            start = time.perf_counter()
+            analyze_many(paths, store, workers=workers)
+            elapsed = time.perf_counter() - start
+            audio = N_TRACKS * DURATION
+            print(f"{N_TRACKS} x {DURATION} s mp3, {workers} worker(s): {elapsed:.2f} s "
+                  f"({audio / elapsed:.0f}x real time, {audio / 3600 / (elapsed / 60):.1f} audio-hours/min)")
+    finally:
+        shutil.rmtree(work)
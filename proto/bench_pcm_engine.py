@@ -0,0 +1,86 @@
+import os
+import time
+import shutil
+import tempfile
+import subprocess
+import statistics
+import imageio_ffmpeg
+
+# Timing only needs a device that consumes audio in real time; SDL's dummy driver does
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from player import MusicPlayer
+from pcm_engine import PCMPlayer
+
+DURATION = 240
+
+
+def make_source(directory):
+    path = os.path.join(directory, "source.mp3")
+    subprocess.run([imageio_ffmpeg.get_ffmpeg_exe(), '-y', '-loglevel', 'error', '-f', 'lavfi',
+                    '-i', f"sine=frequency=440:duration={DURATION}:sample_rate=44100", '-ac', '2', path], check=True)
+    return path
+
+
+def wait_until_moving(player, origin, timeout=5):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if player.get_position() > origin + 0.001:
+            return
+        time.sleep(0.0005)
+
+
+def seek_latency(player, targets):
+    """Time from seek() until the reported position advances past the target."""
+    samples = []
+    for target in targets:
+        start = time.perf_counter()
+        player.seek(target)
+        wait_until_moving(player, target)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def position_error(player, cycles=6):
+    """Reported position vs. wall-clock expectation across seeks and pauses."""
+    errors = []
+    player.seek(10.0)
+    expected_base, started = 10.0, time.perf_counter()
+    for i in range(cycles):
+        time.sleep(0.4)
+        errors.append(abs(player.get_position() - (expected_base + time.perf_counter() - started)))
+        player.pause()
+        paused_pos = expected_base + time.perf_counter() - started
+        time.sleep(0.2)
+        player.play()
+        expected_base, started = paused_pos, time.perf_counter()
+        time.sleep(0.3)
+        errors.append(abs(player.get_position() - (expected_base + time.perf_counter() - started)))
+        target = 20.0 + 15 * i
+        player.seek(target)
+        expected_base, started = target, time.perf_counter()
+    return errors
+
+
+def report(label, values):
+    values = [v * 1000 for v in values]
+    print(f"  {label:<26} median {statistics.median(values):7.1f} ms  max {max(values):7.1f} ms")
+
+
+if __name__ == "__main__":
+    work = tempfile.mkdtemp(prefix="pcm_bench_")
+    try:
+        source = make_source(work)
+        engines = [("pygame.mixer.music", MusicPlayer()), ("PCM engine", PCMPlayer())]
+        for label, player in engines:
+            print(label)
+            player.load_file(source)
+            player.play()
+            time.sleep(0.5)
+            report("seek near (buffered)", seek_latency(player, [1.0, 2.5, 0.5, 3.0, 1.5]))
+            report("seek far (re-decode)", seek_latency(player, [150.0, 200.0, 180.0, 220.0, 160.0]))
+            report("position error", position_error(player))
+            player.stop()
+            player.cleanup_temp()
+    finally:
+        shutil.rmtree(work)
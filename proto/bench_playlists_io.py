@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import tracemalloc
+from playlists_io import PlaylistEntry, read_playlist, write_m3u, write_pls
+
+# Usage: python bench_playlists_io.py [entries]
+ENTRIES = 100000
+
+
+def entries(n):
+    for i in range(n):
+        yield PlaylistEntry(f"/music/艺术家{i % 500}/专辑{i % 40}/{i:06d} 曲目.flac",
+                            f"曲目 {i}", f"艺术家{i % 500}", 180 + i % 240)
+
+
+def write_cue(path, n):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('PERFORMER "Various"\nFILE "mix.flac" WAVE\n')
+        for i in range(n):
+            minutes, seconds = divmod(i * 3, 60)
+            f.write(f'  TRACK {i + 1:02d} AUDIO\n    TITLE "Track {i}"\n    INDEX 01 {minutes:02d}:{seconds:02d}:00\n')
+
+
+def parse(path):
+    import metadata  # noqa: F401  Loaded lazily by the readers; keep the import out of the peak
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = sum(1 for _ in read_playlist(path))
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    # tracemalloc slows allocation down; time a clean pass too
+    start = time.perf_counter()
+    sum(1 for _ in read_playlist(path))
+    clean = time.perf_counter() - start
+    print(f"  read {os.path.basename(path):<9} {count / clean:10,.0f} entries/s  "
+          f"({clean:.2f} s, {os.path.getsize(path) / 1e6:.1f} MB file, peak {peak / 1024:.0f} KB traced"
+          f", {elapsed:.2f} s traced)")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else ENTRIES
+    work = tempfile.mkdtemp(prefix="playlist_bench_")
+    try:
+        print(f"{n:,} entries")
+        for name, writer in (("big.m3u8", write_m3u), ("big.pls", write_pls)):
+            path = os.path.join(work, name)
+            start = time.perf_counter()
+            writer(path, entries(n))
+            print(f"  write {name:<8} {n / (time.perf_counter() - start):10,.0f} entries/s")
+        write_cue(os.path.join(work, "big.cue"), n)
+        for name in ("big.m3u8", "big.pls", "big.cue"):
+            parse(os.path.join(work, name))
+    finally:
+        shutil.rmtree(work)
@@ -0,0 +1,67 @@
+import sys
+import time
+import random
+from playqueue import PlayQueue
+
+# Usage: python bench_playqueue.py [entries]
+ENTRIES = 200000
+OPS = 20000
+
+
+def per_op_us(fn, ops=OPS):
+    start = time.perf_counter()
+    for _ in range(ops):
+        fn()
+    return (time.perf_counter() - start) / ops * 1e6
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else ENTRIES
+    rng = random.Random(0)
+    start = time.perf_counter()
+    queue = PlayQueue(range(n), seed=0)
+    print(f"{n:,} entries, built in {(time.perf_counter() - start) * 1000:.0f} ms")
+    plain = list(range(n))
+    next_id = [n]
+
+    def fresh():
+        next_id[0] += 1
+        return next_id[0]
+
+    def report(label, queue_fn, list_fn=None):
+        ours = per_op_us(queue_fn)
+        line = f"  {label:<30} {ours:8.2f} us"
+        if list_fn:
+            line += f"   list: {per_op_us(list_fn, OPS // 20):9.2f} us"
+        print(line)
+
+    print("Edits and lookups (PlayQueue vs. a plain list of ids):")
+    report("index(id)", lambda: queue.index(rng.randrange(n // 2)),
+           lambda: plain.index(rng.randrange(n // 2)))
+    report("[position]", lambda: queue[rng.randrange(len(queue))], lambda: plain[rng.randrange(len(plain))])
+    report("insert(random position)", lambda: queue.insert(rng.randrange(len(queue)), fresh()),
+           lambda: plain.insert(rng.randrange(len(plain)), fresh()))
+    report("append", lambda: queue.append(fresh()), lambda: plain.append(fresh()))
+
+    def remove_random():
+        queue.remove(queue[rng.randrange(len(queue))])
+
+    def remove_random_list():
+        # What remove_file did: pop by position, then fix up the current index
+        plain.pop(rng.randrange(len(plain)))
+
+    report("remove(random id)", remove_random, remove_random_list)
+
+    print("Navigation:")
+    queue.set_current(queue[len(queue) // 2])
+    report("advance() in order", queue.advance)
+    report("back()", queue.back)
+    report("position() of current", queue.position)
+    start = time.perf_counter()
+    queue.set_shuffle(True)
+    print(f"  {'set_shuffle(True)':<30} {(time.perf_counter() - start) * 1000:8.1f} ms (once)")
+    report("advance() shuffled", queue.advance)
+    report("append while shuffled", lambda: queue.append(fresh()))
+    report("remove while shuffled", remove_random)
+    report("play_next + advance", lambda: (queue.play_next(queue[rng.randrange(len(queue))]), queue.advance()))
+    report("upcoming(5)", lambda: queue.upcoming(5))
@@ -0,0 +1,51 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+from scanner import LibraryScanner, iter_audio_files
+
+N_DIRS = 1000
+FILES_PER_DIR = 100
+
+
+def build_tree(base):
+    for d in range(N_DIRS):
+        directory = os.path.join(base, f"artist{d // 20:03d}", f"album{d:04d}")
+        os.makedirs(directory)
+        for i in range(FILES_PER_DIR):
+            open(os.path.join(directory, f"{i:03d} track.mp3"), "wb").close()
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed * 1000:9.1f} ms")
+    return elapsed, result
+
+
+if __name__ == "__main__":
+    base = tempfile.mkdtemp(prefix="scanbench_", dir=sys.argv[1] if len(sys.argv) > 1 else None)
+    try:
+        root = os.path.join(base, "music")
+        build_tree(root)
+        scanner = LibraryScanner(os.path.join(base, "snapshot.json"))
+        print(f"Tree: {N_DIRS} dirs, {N_DIRS * FILES_PER_DIR} files")
+
+        full, files = timed("full walk (add_directory)", lambda: list(iter_audio_files(root)))
+        timed("add_root (walk + snapshot)", lambda: scanner.add_root(root))
+        quick, delta = timed("rescan, unchanged", scanner.rescan)
+        assert not delta
+
+        open(os.path.join(root, "artist010", "album0200", "new.flac"), "wb").close()
+        os.remove(os.path.join(root, "artist020", "album0400", "000 track.mp3"))
+        _, delta = timed("rescan, 2 changed dirs", scanner.rescan)
+        print(f"  {delta}")
+        timed("rescan, deep", lambda: scanner.rescan(deep=True))
+
+        reloaded = LibraryScanner(scanner.snapshot_path)
+        timed("rescan after reload", reloaded.rescan)
+        print(f"Unchanged rescan costs {100 * quick / full:.1f}% of a full walk")
+    finally:
+        shutil.rmtree(base)
@@ -0,0 +1,75 @@
+import os
+import sys
+import time
+import shutil
+import asyncio
+import tempfile
+import statistics
+from synthlib import encode_tone, write_dsf
+from metadata import MetadataManager
+from server import StreamServer
+
+# Usage: python bench_server.py [max concurrent listeners]
+LISTENERS = (1, 8, 32, 128)
+RANGE_BYTES = 256 * 1024
+
+
+async def fetch(port, path, headers=""):
+    """(seconds to first body byte, seconds total, body bytes) for one GET."""
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: bench\r\nConnection: close\r\n{headers}\r\n".encode())
+    await writer.drain()
+    await reader.readuntil(b"\r\n\r\n")
+    first = await reader.read(65536)
+    ttfb = time.perf_counter() - start
+    size = len(first)
+    while True:
+        chunk = await reader.read(1 << 20)
+        if not chunk:
+            break
+        size += len(chunk)
+    writer.close()
+    return ttfb, time.perf_counter() - start, size
+
+
+async def load(port, path, listeners, headers=""):
+    start = time.perf_counter()
+    results = await asyncio.gather(*[fetch(port, path, headers) for _ in range(listeners)])
+    wall = time.perf_counter() - start
+    ttfb = sorted(r[0] for r in results)
+    total = sum(r[2] for r in results)
+    return (statistics.median(ttfb) * 1000, ttfb[int(0.95 * (len(ttfb) - 1))] * 1000,
+            total / wall / 1e6, wall)
+
+
+def report(label, n, stats):
+    p50, p95, mbps, wall = stats
+    print(f"  {label:<10} {n:4d} listeners  ttfb p50 {p50:7.1f} ms  p95 {p95:7.1f} ms  "
+          f"{mbps:8.1f} MB/s  ({wall:.2f} s)")
+
+
+async def main(limit):
+    work = tempfile.mkdtemp(prefix="server_bench_")
+    try:
+        native = os.path.join(work, "native.flac")
+        encode_tone(native, 440, 180)
+        dsd = os.path.join(work, "dsd.dsf")
+        write_dsf(dsd, seconds=10)
+        server = StreamServer([native, dsd], MetadataManager(cache_dir=os.path.join(work, "cache")))
+        await server.start("127.0.0.1", 0)
+        print(f"native: {os.path.getsize(native) / 1e6:.1f} MB FLAC; transcoded: 10 s DSF -> OGG")
+        for n in [n for n in LISTENERS if n <= limit]:
+            report("full", n, await load(server.port, "/tracks/0/stream", n))
+            report("range", n, await load(server.port, "/tracks/0/stream", n, f"Range: bytes=0-{RANGE_BYTES - 1}\r\n"))
+            # Each transcoding listener owns an ffmpeg process; keep these counts modest
+            if n <= 8:
+                report("transcode", n, await load(server.port, "/tracks/1/stream", n))
+        server.server.close()
+        await server.server.wait_closed()
+    finally:
+        shutil.rmtree(work)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else max(LISTENERS)))
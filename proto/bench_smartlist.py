@@ -0,0 +1,80 @@
+import time
+import random
+import statistics
+from library import Library
+from smartlist import SmartPlaylists, SmartPlaylist
+from bench_library import synthetic_entries
+
+# Usage: python bench_smartlist.py
+N_TRACKS = 100000
+UPDATES = 20000
+RULES = {
+    'artist': "artist = 'Artist 42'",
+    'artist+duration': "artist = 'Artist 42' and duration > 5 min",
+    'synced lyrics': "has synced lyrics",
+    'album contains': "album contains 'album 3'",
+    'format/folder': "format = mp3 and not folder contains 'album 1'",
+    'nested': "(has lyrics or duration < 2 min) and not artist contains '9'",
+}
+LYRICS = ("[00:01.00]synced line", "plain lyrics")
+
+
+def enriched_library(n):
+    rng = random.Random(1)
+    library = Library()
+    for path, meta in synthetic_entries(n):
+        meta['lyrics'] = rng.choice(LYRICS + (None, None))
+        library.update(library.add(path), meta, duration=rng.uniform(60, 600))
+    return library
+
+
+def per_track_us(fn, n):
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+if __name__ == "__main__":
+    library = enriched_library(N_TRACKS)
+    print(f"{len(library)} tracks")
+
+    print("Full evaluation (one pass over the library, as on creation):")
+    for label, rule in RULES.items():
+        holder = []
+        us = per_track_us(lambda: holder.append(SmartPlaylist(label, rule, library)), N_TRACKS)
+        print(f"  {label:<18} {us:6.2f} us/track  {us * N_TRACKS / 1000:7.1f} ms total  {len(holder[0]):6d} members")
+
+    smart = SmartPlaylists(library)
+    for label, rule in RULES.items():
+        smart.add(label, rule)
+    rng = random.Random(2)
+    tids = list(library)
+    samples = []
+    for _ in range(UPDATES):
+        tid = rng.choice(tids)
+        meta = {'artist': f"Artist {rng.randrange(100)}", 'lyrics': rng.choice(LYRICS)}
+        start = time.perf_counter()
+        library.update(tid, meta, duration=rng.uniform(60, 600))
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    print(f"Incremental library.update() with {len(RULES)} lists watching: "
+          f"p50 {statistics.median(samples) * 1e6:.1f} us  p99 {samples[int(len(samples) * 0.99)] * 1e6:.1f} us")
+
+    bare = enriched_library(2000)
+    tid = next(iter(bare))
+    start = time.perf_counter()
+    for _ in range(UPDATES):
+        bare.update(tid, {'artist': "Artist 1"}, duration=300)
+    print(f"  (library.update() with nothing watching: {(time.perf_counter() - start) / UPDATES * 1e6:.1f} us)")
+
+    target = smart.get('synced lyrics')
+    target.update(tids[0])
+    target._ordered = None
+    start = time.perf_counter()
+    target.ids()
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    target.ids()
+    print(f"View after a change: {first * 1000:.2f} ms (sort {len(target)} ids), "
+          f"unchanged: {(time.perf_counter() - start) * 1e6:.1f} us; a full re-scan would be "
+          f"{per_track_us(lambda: SmartPlaylist('x', RULES['synced lyrics'], library), 1) / 1000:.1f} ms")
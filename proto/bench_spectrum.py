@@ -0,0 +1,93 @@
+import os
+import time
+import shutil
+import tempfile
+import threading
+import subprocess
+import statistics
+import numpy as np
+import imageio_ffmpeg
+
+# Timing only needs a device that consumes audio in real time; SDL's dummy driver does
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from pcm_engine import PCMPlayer
+from spectrum import FPS, SpectrumAnalyzer
+
+SECONDS = 10
+TICK = 0.2  # GUI update_status interval
+
+
+class TkLikeLoop:
+    """
+    Stand-in for the Tk main loop (no display here): a single thread running
+    posted callbacks plus a periodic tick, recording how late each tick runs.
+    """
+
+    def __init__(self):
+        self._calls = []
+        self._cond = threading.Condition()
+        self.tick_lateness = []
+
+    def post(self, callback):
+        with self._cond:
+            self._calls.append(callback)
+            self._cond.notify()
+
+    def run(self, seconds):
+        end = time.monotonic() + seconds
+        next_tick = time.monotonic() + TICK
+        while time.monotonic() < end:
+            with self._cond:
+                if not self._calls:
+                    self._cond.wait(max(0.0, next_tick - time.monotonic()))
+                calls, self._calls = self._calls, []
+            for callback in calls:
+                callback()
+            now = time.monotonic()
+            if now >= next_tick:
+                self.tick_lateness.append(now - next_tick)
+                next_tick += TICK
+
+
+def histogram(label, values, edges_ms):
+    values = np.array(values) * 1000
+    counts, _ = np.histogram(values, bins=edges_ms + [np.inf])
+    print(f"{label}: n={len(values)} median {np.median(values):.2f} ms  p99 {np.percentile(values, 99):.2f} ms  max {values.max():.2f} ms")
+    for lo, hi, count in zip(edges_ms, edges_ms[1:] + [np.inf], counts):
+        bar = "#" * int(60 * count / max(1, len(values)))
+        print(f"  {lo:6.1f} - {hi:<6} ms {count:5d} {bar}")
+
+
+def run(source, with_spectrum):
+    player = PCMPlayer()
+    loop = TkLikeLoop()
+    drawn = []
+    analyzer = SpectrumAnalyzer(player, loop.post, drawn.append) if with_spectrum else None
+    player.load_file(source)
+    player.play()
+    loop.run(SECONDS)
+    if analyzer:
+        analyzer.stop()
+    player.close()
+    return loop, analyzer
+
+
+if __name__ == "__main__":
+    work = tempfile.mkdtemp(prefix="spectrum_bench_")
+    try:
+        source = os.path.join(work, "noise.mp3")
+        subprocess.run([imageio_ffmpeg.get_ffmpeg_exe(), '-y', '-loglevel', 'error', '-f', 'lavfi',
+                        '-i', f"anoisesrc=duration={SECONDS + 5}:color=pink:sample_rate=44100", '-ac', '2', source], check=True)
+        baseline, _ = run(source, with_spectrum=False)
+        loop, analyzer = run(source, with_spectrum=True)
+        budget = 1000 / FPS
+        histogram(f"Frame interval (target {budget:.1f} ms)", analyzer.frame_times, [0, 25, 30, 33, 34, 37, 45, 67])
+        histogram("Worker time per frame", analyzer.compute_times, [0, 0.5, 1, 2, 5, 10])
+        print(f"frames on screen: {len(analyzer.frame_times) + 1} in {SECONDS} s "
+              f"({(len(analyzer.frame_times) + 1) / SECONDS:.1f} fps)")
+        print(f"update_status tick lateness: median {statistics.median(baseline.tick_lateness) * 1000:.2f} ms without, "
+              f"{statistics.median(loop.tick_lateness) * 1000:.2f} ms with spectrum; "
+              f"max {max(baseline.tick_lateness) * 1000:.2f} / {max(loop.tick_lateness) * 1000:.2f} ms")
+    finally:
+        shutil.rmtree(work)
@@ -0,0 +1,72 @@
+import os
+import sys
+import shutil
+import tempfile
+import timeit
+
+# Loading needs a mixer, not a sound card
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import tracing
+from synthlib import generate
+from metadata import MetadataManager
+from player import MusicPlayer
+
+N = 200000
+SPAN = "with tracing.span('x', track=1): plain(1)"
+
+
+def per_call_ns(stmt, setup_globals):
+    return min(timeit.repeat(stmt, globals=setup_globals, number=N, repeat=5)) / N * 1e9
+
+
+def plain(x):
+    return x
+
+
+@tracing.traced("traced", arg="x")
+def traced(x):
+    return x
+
+
+def overhead():
+    g = {'tracing': tracing, 'plain': plain, 'traced': traced}
+    base = per_call_ns("plain(1)", g)
+    tracing.enable(False)
+    print(f"plain call                {base:7.0f} ns")
+    print(f"traced call, disabled     {per_call_ns('traced(1)', g):7.0f} ns")
+    print(f"with span(), disabled     {per_call_ns(SPAN, g):7.0f} ns")
+    tracing.enable()
+    print(f"traced call, enabled      {per_call_ns('traced(1)', g):7.0f} ns")
+    print(f"with span(), enabled      {per_call_ns(SPAN, g):7.0f} ns")
+    tracing.clear()
+
+
+def track_changes(output):
+    """Track changes the way play_index does them, minus Tk: load, then local metadata."""
+    work = tempfile.mkdtemp(prefix="trace_bench_")
+    try:
+        tracks = generate(os.path.join(work, "library"), tracks_per_format=4)
+        player = MusicPlayer()
+        manager = MetadataManager(cache_dir=os.path.join(work, "cache"))
+        tracing.enable()
+        for track_id, track in enumerate(tracks):
+            with tracing.track_change(track_id):
+                try:
+                    player.load_file(track['path'])
+                except Exception as e:
+                    print(f"load failed: {e}")
+                manager.get_metadata(track['path'], fetch_network=False)
+        player.cleanup_temp()
+        summary = tracing.latency_summary()
+        print("track change over {count} tracks: p50 {p50:.1f} ms, p90 {p90:.1f} ms, "
+              "p99 {p99:.1f} ms, max {max:.1f} ms".format(**summary))
+        tracing.export_chrome_trace(output)
+        print(f"trace with {len(tracing.chrome_trace()['traceEvents'])} events written to {output}")
+    finally:
+        shutil.rmtree(work)
+
+
+if __name__ == "__main__":
+    overhead()
+    track_changes(sys.argv[1] if len(sys.argv) > 1 else os.path.join(tempfile.gettempdir(), "musicplayer_trace.json"))
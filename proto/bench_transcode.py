@@ -0,0 +1,49 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+import statistics
+import imageio_ffmpeg
+
+# The benchmark only needs the mixer to accept data, not to make sound
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from player import MusicPlayer
+
+ROUNDS = 5
+
+
+def make_source(directory, seconds=180):
+    path = os.path.join(directory, "source.flac")
+    subprocess.run([imageio_ffmpeg.get_ffmpeg_exe(), '-y', '-loglevel', 'error',
+                    '-f', 'lavfi', '-i', f"sine=frequency=440:duration={seconds}:sample_rate=44100",
+                    '-ac', '2', path], check=True)
+    return path
+
+
+def bench(label, player, source):
+    times = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        player._load_via_conversion(source)
+        times.append(time.perf_counter() - start)
+    where = "memory" if player.temp_file is None else os.path.dirname(player.temp_file)
+    print(f"{label:<8} median {statistics.median(times) * 1000:8.1f} ms  min {min(times) * 1000:8.1f} ms  ({where})")
+    player.cleanup_temp()
+
+
+if __name__ == "__main__":
+    disk_root = sys.argv[1] if len(sys.argv) > 1 else os.getcwd()
+    tmpfs_root = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    work = tempfile.mkdtemp(prefix="transcode_bench_")
+    try:
+        source = make_source(work)
+        print(f"Source: 180 s stereo FLAC, {ROUNDS} rounds each")
+        bench("memory", MusicPlayer(), source)
+        bench("disk", MusicPlayer(memory_cap=0, temp_root=disk_root), source)
+        if tmpfs_root:
+            bench("tmpfs", MusicPlayer(memory_cap=0, temp_root=tmpfs_root), source)
+    finally:
+        shutil.rmtree(work)
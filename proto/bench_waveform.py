@@ -0,0 +1,37 @@
+import os
+import time
+import shutil
+import tempfile
+import subprocess
+import imageio_ffmpeg
+from waveform import WaveformCache, compute_peaks
+
+DURATION = 300
+
+
+def make_source(directory, ext):
+    path = os.path.join(directory, f"source.{ext}")
+    subprocess.run([imageio_ffmpeg.get_ffmpeg_exe(), '-y', '-loglevel', 'error',
+                    '-f', 'lavfi', '-i', f"sine=frequency=220:duration={DURATION}:sample_rate=44100",
+                    '-ac', '2', path], check=True)
+    return path
+
+
+if __name__ == "__main__":
+    work = tempfile.mkdtemp(prefix="waveform_bench_")
+    try:
+        cache = WaveformCache(os.path.join(work, "waveforms"))
+        print(f"Source: {DURATION} s stereo tone")
+        for ext in ("mp3", "flac", "ogg"):
+            source = make_source(work, ext)
+            start = time.perf_counter()
+            peaks = compute_peaks(source)
+            generate = time.perf_counter() - start
+            cache.save(source, peaks)
+            start = time.perf_counter()
+            cache.load(source)
+            load = time.perf_counter() - start
+            print(f"{ext:<5} generate {generate * 1000:7.1f} ms ({DURATION / generate:5.0f}x real time)"
+                  f"  cached load {load * 1000:5.2f} ms  ({os.path.getsize(cache._cache_path(source))} bytes)")
+    finally:
+        shutil.rmtree(work)
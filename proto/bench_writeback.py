@@ -0,0 +1,50 @@
+import os
+import sys
+import shutil
+import tempfile
+from metadata import MetadataManager
+from synthlib import generate, make_cover, make_lrc
+from writeback import write_back_tracks, format_report
+
+# Usage: python bench_writeback.py [tracks per format]
+TRACKS_PER_FORMAT = 25
+FORMATS = ("mp3", "flac", "m4a", "dsf")
+WORKER_COUNTS = (1, 2, 4)
+
+
+def warm_cache(manager, paths):
+    os.makedirs(manager.lyric_cache_dir, exist_ok=True)
+    os.makedirs(manager.img_cache_dir, exist_ok=True)
+    cover = make_cover(7, size=600)
+    lyrics = make_lrc("fetched", 240, lines=80)
+    for path in paths:
+        meta = manager._extract_tags(path)
+        cache_id = manager._get_cache_id(meta['artist'], meta['title'])
+        with open(os.path.join(manager.lyric_cache_dir, f"{cache_id}.txt"), 'w', encoding='utf-8') as f:
+            f.write(lyrics)
+        with open(os.path.join(manager.img_cache_dir, f"{cache_id}_online.jpg"), 'wb') as f:
+            f.write(cover)
+
+
+if __name__ == "__main__":
+    per_format = int(sys.argv[1]) if len(sys.argv) > 1 else TRACKS_PER_FORMAT
+    work = tempfile.mkdtemp(prefix="writeback_bench_")
+    try:
+        template = os.path.join(work, "template")
+        tracks = generate(template, per_format, formats=FORMATS)
+        manager = MetadataManager(cache_dir=os.path.join(work, "cache"))
+        warm_cache(manager, [t['path'] for t in tracks])
+        size = sum(os.path.getsize(t['path']) for t in tracks)
+        print(f"{len(tracks)} files ({', '.join(FORMATS)}), {size / 1e6:.0f} MB, half without embedded lyrics/art")
+
+        for workers in WORKER_COUNTS:
+            library = os.path.join(work, f"library{workers}")
+            shutil.copytree(template, library)
+            paths = [os.path.join(library, os.path.relpath(t['path'], template)) for t in tracks]
+            dry = write_back_tracks(paths, dry_run=True, workers=workers, manager=manager)
+            print(f"workers={workers} dry run: {format_report(dry, True)}")
+            report = write_back_tracks(paths, workers=workers, manager=manager)
+            print(f"workers={workers} write:   {format_report(report)}")
+            shutil.rmtree(library)
+    finally:
+        shutil.rmtree(work)
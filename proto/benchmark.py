@@ -0,0 +1,215 @@
+"""
+Reproducible benchmark suite over a generated library (see synthlib.py).
+
+    python benchmark.py --output results.json
+    python benchmark.py --output new.json --compare results.json
+
+Every result is the median of several timed runs, in microseconds per
+operation, so files from different commits can be compared directly.
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import contextlib
+import platform
+import tempfile
+import statistics
+import subprocess
+
+# Loading needs a mixer, not a sound card
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from synthlib import FORMATS, generate, make_lrc, mis_encode
+from scanner import LibraryScanner, iter_audio_files
+from library import Library
+from metadata import MetadataManager
+from player import MusicPlayer
+from lrc import parse_lrc, lyric_index
+
+REPEAT = 5
+REGRESSION_THRESHOLD = 0.2  # Flag results more than 20% slower than the baseline
+
+
+def measure(fn, per=1, repeat=REPEAT, setup=None):
+    """Median microseconds per operation of fn(), which performs `per` operations."""
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) / per * 1e6)
+    return {'median_us': statistics.median(samples), 'min_us': min(samples), 'runs': repeat, 'ops': per}
+
+
+def bench_scan(root, results):
+    files = list(iter_audio_files(root))
+    results['scan.iter_audio_files'] = measure(lambda: list(iter_audio_files(root)), per=len(files))
+
+    snapshot = os.path.join(root, "..", "snapshot.json")
+
+    def add_directory():
+        # What the GUI's add_directory does: register the root, then add every new path
+        scanner = LibraryScanner(snapshot)
+        library = Library()
+        for path in scanner.add_root(root):
+            if library.find(path) is None:
+                library.add(path)
+
+    results['scan.add_directory'] = measure(add_directory, per=len(files),
+                                            setup=lambda: os.path.exists(snapshot) and os.remove(snapshot))
+
+
+def bench_tags(tracks, manager, results):
+    for fmt in FORMATS:
+        paths = [t['path'] for t in tracks if t['format'] == fmt]
+        if paths:
+            results[f'tags.extract.{fmt}'] = measure(lambda: [manager._extract_tags(p) for p in paths], per=len(paths))
+
+
+def bench_normalize(manager, results):
+    samples = {
+        'mojibake': mis_encode("测试歌曲的标题"),
+        'cjk': "测试歌曲的标题",
+        'ascii': "An Ordinary English Title",
+        'bytes_gbk': "测试歌曲".encode("gbk"),
+    }
+    n = 2000
+    for label, value in samples.items():
+        results[f'normalize_text.{label}'] = measure(lambda: [manager._normalize_text(value) for _ in range(n)], per=n)
+
+
+def bench_metadata(tracks, work, results):
+    paths = [t['path'] for t in tracks]
+    cache_dir = os.path.join(work, "metadata_cache")
+
+    def fresh_cache():
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    def cold():
+        manager = MetadataManager(cache_dir=cache_dir)
+        for p in paths:
+            manager.get_metadata(p, fetch_network=False)
+
+    results['metadata.get.cold'] = measure(cold, per=len(paths), setup=fresh_cache)
+    manager = MetadataManager(cache_dir=cache_dir)
+    for p in paths:
+        manager.get_metadata(p, fetch_network=False)
+    results['metadata.get.warm'] = measure(lambda: [manager.get_metadata(p, fetch_network=False) for p in paths],
+                                           per=len(paths))
+
+
+def bench_load(tracks, results):
+    player = MusicPlayer()
+    # The fallback path prints a line per file; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        _bench_load(player, tracks, results)
+
+
+def _bench_load(player, tracks, results):
+    try:
+        for fmt in FORMATS:
+            paths = [t['path'] for t in tracks if t['format'] == fmt][:3]
+            if not paths:
+                continue
+            # load_file tries pygame first; formats it cannot open fall back to conversion
+            player.load_file(paths[0])
+            direct = not isinstance(player.current_file_obj, io.BytesIO) and player.temp_file is None
+            label = 'direct' if direct else 'fallback'
+            results[f'load_file.{label}.{fmt}'] = measure(lambda: [player.load_file(p) for p in paths], per=len(paths), repeat=3)
+            results[f'load_file.conversion.{fmt}'] = measure(lambda: [player._load_via_conversion(p) for p in paths],
+                                                             per=len(paths), repeat=3)
+    finally:
+        player.cleanup_temp()
+
+
+def bench_lyrics(results):
+    text = make_lrc("测试", 300, lines=120)
+    results['lyrics.parse_lrc'] = measure(lambda: [parse_lrc(text) for _ in range(100)], per=100)
+    parsed = parse_lrc(text)
+    positions = [i * 0.2 for i in range(1500)]  # One 5-minute track at the GUI's 200 ms tick
+    results['lyrics.sync_lookup'] = measure(lambda: [lyric_index(parsed, t) for t in positions], per=len(positions))
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, report_settings, baseline_path, threshold=REGRESSION_THRESHOLD):
+    """Print the change against a previous results file; returns the names that regressed."""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\nvs {baseline_path} (commit {baseline.get('commit')})")
+    if baseline.get('tracks_per_format') != report_settings['tracks_per_format'] or baseline.get('seed') != report_settings['seed']:
+        print("  warning: baseline was generated with different --tracks/--seed")
+    regressed = []
+    for name, result in sorted(results.items()):
+        old = baseline.get('results', {}).get(name)
+        if not old:
+            print(f"  {name:<34} {result['median_us']:12.1f} us  (new)")
+            continue
+        ratio = result['median_us'] / old['median_us'] if old['median_us'] else 1.0
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressed.append(name)
+        print(f"  {name:<34} {old['median_us']:12.1f} -> {result['median_us']:12.1f} us  {ratio:5.2f}x{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", metavar="BASELINE", help="previous results file to diff against")
+    parser.add_argument("--tracks", type=int, default=8, help="tracks per format in the generated library")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="musicplayer_bench_")
+    try:
+        root = os.path.join(work, "library")
+        start = time.perf_counter()
+        tracks = generate(root, args.tracks, args.seed)
+        print(f"Generated {len(tracks)} tracks in {time.perf_counter() - start:.1f} s")
+
+        results = {}
+        bench_scan(root, results)
+        manager = MetadataManager(cache_dir=os.path.join(work, "tag_cache"))
+        bench_tags(tracks, manager, results)
+        bench_normalize(manager, results)
+        bench_metadata(tracks, work, results)
+        bench_load(tracks, results)
+        bench_lyrics(results)
+    finally:
+        shutil.rmtree(work)
+
+    for name, result in sorted(results.items()):
+        print(f"  {name:<34} {result['median_us']:12.1f} us")
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'tracks_per_format': args.tracks,
+        'seed': args.seed,
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Wrote {args.output}")
+
+    if args.compare and compare(results, report, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
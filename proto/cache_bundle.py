@@ -0,0 +1,261 @@
+"""
+Pack the metadata cache (covers in cache/images, lyrics in cache/lyrics)
+into one compressed file, so a new install starts warm instead of
+re-fetching everything from iTunes, Netease and lrclib:
+
+    python cache_bundle.py export cache.bundle
+    python cache_bundle.py import cache.bundle
+
+A bundle is a gzip-compressed tar stream. The first member is
+manifest.json, mapping every cached file to the SHA-256 of its contents;
+after it comes one `blobs/<sha256>` member per distinct content. Album
+covers saved once per track are therefore stored once. Both directions
+stream in CHUNK-sized pieces, so a multi-GB cache never has to fit in
+memory (only the manifest does).
+
+Import is incremental: files already present with the same contents are
+left alone, and local files that differ are kept unless overwrite=True.
+Every blob is hashed as it is read and only written when it matches its
+name, through a temporary file and os.replace, so a damaged or truncated
+bundle never leaves half-written cache entries.
+"""
+import os
+import io
+import sys
+import json
+import time
+import gzip
+import shutil
+import hashlib
+import tarfile
+import argparse
+
+CACHE_SUBDIRS = ('images', 'lyrics')  # What MetadataManager writes
+MANIFEST_NAME = "manifest.json"
+BLOB_PREFIX = "blobs/"
+FORMAT_VERSION = 1
+CHUNK = 1 << 20
+COMPRESSLEVEL = 6  # Covers are JPEGs already; higher levels cost time for nothing
+
+
+class BundleError(ValueError):
+    pass
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_files(cache_dir, subdirs=CACHE_SUBDIRS):
+    """(name relative to cache_dir with '/' separators, full path) for every cached file."""
+    for subdir in subdirs:
+        root = os.path.join(cache_dir, subdir)
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if filename.endswith('.part'):
+                    continue
+                full = os.path.join(dirpath, filename)
+                yield os.path.relpath(full, cache_dir).replace(os.sep, '/'), full
+
+
+def _safe_name(name):
+    """Reject manifest names that would land outside the cache directory."""
+    parts = name.split('/')
+    if not name or name.startswith('/') or '\\' in name or ':' in parts[0] or \
+            any(part in ('', '.', '..') for part in parts):
+        raise BundleError(f"Unsafe path in bundle: {name!r}")
+    return os.path.join(*parts)
+
+
+def export_bundle(cache_dir, bundle_path, subdirs=CACHE_SUBDIRS, progress=None):
+    """
+    Write the cache under cache_dir to bundle_path. Files are hashed in a
+    first pass (the manifest goes first), then each distinct blob is
+    streamed into the archive. Returns a report dict.
+    """
+    start = time.perf_counter()
+    files = {}
+    sources = {}  # sha256 -> (path, size) of one file with that content
+    for name, full in cache_files(cache_dir, subdirs):
+        try:
+            sha = file_digest(full)
+            size = os.path.getsize(full)
+        except OSError as e:
+            print(f"Skipping {full}: {e}")
+            continue
+        files[name] = [sha, size]
+        sources.setdefault(sha, (full, size))
+
+    manifest = json.dumps({'version': FORMAT_VERSION, 'files': files}, ensure_ascii=False).encode('utf-8')
+    part = bundle_path + ".part"
+    written = 0
+    with open(part, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=COMPRESSLEVEL) as gz, \
+            tarfile.open(fileobj=gz, mode='w|') as tar:
+        info = tarfile.TarInfo(MANIFEST_NAME)
+        info.size = len(manifest)
+        tar.addfile(info, io.BytesIO(manifest))
+        for done, (sha, (full, size)) in enumerate(sources.items(), 1):
+            info = tarfile.TarInfo(BLOB_PREFIX + sha)
+            info.size = size
+            with open(full, 'rb') as f:
+                tar.addfile(info, f)
+            written += size
+            if progress:
+                progress(done, len(sources))
+    os.replace(part, bundle_path)
+
+    return {
+        'files': len(files),
+        'blobs': len(sources),
+        'bytes': sum(size for _, size in files.values()),
+        'stored_bytes': written,
+        'bundle_bytes': os.path.getsize(bundle_path),
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def _read_manifest(tar):
+    member = tar.next()
+    if member is None or member.name != MANIFEST_NAME:
+        raise BundleError("Not a cache bundle (manifest missing)")
+    manifest = json.load(tar.extractfile(member))
+    if manifest.get('version') != FORMAT_VERSION:
+        raise BundleError(f"Unsupported bundle version: {manifest.get('version')}")
+    return manifest['files']
+
+
+def _copy_verified(stream, sha, target):
+    """Stream a blob to target.part, hashing as it goes; rename only if the hash matches."""
+    part = target + ".part"
+    digest = hashlib.sha256()
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(part, 'wb') as out:
+        for chunk in iter(lambda: stream.read(CHUNK), b''):
+            digest.update(chunk)
+            out.write(chunk)
+    if digest.hexdigest() != sha:
+        os.remove(part)
+        return False
+    os.replace(part, target)
+    return True
+
+
+def import_bundle(bundle_path, cache_dir, overwrite=False, progress=None):
+    """
+    Merge a bundle into cache_dir. Returns a report dict: files written,
+    already present (same contents), kept (differing local file and not
+    overwrite), corrupt (blob failed its hash) and missing (no blob in the
+    bundle), plus bytes read and throughput.
+    """
+    start = time.perf_counter()
+    report = {'written': 0, 'present': 0, 'kept': 0, 'corrupt': 0, 'missing': 0, 'bytes_read': 0}
+    with open(bundle_path, 'rb') as raw:
+        with tarfile.open(fileobj=raw, mode='r|gz') as tar:
+            files = _read_manifest(tar)
+            # sha256 -> destinations that still need it
+            wanted = {}
+            for name, (sha, size) in files.items():
+                target = os.path.join(cache_dir, _safe_name(name))
+                if os.path.exists(target):
+                    if os.path.getsize(target) == size and file_digest(target) == sha:
+                        report['present'] += 1
+                        continue
+                    if not overwrite:
+                        report['kept'] += 1
+                        continue
+                wanted.setdefault(sha, []).append(target)
+
+            total = len(wanted)
+            done = 0
+            for member in tar:
+                if not member.name.startswith(BLOB_PREFIX) or not member.isfile():
+                    continue
+                sha = member.name[len(BLOB_PREFIX):]
+                report['bytes_read'] += member.size
+                targets = wanted.pop(sha, None)
+                if not targets:
+                    continue  # Not needed here; the stream reader skips it
+                first, rest = targets[0], targets[1:]
+                if not _copy_verified(tar.extractfile(member), sha, first):
+                    print(f"Corrupt blob {sha[:12]} in bundle, {len(targets)} file(s) skipped")
+                    report['corrupt'] += len(targets)
+                    continue
+                # Identical files (one album cover per track) are copies of the verified first one
+                for target in rest:
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    shutil.copyfile(first, target + ".part")
+                    os.replace(target + ".part", target)
+                report['written'] += len(targets)
+                done += 1
+                if progress:
+                    progress(done, total)
+            report['missing'] = sum(len(targets) for targets in wanted.values())
+
+    report['files'] = len(files)
+    report['bundle_bytes'] = os.path.getsize(bundle_path)
+    report['seconds'] = time.perf_counter() - start
+    return report
+
+
+def verify_bundle(bundle_path):
+    """Read the whole bundle and check every blob against its name and the manifest."""
+    problems = []
+    with open(bundle_path, 'rb') as raw, tarfile.open(fileobj=raw, mode='r|gz') as tar:
+        files = _read_manifest(tar)
+        expected = {sha for sha, _ in files.values()}
+        for member in tar:
+            if not member.name.startswith(BLOB_PREFIX):
+                continue
+            sha = member.name[len(BLOB_PREFIX):]
+            digest = hashlib.sha256()
+            stream = tar.extractfile(member)
+            for chunk in iter(lambda: stream.read(CHUNK), b''):
+                digest.update(chunk)
+            if digest.hexdigest() != sha:
+                problems.append(f"blob {sha[:12]} does not match its hash")
+            expected.discard(sha)
+        problems.extend(f"blob {sha[:12]} is missing" for sha in sorted(expected))
+    return problems
+
+
+def format_report(report):
+    seconds = max(report['seconds'], 1e-9)
+    if 'written' in report:
+        return (f"导入 {report['written']} 个文件, 已存在 {report['present']}, 保留本地 {report['kept']}, "
+                f"损坏 {report['corrupt']}, 缺失 {report['missing']}; "
+                f"{report['bundle_bytes'] / 1e6 / seconds:.1f} MB/s 压缩数据, "
+                f"{report['bytes_read'] / 1e6 / seconds:.1f} MB/s 解压后, "
+                f"{report['files'] / seconds:.0f} 文件/s ({seconds:.2f} s)")
+    return (f"导出 {report['files']} 个文件 ({report['blobs']} 个不同内容), "
+            f"{report['bytes'] / 1e6:.1f} MB -> {report['bundle_bytes'] / 1e6:.1f} MB, {seconds:.2f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export or import the cover/lyrics cache as a single bundle")
+    parser.add_argument("action", choices=("export", "import", "verify"))
+    parser.add_argument("bundle")
+    parser.add_argument("--cache", default="cache", metavar="DIR", help="cache directory (default: cache)")
+    parser.add_argument("--overwrite", action="store_true", help="replace local files that differ on import")
+    args = parser.parse_args()
+
+    def show(done, total):
+        print(f"\r{done}/{total}", end="", flush=True)
+
+    try:
+        if args.action == "export":
+            result = export_bundle(args.cache, args.bundle, progress=show)
+        elif args.action == "import":
+            result = import_bundle(args.bundle, args.cache, args.overwrite, progress=show)
+        else:
+            issues = verify_bundle(args.bundle)
+            print("\n".join(issues) or "OK")
+            sys.exit(1 if issues else 0)
+    except (OSError, BundleError, tarfile.TarError, EOFError) as e:
+        print(f"\n{e}")
+        sys.exit(1)
+    print("\n" + format_report(result))
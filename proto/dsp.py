@@ -0,0 +1,187 @@
+import math
+import threading
+import numpy as np
+
+try:
+    from scipy.signal import sosfilt
+except ImportError:
+    sosfilt = None
+
+SUB_BLOCK = 64  # Frames per matrix step in the numpy biquad path
+LIMITER_CHUNK = 64  # Frames sharing one limiter gain value
+
+# name -> (preamp dB, [(filter type, frequency Hz, gain dB, Q)])
+PRESETS = {
+    "平坦": (0.0, []),
+    "低音增强": (-4.0, [("lowshelf", 100, 6.0, 0.707), ("peak", 250, 2.0, 1.0)]),
+    "高音增强": (-4.0, [("highshelf", 6000, 6.0, 0.707), ("peak", 3000, 2.0, 1.0)]),
+    "人声": (-3.0, [("peak", 120, -3.0, 0.8), ("peak", 1000, 2.0, 1.0), ("peak", 3000, 3.0, 1.0), ("highshelf", 10000, -2.0, 0.707)]),
+    "摇滚": (-5.0, [("lowshelf", 80, 4.0, 0.707), ("peak", 250, -2.0, 1.0), ("peak", 1000, -1.0, 1.0),
+                  ("peak", 3500, 3.0, 1.0), ("highshelf", 10000, 4.0, 0.707)]),
+    "古典": (-3.0, [("lowshelf", 100, 3.0, 0.707), ("peak", 2000, -1.5, 0.8), ("highshelf", 8000, 3.0, 0.707)]),
+}
+DEFAULT_PRESET = "平坦"
+
+
+def design_biquad(kind, freq, gain_db, q, rate):
+    """RBJ Audio EQ Cookbook biquad, returned as normalized (b0, b1, b2, a1, a2)."""
+    A = 10 ** (gain_db / 40.0)
+    w0 = 2 * math.pi * min(freq, rate * 0.49) / rate
+    cos_w0 = math.cos(w0)
+    alpha = math.sin(w0) / (2 * q)
+    if kind == "peak":
+        b = (1 + alpha * A, -2 * cos_w0, 1 - alpha * A)
+        a = (1 + alpha / A, -2 * cos_w0, 1 - alpha / A)
+    elif kind == "lowshelf":
+        sq = 2 * math.sqrt(A) * alpha
+        b = (A * ((A + 1) - (A - 1) * cos_w0 + sq), 2 * A * ((A - 1) - (A + 1) * cos_w0), A * ((A + 1) - (A - 1) * cos_w0 - sq))
+        a = ((A + 1) + (A - 1) * cos_w0 + sq, -2 * ((A - 1) + (A + 1) * cos_w0), (A + 1) + (A - 1) * cos_w0 - sq)
+    elif kind == "highshelf":
+        sq = 2 * math.sqrt(A) * alpha
+        b = (A * ((A + 1) + (A - 1) * cos_w0 + sq), -2 * A * ((A - 1) + (A + 1) * cos_w0), A * ((A + 1) + (A - 1) * cos_w0 - sq))
+        a = ((A + 1) - (A - 1) * cos_w0 + sq, 2 * ((A - 1) - (A + 1) * cos_w0), (A + 1) - (A - 1) * cos_w0 - sq)
+    else:
+        raise ValueError(f"Unknown filter type: {kind}")
+    return (b[0] / a[0], b[1] / a[0], b[2] / a[0], a[1] / a[0], a[2] / a[0])
+
+
+class Biquad:
+    """
+    One biquad section over (frames, channels) float64 blocks, state kept
+    between calls. Without scipy, the recursion is evaluated SUB_BLOCK frames
+    at a time as matrix products: y = T x + O s and s' = A^L s + R x, where
+    T holds the impulse response and O/R/A^L come from the section's
+    state-space form. Only the 2x2 state update runs in a Python loop.
+    """
+
+    def __init__(self, coeffs, channels):
+        self.coeffs = coeffs
+        b0, b1, b2, a1, a2 = coeffs
+        self._A = np.array([[-a1, 1.0], [-a2, 0.0]])
+        self._B = np.array([b1 - a1 * b0, b2 - a2 * b0])
+        self._D = b0
+        self.state = np.zeros((2, channels))
+        self._matrices = {}
+
+    def _block_matrices(self, length):
+        cached = self._matrices.get(length)
+        if cached is not None:
+            return cached
+        powers = [np.eye(2)]
+        for _ in range(length):
+            powers.append(self._A @ powers[-1])
+        observe = np.array([p[0] for p in powers[:length]])  # C A^k, C = [1, 0]
+        h = np.concatenate([[self._D], observe[:length - 1] @ self._B])
+        k = np.arange(length)
+        lag = k[:, None] - k[None, :]
+        toeplitz = np.where(lag >= 0, h[np.clip(lag, 0, None)], 0.0)
+        reach = np.array([powers[length - 1 - j] @ self._B for j in range(length)]).T  # A^(L-1-j) B
+        cached = (toeplitz, observe, reach, powers[length])
+        self._matrices[length] = cached
+        return cached
+
+    def process(self, x):
+        frames = len(x)
+        full = frames - frames % SUB_BLOCK
+        out = np.empty_like(x)
+        if full:
+            out[:full] = self._run(x[:full].reshape(-1, SUB_BLOCK, x.shape[1]), SUB_BLOCK).reshape(full, -1)
+        if full < frames:
+            out[full:] = self._run(x[None, full:], frames - full)[0]
+        return out
+
+    def _run(self, blocks, length):
+        toeplitz, observe, reach, a_l = self._block_matrices(length)
+        forced = np.matmul(toeplitz, blocks)  # (n, L, ch)
+        driven = np.matmul(reach, blocks)  # (n, 2, ch)
+        states = np.empty((len(blocks), 2, blocks.shape[2]))
+        s = self.state
+        for i in range(len(blocks)):
+            states[i] = s
+            s = a_l @ s + driven[i]
+        self.state = s
+        return forced + np.matmul(observe, states)
+
+    def reset(self):
+        self.state[:] = 0.0
+
+
+class Limiter:
+    """Peak limiter with instant attack and exponential release, applied per LIMITER_CHUNK."""
+
+    def __init__(self, rate, ceiling_db=-0.3, release_ms=80.0):
+        self.ceiling = 10 ** (ceiling_db / 20.0)
+        self.release = 1.0 - math.exp(-LIMITER_CHUNK / (rate * release_ms / 1000.0))
+        self.gain = 1.0
+
+    def process(self, x):
+        frames = len(x)
+        chunks = -(-frames // LIMITER_CHUNK)
+        padded = np.zeros((chunks * LIMITER_CHUNK, x.shape[1]))
+        padded[:frames] = np.abs(x)
+        peaks = padded.reshape(chunks, -1).max(axis=1)
+        with np.errstate(divide='ignore'):
+            targets = np.minimum(1.0, self.ceiling / peaks)
+        if targets.min() >= 1.0 and self.gain >= 1.0:
+            return x
+        gains = np.empty(chunks)
+        g = self.gain
+        for i, target in enumerate(targets):
+            g = target if target < g else g + (target - g) * self.release
+            gains[i] = g
+        self.gain = g
+        return x * np.repeat(gains, LIMITER_CHUNK)[:frames, None]
+
+    def reset(self):
+        self.gain = 1.0
+
+
+class DSPChain:
+    """
+    Preamp -> parametric EQ (cascaded biquads) -> limiter, on float blocks
+    in [-1, 1] of shape (frames, channels). The flat preset bypasses
+    everything so it costs nothing.
+    """
+
+    def __init__(self, rate, channels=2, preset=DEFAULT_PRESET):
+        self.rate = rate
+        self.channels = channels
+        self.limiter = Limiter(rate)
+        # Presets are switched from the GUI thread while the pump thread is processing
+        self._lock = threading.Lock()
+        self.set_preset(preset)
+
+    def set_preset(self, name):
+        preamp_db, bands = PRESETS[name]
+        coeffs = [design_biquad(kind, freq, gain, q, self.rate) for kind, freq, gain, q in bands]
+        with self._lock:
+            self.preset = name
+            self.preamp = 10 ** (preamp_db / 20.0)
+            self.sections = [Biquad(c, self.channels) for c in coeffs]
+            self._sos = np.array([[b0, b1, b2, 1.0, a1, a2] for b0, b1, b2, a1, a2 in coeffs]) if coeffs else None
+            self._zi = np.zeros((len(coeffs), 2, self.channels))
+            self.limiter.reset()
+
+    @property
+    def bypass(self):
+        return not self.sections and self.preamp == 1.0
+
+    def process(self, block):
+        if self.bypass:
+            return block
+        with self._lock:
+            x = np.asarray(block, dtype=np.float64) * self.preamp
+            if self._sos is not None:
+                if sosfilt is not None:
+                    x, self._zi = sosfilt(self._sos, x, axis=0, zi=self._zi)
+                else:
+                    for section in self.sections:
+                        x = section.process(x)
+            return self.limiter.process(x).astype(np.float32)
+
+    def reset(self):
+        with self._lock:
+            for section in self.sections:
+                section.reset()
+            self._zi[:] = 0.0
+            self.limiter.reset()
@@ -0,0 +1,321 @@
+"""
+Bulk transcode of a playlist or directory for devices that can't play
+DSF/FLAC:
+
+    python export.py playlist.json --to /media/player --codec mp3 --bitrate 192k
+
+Each track goes through its own ffmpeg process, at most `workers` at a time.
+Tags and cover art are copied with mutagen afterwards. Outputs are written
+as .part files and renamed when complete, and every finished track is
+recorded in a manifest in the destination, so an interrupted export
+resumes where it stopped and a repeated one only redoes changed sources.
+"""
+import os
+import sys
+import json
+import time
+import base64
+import argparse
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import imageio_ffmpeg
+from mutagen import File
+from mutagen.id3 import ID3, APIC, USLT, TIT2, TPE1, TALB
+from mutagen.mp4 import MP4, MP4Cover
+from mutagen.flac import Picture
+from metadata import MetadataManager
+from playlists_io import write_m3u
+
+# codec: (ffmpeg encoder, extension, container, sample rate, default bitrate)
+CODECS = {
+    'mp3': ('libmp3lame', '.mp3', 'mp3', 44100, '192k'),
+    'aac': ('aac', '.m4a', 'ipod', 44100, '192k'),
+    'ogg': ('libvorbis', '.ogg', 'ogg', 44100, '160k'),
+    'opus': ('libopus', '.opus', 'ogg', 48000, '128k'),
+}
+DEFAULT_CODEC = 'mp3'
+MANIFEST_NAME = ".export_manifest.json"
+SAVE_EVERY = 8  # Finished tracks between manifest saves
+
+
+def export_command(source, output, codec=DEFAULT_CODEC, bitrate=None):
+    """ffmpeg arguments that transcode source to `codec` at `output`."""
+    encoder, _, container, rate, default_bitrate = CODECS[codec]
+    # Tags are written with mutagen afterwards, so drop whatever ffmpeg would copy
+    # DSD decodes to 352.8 kHz, which lossy encoders don't take; -ar resamples it
+    return [
+        imageio_ffmpeg.get_ffmpeg_exe(),
+        '-y',
+        '-nostats', '-loglevel', 'error',
+        '-i', source,
+        '-vn',
+        '-map_metadata', '-1',
+        '-ar', str(rate),
+        '-c:a', encoder,
+        '-b:a', bitrate or default_bitrate,
+        '-f', container,
+        output
+    ]
+
+
+def cover_mime(data):
+    return "image/png" if data[:8] == b"\x89PNG\r\n\x1a\n" else "image/jpeg"
+
+
+def copy_tags(meta, output, codec):
+    """Write title/artist/album, lyrics and cover from a _extract_tags() dict into output."""
+    title, artist, album = meta.get('title'), meta.get('artist'), meta.get('album')
+    cover, lyrics = meta.get('cover_data'), meta.get('lyrics')
+    cover = bytes(cover) if cover else None
+    if codec == 'mp3':
+        tags = ID3()
+        for frame, value in ((TIT2, title), (TPE1, artist), (TALB, album)):
+            if value:
+                tags.add(frame(encoding=3, text=value))
+        if cover:
+            tags.add(APIC(encoding=3, mime=cover_mime(cover), type=3, desc="Cover", data=cover))
+        if lyrics:
+            tags.add(USLT(encoding=3, lang="chi", desc="", text=lyrics))
+        tags.save(output)
+    elif codec == 'aac':
+        audio = MP4(output)
+        for key, value in (("\xa9nam", title), ("\xa9ART", artist), ("\xa9alb", album), ("\xa9lyr", lyrics)):
+            if value:
+                audio[key] = [value]
+        if cover:
+            kind = MP4Cover.FORMAT_PNG if cover_mime(cover) == "image/png" else MP4Cover.FORMAT_JPEG
+            audio["covr"] = [MP4Cover(cover, imageformat=kind)]
+        audio.save()
+    else:
+        # Ogg Vorbis and Opus share Vorbis comments
+        audio = File(output)
+        for key, value in (("title", title), ("artist", artist), ("album", album), ("lyrics", lyrics)):
+            if value:
+                audio[key] = value
+        if cover:
+            picture = Picture()
+            picture.type, picture.mime, picture.data = 3, cover_mime(cover), cover
+            audio["metadata_block_picture"] = [base64.b64encode(picture.write()).decode("ascii")]
+        audio.save()
+
+
+def output_paths(paths, dest, codec=DEFAULT_CODEC):
+    """
+    {source: output path} under dest, mirroring the sources' folders below
+    their common parent. Sources that would land on the same name (a.flac
+    and a.dsf) get a " (2)" suffix.
+    """
+    ext = CODECS[codec][1]
+    try:
+        base = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in paths]) if paths else ""
+    except ValueError:
+        base = None  # Different drives
+    outputs = {}
+    taken = set()
+    for path in paths:
+        rel = os.path.relpath(os.path.abspath(path), base) if base is not None else os.path.basename(path)
+        stem = os.path.splitext(rel)[0]
+        candidate, n = stem + ext, 1
+        while os.path.normcase(candidate) in taken:
+            n += 1
+            candidate = f"{stem} ({n}){ext}"
+        taken.add(os.path.normcase(candidate))
+        outputs[path] = os.path.join(dest, candidate)
+    return outputs
+
+
+class ExportManifest:
+    """
+    Finished exports in <dest>/.export_manifest.json, keyed by output path
+    relative to dest. An output is up to date when it exists and its entry
+    matches the source's size/mtime and the codec settings.
+    """
+
+    def __init__(self, dest):
+        self.dest = dest
+        self.path = os.path.join(dest, MANIFEST_NAME)
+        self.entries = {}
+        self._lock = threading.Lock()
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f).get('outputs', {})
+            except Exception as e:
+                print(f"Failed to load export manifest: {e}")
+
+    def _key(self, output):
+        return os.path.relpath(output, self.dest).replace(os.sep, '/')
+
+    @staticmethod
+    def _stamp(source, codec, bitrate):
+        st = os.stat(source)
+        return {'source': os.path.abspath(source), 'size': st.st_size, 'mtime': st.st_mtime,
+                'codec': codec, 'bitrate': bitrate}
+
+    def up_to_date(self, source, output, codec, bitrate):
+        entry = self.entries.get(self._key(output))
+        if entry is None or not os.path.exists(output):
+            return False
+        try:
+            stamp = self._stamp(source, codec, bitrate)
+        except OSError:
+            return False
+        return all(entry.get(k) == v for k, v in stamp.items())
+
+    def record(self, source, output, codec, bitrate, seconds):
+        entry = self._stamp(source, codec, bitrate)
+        entry['seconds'] = seconds
+        with self._lock:
+            self.entries[self._key(output)] = entry
+
+    def save(self):
+        with self._lock:
+            data = json.dumps({'outputs': self.entries}, indent=2, ensure_ascii=False)
+        # Replace atomically, so a kill mid-save can't lose the finished tracks
+        temp = self.path + ".tmp"
+        try:
+            with open(temp, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(temp, self.path)
+        except Exception as e:
+            print(f"Failed to save export manifest: {e}")
+
+
+def audio_seconds(path):
+    try:
+        audio = File(path)
+        return audio.info.length if audio is not None else 0.0
+    except Exception:
+        return 0.0
+
+
+def export_file(source, output, codec=DEFAULT_CODEC, bitrate=None, tags=None):
+    """
+    Transcode one file to output (through output + '.part') and copy its tags.
+    Returns the track's length in seconds. Raises CalledProcessError on ffmpeg failure.
+    """
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    part = output + ".part"
+    try:
+        subprocess.run(export_command(source, part, codec, bitrate), stdin=subprocess.DEVNULL,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True)
+        meta = (tags or MetadataManager())._extract_tags(source)
+        try:
+            copy_tags(meta, part, codec)
+        except Exception as e:
+            print(f"Failed to copy tags to {os.path.basename(output)}: {e}")
+        os.replace(part, output)
+    finally:
+        if os.path.exists(part):
+            os.remove(part)
+    return audio_seconds(output)
+
+
+def export_tracks(paths, dest, codec=DEFAULT_CODEC, bitrate=None, workers=None, progress=None,
+                  playlist_name=None, stop=None):
+    """
+    Export paths into dest with up to `workers` ffmpeg processes at once
+    (default: one per CPU). progress(done, total) is called per track; set
+    the `stop` Event to finish the running tracks and stop there.
+    Writes <playlist_name>.m3u8 next to the outputs when given.
+    Returns {'exported', 'skipped', 'failed', 'audio_seconds', 'wall_seconds', 'hours_per_minute'}.
+    """
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec {codec!r}, expected one of {', '.join(CODECS)}")
+    bitrate = bitrate or CODECS[codec][4]
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(dest, exist_ok=True)
+    outputs = output_paths(paths, dest, codec)
+    manifest = ExportManifest(dest)
+    tags = MetadataManager()
+
+    todo = [p for p in paths if not manifest.up_to_date(p, outputs[p], codec, bitrate)]
+    report = {'exported': 0, 'skipped': len(paths) - len(todo), 'failed': 0, 'audio_seconds': 0.0}
+    total = len(paths)
+    done = [report['skipped']]
+    lock = threading.Lock()
+
+    def job(source):
+        if stop.is_set():
+            return
+        try:
+            seconds = export_file(source, outputs[source], codec, bitrate, tags)
+            manifest.record(source, outputs[source], codec, bitrate, seconds)
+            error = None
+        except subprocess.CalledProcessError as e:
+            error = e.stderr.decode('utf-8', errors='ignore').strip() if e.stderr else str(e)
+        except Exception as e:
+            error = str(e)
+        with lock:
+            save = False
+            if error:
+                print(f"Export failed for {os.path.basename(source)}: {error}")
+                report['failed'] += 1
+            else:
+                report['exported'] += 1
+                report['audio_seconds'] += seconds
+                save = report['exported'] % SAVE_EVERY == 0
+            done[0] += 1
+            count = done[0]
+        if save:
+            manifest.save()
+        if progress:
+            progress(count, total)
+
+    stop = stop or threading.Event()
+    start = time.perf_counter()
+    try:
+        # Threads only wait on their ffmpeg child, so the pool size bounds the number of encoders
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            try:
+                list(pool.map(job, todo))
+            except BaseException:
+                stop.set()  # Ctrl+C: let queued jobs drop out instead of waiting for all of them
+                raise
+    finally:
+        manifest.save()
+    report['wall_seconds'] = time.perf_counter() - start
+    minutes = report['wall_seconds'] / 60
+    report['hours_per_minute'] = report['audio_seconds'] / 3600 / minutes if minutes > 0 else 0.0
+
+    if playlist_name:
+        write_m3u(os.path.join(dest, playlist_name + ".m3u8"),
+                  [outputs[p] for p in paths if os.path.exists(outputs[p])])
+    return report
+
+
+def format_report(report):
+    return (f"{report['exported']} exported, {report['skipped']} up to date, {report['failed']} failed; "
+            f"{report['audio_seconds'] / 3600:.2f} h of audio in {report['wall_seconds']:.1f} s "
+            f"({report['hours_per_minute']:.2f} audio-hours per minute)")
+
+
+if __name__ == "__main__":
+    from playlists_io import audio_files
+    parser = argparse.ArgumentParser(description="Transcode a playlist or directory for portable players")
+    parser.add_argument("sources", nargs="+", help="audio files, directories or playlist.json")
+    parser.add_argument("--to", required=True, metavar="DIR", help="destination folder")
+    parser.add_argument("--codec", choices=sorted(CODECS), default=DEFAULT_CODEC)
+    parser.add_argument("--bitrate", help="e.g. 192k (default depends on the codec)")
+    parser.add_argument("--workers", type=int, help="parallel ffmpeg processes (default: CPU count)")
+    args = parser.parse_args()
+
+    targets = audio_files(args.sources)
+    playlist_name = next((os.path.splitext(os.path.basename(arg))[0] for arg in args.sources
+                          if arg.endswith('.json')), None)
+
+    def show(done, total):
+        print(f"\r{done}/{total}", end="", flush=True)
+
+    stop = threading.Event()
+    try:
+        result = export_tracks(targets, args.to, args.codec, args.bitrate, args.workers, show, playlist_name, stop)
+    except KeyboardInterrupt:
+        stop.set()
+        print("\nInterrupted; run the same command again to resume")
+        sys.exit(1)
+    print()
+    print(format_report(result))
@@ -0,0 +1,234 @@
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from loudness import LoudnessStore, decode_pcm
+
+FP_RATE = 11025
+FP_SECONDS = 30  # Only the start of each track is decoded
+FRAME = 1024
+HOP = 512
+MIN_BIN, MAX_BIN = 28, 465  # ~300 Hz - 5 kHz, where lossy codecs keep the peaks
+PEAK_FREQ = 8  # Neighbourhood (bins / frames either side) a spectral peak must dominate
+PEAK_TIME = 4
+PEAKS_PER_FRAME = 3
+PEAK_PROMINENCE = 3.0  # Natural-log magnitude above the frame median (~26 dB)
+FAN_OUT = 4  # Later peaks paired with each anchor peak
+MAX_DT = 63  # Frames between paired peaks
+
+NUM_PERM = 64  # MinHash signature length
+BANDS, ROWS = 32, 2  # LSH banding of the signature; BANDS * ROWS == NUM_PERM
+MATCH_THRESHOLD = 0.3  # Estimated Jaccard similarity of landmark sets to call two tracks the same
+NO_LANDMARKS = ""  # Stored for silent or too-short tracks, so they count as fingerprinted
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(0x5eed)
+_PERM_A = _rng.integers(1, _PRIME, NUM_PERM, dtype=np.uint64)[:, None]
+_PERM_B = _rng.integers(0, _PRIME, NUM_PERM, dtype=np.uint64)[:, None]
+
+
+def landmarks(samples):
+    """
+    Set of landmark hashes for mono float samples at FP_RATE: pairs of
+    prominent spectral peaks encoded as (anchor bin, target bin, frame delta).
+    Absolute time is not part of the hash, so offsets and trimmed intros
+    still share most landmarks; gain changes do not move peaks at all.
+    """
+    samples = np.asarray(samples, dtype=np.float32)
+    if samples.size < FRAME:
+        return np.zeros(0, dtype=np.uint32)
+    frames = sliding_window_view(samples, FRAME)[::HOP]
+    spectrum = np.abs(np.fft.rfft(frames * np.hanning(FRAME).astype(np.float32), axis=1))[:, MIN_BIN:MAX_BIN]
+    log_spec = np.log(spectrum + 1e-6)
+
+    # Separable max filter over the (time, frequency) neighbourhood
+    padded = np.pad(log_spec, ((PEAK_TIME, PEAK_TIME), (PEAK_FREQ, PEAK_FREQ)), constant_values=-np.inf)
+    local = sliding_window_view(padded, 2 * PEAK_FREQ + 1, axis=1).max(axis=2)
+    local = sliding_window_view(local, 2 * PEAK_TIME + 1, axis=0).max(axis=2)
+    # Peaks must also stand well clear of their frame's noise floor, or added noise reshuffles them
+    floor = np.median(log_spec, axis=1, keepdims=True)
+    is_peak = (log_spec == local) & (log_spec > floor + PEAK_PROMINENCE)
+
+    # Keep the strongest few per frame
+    ranked = np.where(is_peak, log_spec, -np.inf)
+    top = np.argsort(ranked, axis=1)[:, -PEAKS_PER_FRAME:]
+    keep = np.take_along_axis(ranked, top, axis=1) > -np.inf
+    times = np.repeat(np.arange(len(ranked)), PEAKS_PER_FRAME)[keep.ravel()]
+    bins = top.ravel()[keep.ravel()]
+    if times.size < 2:
+        return np.zeros(0, dtype=np.uint32)
+
+    hashes = []
+    for k in range(1, FAN_OUT + 1):
+        dt = times[k:] - times[:-k]
+        ok = (dt > 0) & (dt <= MAX_DT)
+        f1 = bins[:-k][ok] >> 1
+        f2 = bins[k:][ok] >> 1
+        # Halving dt absorbs the +-1 frame jitter a sub-hop offset puts on peak times
+        hashes.append((f1.astype(np.uint32) << 14) | (f2.astype(np.uint32) << 6) | (dt[ok] >> 1).astype(np.uint32))
+    return np.unique(np.concatenate(hashes))
+
+
+def minhash(hashes):
+    """NUM_PERM-long MinHash signature of a landmark set, or None if the set is empty."""
+    if len(hashes) == 0:
+        return None
+    values = (_PERM_A * hashes.astype(np.uint64)[None, :] + _PERM_B) % _PRIME
+    return values.min(axis=1).astype(np.uint32)
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of the landmark sets behind two signatures."""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+def fingerprint_file(file_path, seconds=FP_SECONDS):
+    samples = decode_pcm(file_path, rate=FP_RATE, channels=1, seconds=seconds)[:, 0]
+    return minhash(landmarks(samples))
+
+
+def _fingerprint_job(file_path):
+    try:
+        return file_path, fingerprint_file(file_path), None
+    except Exception as e:
+        return file_path, None, str(e)
+
+
+class FingerprintIndex:
+    """
+    LSH index over MinHash signatures: each signature is cut into BANDS
+    bands of ROWS values and two tracks become candidates when any band
+    matches exactly, so a lookup touches a few buckets instead of the whole
+    library. Candidates are then confirmed with the full signature.
+    """
+
+    def __init__(self, bands=BANDS, rows=ROWS):
+        self.bands = bands
+        self.rows = rows
+        self.signatures = {}
+        self._buckets = [{} for _ in range(bands)]
+
+    def _keys(self, signature):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, key, signature):
+        self.signatures[key] = signature
+        for band, bucket in self._keys(signature):
+            self._buckets[band].setdefault(bucket, []).append(key)
+
+    def candidates(self, signature):
+        found = set()
+        for band, bucket in self._keys(signature):
+            found.update(self._buckets[band].get(bucket, ()))
+        return found
+
+    def query(self, signature, threshold=MATCH_THRESHOLD):
+        """[(key, similarity)] of indexed tracks matching signature, best first."""
+        matches = [(key, similarity(signature, self.signatures[key])) for key in self.candidates(signature)]
+        return sorted([m for m in matches if m[1] >= threshold], key=lambda m: -m[1])
+
+    def clusters(self, threshold=MATCH_THRESHOLD):
+        """Groups (lists of keys, largest first) of tracks that match each other, transitively."""
+        keys = list(self.signatures)
+        index_of = {key: i for i, key in enumerate(keys)}
+        parent = list(range(len(keys)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        checked = set()
+        for bands in self._buckets:
+            for members in bands.values():
+                if len(members) < 2:
+                    continue
+                for i, a in enumerate(members):
+                    for b in members[i + 1:]:
+                        pair = (a, b) if index_of[a] < index_of[b] else (b, a)
+                        if pair in checked:
+                            continue
+                        checked.add(pair)
+                        if similarity(self.signatures[a], self.signatures[b]) >= threshold:
+                            parent[find(index_of[a])] = find(index_of[b])
+
+        groups = {}
+        for i, key in enumerate(keys):
+            groups.setdefault(find(i), []).append(key)
+        return sorted([g for g in groups.values() if len(g) > 1], key=len, reverse=True)
+
+
+class FingerprintStore(LoudnessStore):
+    """Signatures (hex) in cache/fingerprints.json, invalidated by size/mtime."""
+
+    label = "fingerprint"
+
+    def __init__(self, path=os.path.join("cache", "fingerprints.json")):
+        super().__init__(path)
+
+    def signature(self, file_path):
+        """Cached signature, NO_LANDMARKS for a track known to have none, None if not cached."""
+        entry = self.get(file_path)
+        if entry is None or entry.get('signature') is None:
+            return None
+        if entry['signature'] == NO_LANDMARKS:
+            return NO_LANDMARKS
+        return np.frombuffer(bytes.fromhex(entry['signature']), dtype='<u4')
+
+    def put_signature(self, file_path, signature):
+        self.put(file_path, {'signature': signature.astype('<u4').tobytes().hex() if signature is not None else NO_LANDMARKS})
+
+
+def fingerprint_many(paths, store=None, workers=None, progress=None):
+    """
+    Fingerprint paths in a process pool (cached ones come from store) and
+    return {path: signature}. progress(done, total) is called per track.
+    """
+    signatures = {}
+    todo = []
+    for path in paths:
+        signature = store.signature(path) if store is not None else None
+        if signature is None:
+            todo.append(path)
+        elif signature is not NO_LANDMARKS:
+            signatures[path] = signature
+    total = len(paths)
+    done = total - len(todo)
+    if not todo:
+        return signatures
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for path, signature, error in pool.map(_fingerprint_job, todo, chunksize=4):
+            done += 1
+            if error:
+                print(f"Fingerprinting failed for {os.path.basename(path)}: {error}")
+            elif signature is not None:
+                signatures[path] = signature
+            if store is not None and not error:
+                store.put_signature(path, signature)
+            if progress:
+                progress(done, total)
+    if store is not None:
+        store.save()
+    return signatures
+
+
+def find_duplicates(paths, store=None, workers=None, progress=None, threshold=MATCH_THRESHOLD):
+    """Duplicate clusters (lists of paths, largest first) among paths."""
+    index = FingerprintIndex()
+    for path, signature in fingerprint_many(paths, store, workers, progress).items():
+        index.add(path, signature)
+    return index.clusters(threshold)
+
+
+if __name__ == "__main__":
+    # Usage: python fingerprint.py <file, directory or playlist.json>...
+    from playlists_io import audio_files
+    clusters = find_duplicates(audio_files(sys.argv[1:]), FingerprintStore())
+    for n, cluster in enumerate(clusters, 1):
+        print(f"#{n}")
+        for path in cluster:
+            print(f"    {path}")
+    print(f"{len(clusters)} duplicate group(s)")
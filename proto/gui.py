@@ -5,22 +5,56 @@ import time
 import threading
 import re
 import json
-from PIL import Image, ImageTk
-from player import MusicPlayer
-from metadata import MetadataManager
-from mutagen import File
+from library import Library
+from scanner import LibraryScanner
+from staging import StagingCache
+from seekbar import WaveformSeekBar
+from lrc import parse_lrc, lyric_index
+from history import PlayHistory, START
+from smartlist import SmartPlaylists, RuleError
+from playlists_io import split_virtual, is_virtual, display_name
+from playqueue import PlayQueue, REPEAT_MODES
+import tracing
+
+# pygame, numpy, PIL, mutagen and requests are imported by _warm_up() after the
+# window is up, or on first use; keep them out of this module's imports
+
+IMPORT_BATCH = 500  # Playlist entries handed to the Tk thread at a time
+LIBRARY_WATCH_INTERVAL = 60  # Seconds between background rescans of library roots
+STAGING_LOOKAHEAD = 2  # Number of upcoming tracks copied locally from slow/remote storage
+REPEAT_LABELS = {'all': "循环: 全部", 'one': "循环: 单曲", 'off': "循环: 关闭"}
 
 class MusicPlayerGUI:
-    def __init__(self, root):
+    def __init__(self, root, engine="pygame", crossfade=0.0, output="device"):
         self.root = root
         self.root.title("Python 音乐播放器")
         self.root.geometry("900x600")
 
-        self.player = MusicPlayer()
-        self.metadata_manager = MetadataManager()
-        self.playlist = []
-        self.current_index = -1
+        self.engine = engine
+        self.crossfade = crossfade
+        self.output = output  # "device", "null" or a .wav path (see audio_backend.py)
+        # Player, metadata and analysis caches are built by _warm_up() on a background
+        # thread; the properties below wait for it, so early clicks just block briefly
+        self._ready = threading.Event()
+        self._player = None
+        self._metadata_manager = None
+        self._waveform_cache = None
+        self._loudness_store = None
+        self._fingerprint_store = None
+        self.library = Library()
+        self.scanner = LibraryScanner()
+        self.history = PlayHistory()
+        self.smartlists = SmartPlaylists(self.library)  # Kept current as tracks are added or enriched
+        self._now_playing = None  # Track id whose play will be logged as completed or skipped
+        # CUE tracks are a slice of their file: positions shown and seeked are relative to track_offset
+        self.track_offset = 0.0
+        self.track_end = None
+        # Track ids into self.library in display order, plus shuffle/repeat/up-next;
+        # current_index is derived from the queue's current track
+        self.playlist = PlayQueue()
         self.current_duration = 0
+        self.queued_track_id = None  # Track handed to the engine for a gapless transition
+        self.queued_duration = 0
         self.parsed_lyrics = []  # List of (timestamp, line_text)
         self.active_lyric_index = -1
         self.is_seeking = False  # Flag to prevent update loop from fighting with user dragging
@@ -31,22 +65,109 @@ class MusicPlayerGUI:
         self.artist_label = None
         self.lyrics_text = None
         self.default_cover = None
+        self.spectrum_view = None
+        self.spectrum = None
         
         self.create_widgets()
         
         # Load default cover placeholder (optional, or just use blank)
         self.create_default_cover()
-
-        # Update progress loop
-        self.root.after(200, self.update_status)
         
         # Load saved playlist state
         self.load_playlist_state()
 
+        # Heavy imports and audio setup happen once the window has been drawn
+        self.root.after(1, lambda: threading.Thread(target=self._warm_up, daemon=True).start())
+
+        # Pick up changes in registered library roots in the background
+        if self.scanner.roots:
+            self.root.after(1000, self.rescan_library)
+        self.scanner.start_watch(LIBRARY_WATCH_INTERVAL, lambda delta: self.root.after(0, self.apply_scan_delta, delta))
+
+    def _warm_up(self):
+        try:
+            from metadata import MetadataManager
+            from waveform import WaveformCache
+            from loudness import LoudnessStore
+            from PIL import ImageTk  # noqa: F401 - first cover shown shouldn't pay for it
+            # "pcm" decodes everything through ffmpeg into our own buffer (see pcm_engine.py)
+            if self.engine == "pcm":
+                from pcm_engine import PCMPlayer
+                from audio_backend import make_sink
+                self._player = PCMPlayer(sink=make_sink(self.output), staging=StagingCache(), crossfade=self.crossfade)
+            else:
+                from player import MusicPlayer
+                from audio_backend import make_backend
+                self._player = MusicPlayer(staging=StagingCache(), backend=make_backend(self.output))
+            self._metadata_manager = MetadataManager()
+            self._waveform_cache = WaveformCache()
+            self._loudness_store = LoudnessStore()
+        except Exception as e:
+            print(f"Startup failed: {e}")
+        finally:
+            self._ready.set()
+        self.root.after(0, self._on_ready)
+
+    def _on_ready(self):
+        if self._player is None:
+            messagebox.showerror("错误", "播放器初始化失败。")
+            return
+        from dsp import PRESETS, DEFAULT_PRESET
+        self.eq_box.config(values=list(PRESETS), state="readonly")
+        self.eq_var.set(DEFAULT_PRESET)
+        self._player.set_volume(float(self.vol_scale.get()) / 100)
+
+        # The spectrum needs the decoded output, which only the PCM engine has
+        if hasattr(self._player, 'played_frames'):
+            from spectrum import SpectrumAnalyzer, SpectrumView
+            self.spectrum_view = SpectrumView(self.right_frame, height=60)
+            self.spectrum_view.pack(side=tk.TOP, fill=tk.X, pady=(0, 5), after=self.top_info_frame)
+            self.spectrum = SpectrumAnalyzer(self._player, lambda callback: self.root.after(0, callback),
+                                             self.spectrum_view.set_heights)
+
+        # Update progress loop
+        self.update_status()
+
+    @property
+    def player(self):
+        self._ready.wait()
+        return self._player
+
+    @property
+    def metadata_manager(self):
+        self._ready.wait()
+        return self._metadata_manager
+
+    @property
+    def waveform_cache(self):
+        self._ready.wait()
+        return self._waveform_cache
+
+    @property
+    def loudness_store(self):
+        self._ready.wait()
+        return self._loudness_store
+
+    @property
+    def current_index(self):
+        """Display position of the current track, -1 if none."""
+        return self.playlist.position()
+
+    @current_index.setter
+    def current_index(self, index):
+        self.playlist.set_current(self.playlist[index] if index != -1 else None)
+
+    @property
+    def fingerprint_store(self):
+        if self._fingerprint_store is None:
+            from fingerprint import FingerprintStore
+            self._fingerprint_store = FingerprintStore()
+        return self._fingerprint_store
+
     def create_default_cover(self):
-        # Create a simple gray placeholder
-        img = Image.new('RGB', (200, 200), color = (73, 109, 137))
-        self.default_cover = ImageTk.PhotoImage(img)
+        # Create a simple gray placeholder (a plain PhotoImage; PIL isn't loaded yet)
+        self.default_cover = tk.PhotoImage(width=200, height=200)
+        self.default_cover.put("#496d89", to=(0, 0, 200, 200))
         if self.cover_label:
             self.cover_label.config(image=self.default_cover)
 
@@ -80,6 +201,15 @@ class MusicPlayerGUI:
         ttk.Button(playlist_controls, text="+ 添加", command=self.add_files, width=8).pack(side=tk.LEFT, padx=2)
         ttk.Button(playlist_controls, text="+ 目录", command=self.add_directory, width=8).pack(side=tk.LEFT, padx=2)
         ttk.Button(playlist_controls, text="- 删除", command=self.remove_file, width=8).pack(side=tk.LEFT, padx=2)
+        ttk.Button(playlist_controls, text="下一首播放", command=self.play_selected_next, width=10).pack(side=tk.LEFT, padx=2)
+        ttk.Button(playlist_controls, text="导入列表", command=self.import_playlist, width=8).pack(side=tk.LEFT, padx=2)
+        ttk.Button(playlist_controls, text="保存列表", command=self.save_playlist_file, width=8).pack(side=tk.LEFT, padx=2)
+        ttk.Button(playlist_controls, text="重新扫描", command=self.rescan_library, width=8).pack(side=tk.LEFT, padx=2)
+        ttk.Button(playlist_controls, text="响度分析", command=self.analyze_loudness, width=8).pack(side=tk.LEFT, padx=2)
+        ttk.Button(playlist_controls, text="查找重复", command=self.find_duplicate_tracks, width=8).pack(side=tk.LEFT, padx=2)
+        ttk.Button(playlist_controls, text="导出", command=self.export_playlist, width=8).pack(side=tk.LEFT, padx=2)
+        ttk.Button(playlist_controls, text="写入标签", command=self.write_back_tags, width=8).pack(side=tk.LEFT, padx=2)
+        ttk.Button(playlist_controls, text="智能列表", command=self.show_smart_playlists, width=8).pack(side=tk.LEFT, padx=2)
         ttk.Button(playlist_controls, text="清空", command=self.clear_playlist, width=8).pack(side=tk.LEFT, padx=2)
         ttk.Button(playlist_controls, text="从磁盘删除", command=self.delete_selected_from_disk, width=10).pack(side=tk.LEFT, padx=2)
 
@@ -90,6 +220,8 @@ class MusicPlayerGUI:
         # Top: Cover Art and Info (Pack FIRST)
         top_info_frame = ttk.Frame(right_frame)
         top_info_frame.pack(side=tk.TOP, fill=tk.X, pady=10)
+        # _on_ready() may insert the spectrum view below this frame
+        self.right_frame, self.top_info_frame = right_frame, top_info_frame
 
         # Cover Image
         self.cover_label = ttk.Label(top_info_frame, text="无封面")
@@ -127,9 +259,9 @@ class MusicPlayerGUI:
         self.time_label = ttk.Label(status_frame, textvariable=self.time_var, font=('Arial', 9))
         self.time_label.pack(side=tk.RIGHT)
 
-        # Progress Bar
+        # Progress Bar (waveform peaks are filled in once generated)
         self.progress_var = tk.DoubleVar()
-        self.progress_scale = ttk.Scale(controls_container, from_=0, to=100, orient=tk.HORIZONTAL, variable=self.progress_var, command=self.on_seek_drag)
+        self.progress_scale = WaveformSeekBar(controls_container, variable=self.progress_var, command=self.on_seek_drag)
         self.progress_scale.pack(fill=tk.X, pady=5)
         self.progress_scale.bind("<ButtonRelease-1>", self.on_seek_release)
         self.progress_scale.bind("<ButtonPress-1>", self.on_seek_press)
@@ -148,6 +280,12 @@ class MusicPlayerGUI:
         self.play_btn.grid(row=0, column=2, padx=5)
         ttk.Button(btns_frame, text="⏹ 停止", command=self.stop_song, width=8).grid(row=0, column=3, padx=5)
         ttk.Button(btns_frame, text="⏭ 下一首", command=self.next_song, width=8).grid(row=0, column=4, padx=5)
+        order_frame = ttk.Frame(btns_frame)
+        order_frame.grid(row=0, column=5, padx=5)
+        self.shuffle_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(order_frame, text="随机", variable=self.shuffle_var, command=self.toggle_shuffle).pack(side=tk.LEFT)
+        self.repeat_btn = ttk.Button(order_frame, text=REPEAT_LABELS[self.playlist.repeat], command=self.cycle_repeat, width=8)
+        self.repeat_btn.pack(side=tk.LEFT, padx=2)
 
         # Volume (Right Aligned)
         vol_frame = ttk.Frame(btns_frame)
@@ -158,6 +296,13 @@ class MusicPlayerGUI:
         self.vol_scale.set(50)
         self.vol_scale.pack(side=tk.LEFT, padx=5)
 
+        ttk.Label(vol_frame, text="均衡器:").pack(side=tk.LEFT, padx=(10, 0))
+        self.eq_var = tk.StringVar()
+        # Presets are filled in by _on_ready(), once dsp/numpy are loaded
+        self.eq_box = ttk.Combobox(vol_frame, textvariable=self.eq_var, state="disabled", width=8)
+        self.eq_box.bind("<<ComboboxSelected>>", self.set_eq_preset)
+        self.eq_box.pack(side=tk.LEFT, padx=5)
+
         # Middle: Lyrics (Pack LAST, fill=BOTH, expand=True)
         # This takes up all remaining space between Top Info and Bottom Controls
         lyrics_frame = ttk.LabelFrame(right_frame, text="歌词")
@@ -177,8 +322,12 @@ class MusicPlayerGUI:
     def save_playlist_state(self):
         """Save current playlist and index to JSON file."""
         state = {
-            'playlist': self.playlist,
-            'current_index': self.current_index
+            'playlist': self.library.paths(self.playlist),
+            'current_index': self.current_index,
+            'shuffle': self.playlist.shuffle,
+            'repeat': self.playlist.repeat,
+            'up_next': self.library.paths(self.playlist.up_next),
+            'smart_playlists': self.smartlists.definitions()
         }
         try:
             with open('playlist.json', 'w', encoding='utf-8') as f:
@@ -195,19 +344,22 @@ class MusicPlayerGUI:
             with open('playlist.json', 'r', encoding='utf-8') as f:
                 state = json.load(f)
                 
+            self.smartlists.load(state.get('smart_playlists', []))
             playlist_files = state.get('playlist', [])
             saved_index = state.get('current_index', -1)
             
             # Verify files exist before adding
             valid_files = []
             for file_path in playlist_files:
-                if os.path.exists(file_path):
+                if os.path.exists(split_virtual(file_path)[0]):
                     valid_files.append(file_path)
             
+            if state.get('repeat') in REPEAT_MODES:
+                self.playlist.repeat = state['repeat']
+                self.repeat_btn.config(text=REPEAT_LABELS[self.playlist.repeat])
             if valid_files:
-                self.playlist = valid_files
-                for file in self.playlist:
-                    self.playlist_box.insert(tk.END, os.path.basename(file))
+                self.playlist.replace(self.library.add(file) for file in valid_files)
+                self.playlist_box.insert(tk.END, *[display_name(p) for p in self.library.paths(self.playlist)])
                 
                 # Restore selection if valid
                 if 0 <= saved_index < len(self.playlist):
@@ -216,7 +368,14 @@ class MusicPlayerGUI:
                     self.playlist_box.activate(saved_index)
                     # Optional: Auto-load metadata for the last played song without playing
                     # self.load_metadata_basic(self.playlist[saved_index])
-                    
+                for file in state.get('up_next', []):
+                    track_id = self.library.find(file)
+                    if track_id is not None:
+                        self.playlist.play_next(track_id)
+                if state.get('shuffle'):
+                    self.playlist.set_shuffle(True)
+                    self.shuffle_var.set(True)
+
         except Exception as e:
             print(f"Failed to load playlist state: {e}")
 
@@ -227,52 +386,171 @@ class MusicPlayerGUI:
         ]
         files = filedialog.askopenfilenames(filetypes=file_types)
         for file in files:
-            self.playlist.append(file)
-            self.playlist_box.insert(tk.END, os.path.basename(file))
+            if self.playlist.append(self.library.add(file)):
+                self.playlist_box.insert(tk.END, os.path.basename(file))
         self.save_playlist_state()
 
     def add_directory(self):
         directory = filedialog.askdirectory()
         if directory:
-            supported_extensions = ('.mp3', '.flac', '.m4a', '.wav', '.ogg', '.dsf')
-            added_count = 0
-            for root, dirs, files in os.walk(directory):
-                for file in files:
-                    if file.lower().endswith(supported_extensions):
-                        full_path = os.path.join(root, file)
-                        # Avoid duplicates (optional check, can be slow for large lists but good for UX)
-                        if full_path not in self.playlist:
-                            self.playlist.append(full_path)
-                            self.playlist_box.insert(tk.END, file)
-                            added_count += 1
-            
+            # Registers the directory as a library root so later rescans are incremental
+            added_count = self._add_paths(self.scanner.add_root(directory))
             if added_count > 0:
                 self.save_playlist_state()
                 messagebox.showinfo("成功", f"从目录添加了 {added_count} 首歌曲。")
             else:
                 messagebox.showinfo("提示", "所选目录中未找到支持的音乐文件。")
 
+    def _audio_files(self):
+        """Distinct audio files behind the playlist (CUE tracks share theirs)."""
+        return list(dict.fromkeys(split_virtual(p)[0] for p in self.library.paths(self.playlist)))
+
+    def import_playlist(self):
+        path = filedialog.askopenfilename(filetypes=[("播放列表", "*.m3u *.m3u8 *.pls *.cue"), ("所有文件", "*.*")])
+        if not path:
+            return
+        # The parser streams on a worker; the Tk thread adds one batch at a time, and the
+        # worker waits once two batches are queued so a huge file isn't buffered whole
+        slots = threading.Semaphore(2)
+        counts = {'added': 0, 'missing': 0}
+
+        def run():
+            from playlists_io import read_playlist
+            batch = []
+            try:
+                for entry in read_playlist(path):
+                    if not os.path.exists(entry.path):
+                        counts['missing'] += 1
+                        continue
+                    batch.append(entry)
+                    if len(batch) >= IMPORT_BATCH:
+                        slots.acquire()
+                        self.root.after(0, self._add_import_batch, batch, slots, counts)
+                        batch = []
+            except Exception as e:
+                self.root.after(0, messagebox.showerror, "错误", f"无法读取播放列表:\n{e}")
+            slots.acquire()
+            self.root.after(0, self._add_import_batch, batch, slots, counts, True)
+
+        self.status_var.set(f"导入: {os.path.basename(path)}")
+        threading.Thread(target=run, daemon=True).start()
+
+    def _add_import_batch(self, entries, slots, counts, last=False):
+        names = []
+        for entry in entries:
+            location = entry.location
+            if self.library.find(location) is not None:
+                continue
+            track_id = self.library.add(location)
+            self.playlist.append(track_id)
+            if entry.title or entry.artist or entry.duration:
+                self.library.update(track_id, {'title': entry.title, 'artist': entry.artist}, duration=entry.duration)
+            names.append(entry.title or display_name(location))
+        if names:
+            self.playlist_box.insert(tk.END, *names)
+        counts['added'] += len(names)
+        slots.release()
+        if last:
+            self.save_playlist_state()
+            missing = f", {counts['missing']} 个文件不存在" if counts['missing'] else ""
+            self.status_var.set(f"导入完成: {counts['added']} 首{missing}")
+        else:
+            self.status_var.set(f"导入中: {counts['added']} 首")
+
+    def save_playlist_file(self):
+        path = filedialog.asksaveasfilename(defaultextension=".m3u8",
+                                            filetypes=[("M3U8", "*.m3u8"), ("M3U", "*.m3u"), ("PLS", "*.pls")])
+        if not path:
+            return
+        from playlists_io import PlaylistEntry, write_playlist
+
+        def entries():
+            for track_id in self.playlist:
+                location = self.library.path(track_id)
+                track = self.library.get(track_id)
+                file_path, start, end = split_virtual(location)
+                yield PlaylistEntry(file_path, track.title, track.artist, track.duration or None,
+                                    start if location != file_path else None, end)
+
+        try:
+            count = write_playlist(path, entries())
+            self.status_var.set(f"已保存 {count} 首到 {os.path.basename(path)}")
+        except Exception as e:
+            messagebox.showerror("错误", f"保存失败:\n{e}")
+
+    def _add_paths(self, paths):
+        names = []
+        for full_path in paths:
+            # Avoid duplicates
+            if self.library.find(full_path) is None:
+                self.playlist.append(self.library.add(full_path))
+                names.append(os.path.basename(full_path))
+        if names:
+            self.playlist_box.insert(tk.END, *names)
+        return len(names)
+
+    def rescan_library(self):
+        if not self.scanner.roots:
+            return
+        threading.Thread(target=lambda: self.root.after(0, self.apply_scan_delta, self.scanner.rescan()), daemon=True).start()
+
+    def apply_scan_delta(self, delta):
+        if not delta:
+            return
+        for path in delta.modified:
+            track_id = self.library.find(path)
+            if track_id is not None:
+                self.library.reset(track_id)
+
+        removed = set()
+        for path in delta.removed:
+            track_id = self.library.find(path)
+            if track_id is not None:
+                removed.add(track_id)
+        if removed:
+            if self.playlist.current in removed:
+                self.stop_song()
+            for track_id in removed:
+                self.playlist.remove(track_id)
+                self.library.remove(track_id)
+            self._requeue()
+            self.playlist_box.delete(0, tk.END)
+            self.playlist_box.insert(tk.END, *[display_name(p) for p in self.library.paths(self.playlist)])
+
+        self._add_paths(delta.added)
+        self.save_playlist_state()
+
     def remove_file(self):
         selection = self.playlist_box.curselection()
         if selection:
             index = selection[0]
-            self.playlist_box.delete(index)
-            self.playlist.pop(index)
-            if index < self.current_index:
-                self.current_index -= 1
-            elif index == self.current_index:
+            track_id = self.playlist[index]
+            if track_id == self.playlist.current:
                 self.stop_song()
-                self.current_index = -1
+            self.playlist_box.delete(index)
+            self.playlist.remove(track_id)
+            self.library.remove(track_id)
+            self._requeue()
             self.save_playlist_state()
 
+    def play_selected_next(self):
+        selection = self.playlist_box.curselection()
+        if selection:
+            track_id = self.playlist[selection[0]]
+            self.playlist.play_next(track_id)
+            self.status_var.set(f"下一首播放: {display_name(self.library.path(track_id))}")
+            self._requeue()
+
     def delete_selected_from_disk(self):
         selection = self.playlist_box.curselection()
         if not selection:
             messagebox.showinfo("提示", "请先选择要删除的歌曲。")
             return
         index = selection[0]
-        file_path = self.playlist[index]
-        playing_current = (index == self.current_index)
+        track_id = self.playlist[index]
+        file_path = self.library.path(track_id)
+        playing_current = track_id == self.playlist.current
+        following = self.playlist.peek_next(manual=True) if playing_current else None
         if playing_current:
             self.player.stop()
         try:
@@ -282,22 +560,21 @@ class MusicPlayerGUI:
             messagebox.showerror("错误", f"删除失败:\n{e}")
             return
         self.playlist_box.delete(index)
-        self.playlist.pop(index)
-        if index < self.current_index:
-            self.current_index -= 1
-        elif playing_current:
-            if self.playlist:
-                next_idx = index if index < len(self.playlist) else 0
-                self.play_index(next_idx)
+        self.playlist.remove(track_id)
+        self.library.remove(track_id)
+        if playing_current:
+            if following in self.playlist:
+                self.play_index(self.playlist.index(following))
             else:
-                self.current_index = -1
                 self.stop_song()
+        else:
+            self._requeue()
         self.save_playlist_state()
     def clear_playlist(self):
         self.stop_song()
-        self.playlist = []
+        self.playlist.clear()
+        self.library.clear()
         self.playlist_box.delete(0, tk.END)
-        self.current_index = -1
         self.save_playlist_state()
 
     def play_selected(self, event=None):
@@ -310,54 +587,356 @@ class MusicPlayerGUI:
         if 0 <= index < len(self.playlist):
             self.current_index = index
             self.save_playlist_state()  # Save current playing index
-            file_path = self.playlist[index]
+            track_id = self.playlist[index]
+            file_path, start, end = split_virtual(self.library.path(track_id))
+            previous_file = self.player.current_file
+            self._end_play()
             
             try:
-                duration = self.player.load_file(file_path)
-                self.current_duration = duration if duration else 0
-                
-                self.player.play()
-                self.play_btn.config(text="⏸ 暂停")
-                self.status_var.set(f"正在播放")
-                
-                # Highlight in listbox
-                self.playlist_box.selection_clear(0, tk.END)
-                self.playlist_box.selection_set(index)
-                self.playlist_box.activate(index)
-                
-                # Reset metadata UI temporarily
-                self.title_label.config(text=os.path.basename(file_path))
-                self.artist_label.config(text="加载信息中...")
-                self.album_label.config(text="")
-                self.cover_label.config(image=self.default_cover)
-                self.lyrics_text.config(state=tk.NORMAL)
-                self.lyrics_text.delete(1.0, tk.END)
-                self.lyrics_text.insert(tk.END, "加载歌词中...")
-                self.lyrics_text.config(state=tk.DISABLED)
-                
-                self.parsed_lyrics = []
-                self.active_lyric_index = -1
-                
-                # First load basic metadata (local file only) to show something immediately
-                self.load_metadata_basic(file_path)
+                # From the click until audio is playing and local metadata is on screen
+                with tracing.track_change(track_id):
+                    duration = self.player.load_file(file_path)
+                    self.stage_upcoming(index, previous_file)
+                    loudness = self.loudness_store.get(file_path)
+                    self.player.set_track_gain(loudness['gain'] if loudness else 0.0)
 
-                # Start thread to fetch advanced metadata (network)
-                threading.Thread(target=self.load_metadata_network, args=(file_path,), daemon=True).start()
+                    self.player.play()
+                    self.track_offset, self.track_end = start, end
+                    if start:
+                        self.player.seek(start)
+                    if duration:
+                        duration = (end or duration) - start
+                    self.play_btn.config(text="⏸ 暂停")
+                    self.status_var.set(f"正在播放")
+                    self._start_play(track_id)
+                    self.show_track(index, duration)
+                    self.queue_following(index)
                 
             except Exception as e:
                 messagebox.showerror("错误", f"无法播放文件:\n{os.path.basename(file_path)}\n\n错误: {str(e)}")
 
-    def load_metadata_basic(self, file_path):
+    def queue_following(self, index):
+        # Engines that can splice tracks get the next one decoded ahead of time
+        self.queued_track_id = None
+        if not hasattr(self.player, 'queue_next'):
+            return
+        track_id = self.playlist.peek_next()
+        file_path = self.library.path(track_id) if track_id is not None else None
+        # Nothing follows (repeat off on the last track), or CUE tracks, which go through
+        # play_index because splicing would play the whole file: drop what was queued before
+        if file_path is None or is_virtual(file_path) or is_virtual(self.library.path(self.playlist[index])):
+            self.player.clear_next()
+            return
+        try:
+            loudness = self.loudness_store.get(file_path)
+            self.queued_duration = self.player.queue_next(file_path, loudness['gain'] if loudness else 0.0)
+            self.queued_track_id = track_id
+        except Exception as e:
+            print(f"Failed to queue next track: {e}")
+            self.player.clear_next()
+
+    def on_track_advanced(self):
+        # The engine has already moved on to the queued track; only the UI has to follow
+        if self.queued_track_id not in self.playlist:
+            return
+        previous_file = self.library.path(self.playlist[self.current_index]) if self.current_index != -1 else None
+        index = self.playlist.index(self.queued_track_id)
+        self._end_play(ended=True)
+        with tracing.track_change(self.queued_track_id, gapless=True):
+            self.track_offset, self.track_end = 0.0, None
+            self._start_play(self.queued_track_id)
+            self.current_index = index
+            self.save_playlist_state()
+            self.stage_upcoming(index, previous_file)
+            self.show_track(index, self.queued_duration)
+            self.queue_following(index)
+
+    def _start_play(self, track_id):
+        self._now_playing = track_id
+        self.history.record(START, self.library.path(track_id), self.library.get(track_id).artist)
+
+    def _end_play(self, ended=False):
+        """Log how far the current track got before it ended, was replaced or stopped."""
+        track_id, self._now_playing = self._now_playing, None
+        if track_id is None or track_id not in self.library:
+            return
+        if ended:
+            completion = 1.0
+        elif self.current_duration > 0:
+            completion = min(1.0, max(0.0, self.player.get_position() - self.track_offset) / self.current_duration)
+        else:
+            completion = 0.0
+        # Metadata (and so the artist) has been loaded by the time a track ends
+        self.history.finish(self.library.path(track_id), completion, self.library.get(track_id).artist)
+
+    def show_track(self, index, duration):
+        """Point the UI (listbox, labels, lyrics, waveform, metadata) at playlist[index]."""
+        track_id = self.playlist[index]
+        location = self.library.path(track_id)
+        file_path = split_virtual(location)[0]
+        self.current_duration = duration if duration else 0
+        self.library.update(track_id, duration=duration)
+
+        # Highlight in listbox
+        self.playlist_box.selection_clear(0, tk.END)
+        self.playlist_box.selection_set(index)
+        self.playlist_box.activate(index)
+        
+        # Reset metadata UI temporarily
+        self.title_label.config(text=display_name(location))
+        self.artist_label.config(text="加载信息中...")
+        self.album_label.config(text="")
+        self.cover_label.config(image=self.default_cover)
+        self.lyrics_text.config(state=tk.NORMAL)
+        self.lyrics_text.delete(1.0, tk.END)
+        self.lyrics_text.insert(tk.END, "加载歌词中...")
+        self.lyrics_text.config(state=tk.DISABLED)
+        
+        self.parsed_lyrics = []
+        self.active_lyric_index = -1
+        
+        # Waveform peaks come from the cache or a background decode
+        self.progress_scale.set_peaks(None)
+        if location == file_path:  # A CUE track is only part of the file's waveform
+            self.waveform_cache.request(file_path, lambda path, peaks: self.root.after(0, self.on_peaks_ready, path, peaks))
+
+        # First load basic metadata (local file only) to show something immediately
+        self.load_metadata_basic(track_id, file_path)
+
+        # Start thread to fetch advanced metadata (network)
+        threading.Thread(target=self.load_metadata_network, args=(track_id, file_path), daemon=True).start()
+
+    def analyze_loudness(self):
+        paths = self.loudness_store.missing(self._audio_files())
+        if not paths:
+            self.status_var.set("响度分析: 已全部完成")
+            return
+
+        def progress(done, total):
+            self.root.after(0, self.status_var.set, f"响度分析: {done}/{total}")
+
+        def run():
+            from loudness import analyze_many
+            analyze_many(paths, self.loudness_store, progress=progress)
+            if self.player.current_file:
+                loudness = self.loudness_store.get(self.player.current_file)
+                if loudness:
+                    self.root.after(0, self.player.set_track_gain, loudness['gain'])
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def find_duplicate_tracks(self):
+        paths = self._audio_files()
+        if len(paths) < 2:
+            return
+
+        def progress(done, total):
+            self.root.after(0, self.status_var.set, f"查找重复: {done}/{total}")
+
+        def run():
+            from fingerprint import find_duplicates
+            clusters = find_duplicates(paths, self.fingerprint_store, progress=progress)
+            self.root.after(0, self.show_duplicates, clusters)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def export_playlist(self):
+        paths = [p for p in self._audio_files() if os.path.exists(p)]
+        if not paths:
+            return
+        from export import CODECS, DEFAULT_CODEC
+
+        win = tk.Toplevel(self.root)
+        win.title("导出")
+        win.resizable(False, False)
+        form = ttk.Frame(win, padding="10")
+        form.pack(fill=tk.BOTH)
+        ttk.Label(form, text="格式:").grid(row=0, column=0, sticky=tk.W, pady=2)
+        codec_var = tk.StringVar(value=DEFAULT_CODEC)
+        codec_box = ttk.Combobox(form, textvariable=codec_var, values=list(CODECS), state="readonly", width=10)
+        codec_box.grid(row=0, column=1, padx=5, pady=2)
+        ttk.Label(form, text="码率:").grid(row=1, column=0, sticky=tk.W, pady=2)
+        bitrate_var = tk.StringVar(value=CODECS[DEFAULT_CODEC][4])
+        ttk.Combobox(form, textvariable=bitrate_var, values=["96k", "128k", "160k", "192k", "256k", "320k"],
+                     width=10).grid(row=1, column=1, padx=5, pady=2)
+        # Each codec starts from its own default bitrate
+        codec_box.bind("<<ComboboxSelected>>", lambda event: bitrate_var.set(CODECS[codec_var.get()][4]))
+
+        def start():
+            codec, bitrate = codec_var.get(), bitrate_var.get().strip() or None
+            win.destroy()
+            dest = filedialog.askdirectory(title="选择导出目录")
+            if dest:
+                self._run_export(paths, dest, codec, bitrate)
+
+        ttk.Button(form, text="导出...", command=start).grid(row=2, column=0, columnspan=2, pady=(8, 0))
+
+    def _run_export(self, paths, dest, codec, bitrate):
+        def progress(done, total):
+            self.root.after(0, self.status_var.set, f"导出: {done}/{total}")
+
+        def run():
+            from export import export_tracks
+            report = export_tracks(paths, dest, codec, bitrate, progress=progress, playlist_name="playlist")
+            self.root.after(0, self.status_var.set,
+                            f"导出完成: {report['exported']} 首, 跳过 {report['skipped']} 首, 失败 {report['failed']} 首 "
+                            f"({report['hours_per_minute']:.2f} 小时音频/分钟)")
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def write_back_tags(self):
+        # The playing file is held open by the engine (and can't be replaced on Windows)
+        playing = self.player.current_file
+        paths = [p for p in self._audio_files() if os.path.exists(p) and p != playing]
+        if not paths:
+            return
+        if not messagebox.askyesno("写入标签", f"将缓存的歌词和封面写入 {len(paths)} 个文件的标签?\n已有的歌词和封面不会被覆盖。"):
+            return
+
+        def progress(done):
+            self.root.after(0, self.status_var.set, f"写入标签: {done}/{len(paths)}")
+
+        def run():
+            from writeback import write_back_tracks
+            report = write_back_tracks(paths, progress=progress, manager=self.metadata_manager)
+            self.root.after(0, self.status_var.set,
+                            f"写入完成: {report['written']} 个文件 (歌词 {report['lyrics']}, 封面 {report['covers']}), "
+                            f"不支持 {report['unsupported']}, 失败 {report['failed']}")
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def show_smart_playlists(self):
+        win = tk.Toplevel(self.root)
+        win.title("智能列表")
+        win.geometry("700x420")
+
+        form = ttk.Frame(win, padding="5")
+        form.pack(side=tk.TOP, fill=tk.X)
+        ttk.Label(form, text="名称:").pack(side=tk.LEFT)
+        name_var = tk.StringVar()
+        ttk.Entry(form, textvariable=name_var, width=12).pack(side=tk.LEFT, padx=2)
+        ttk.Label(form, text="规则:").pack(side=tk.LEFT)
+        rule_var = tk.StringVar(value="has synced lyrics")
+        ttk.Entry(form, textvariable=rule_var).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=2)
+
+        lists = tk.Listbox(win, width=24, exportselection=False)
+        lists.pack(side=tk.LEFT, fill=tk.Y, padx=5, pady=5)
+        tracks = tk.Listbox(win, font=('Segoe UI', 10))
+        tracks.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5, pady=5)
+        shown = []  # Track ids behind the rows of `tracks`
+
+        def refresh():
+            lists.delete(0, tk.END)
+            for smart in self.smartlists.lists.values():
+                lists.insert(tk.END, f"{smart.name} ({len(smart)})")
+
+        def selected():
+            index = lists.curselection()
+            return list(self.smartlists.lists.values())[index[0]] if index else None
+
+        def show(event=None):
+            smart = selected()
+            tracks.delete(0, tk.END)
+            shown[:] = smart.ids() if smart else []
+            for tid in shown:
+                track = self.library.get(tid)
+                tracks.insert(tk.END, track.title or track.filename)
+            if smart:
+                name_var.set(smart.name)
+                rule_var.set(smart.rule)
+
+        def save():
+            name = name_var.get().strip() or rule_var.get().strip()
+            try:
+                self.smartlists.add(name, rule_var.get())
+            except RuleError as e:
+                messagebox.showerror("规则错误", str(e), parent=win)
+                return
+            self.save_playlist_state()
+            refresh()
+            lists.selection_set(list(self.smartlists.lists).index(name))
+            show()
+
+        def delete():
+            smart = selected()
+            if smart:
+                self.smartlists.remove(smart.name)
+                self.save_playlist_state()
+                refresh()
+                show()
+
+        def play(event=None):
+            index = tracks.curselection()
+            if index and shown[index[0]] in self.playlist:
+                self.play_index(self.playlist.index(shown[index[0]]))
+
+        ttk.Button(form, text="保存", command=save, width=6).pack(side=tk.LEFT, padx=2)
+        ttk.Button(form, text="删除", command=delete, width=6).pack(side=tk.LEFT, padx=2)
+        lists.bind("<<ListboxSelect>>", show)
+        tracks.bind("<Double-1>", play)
+        refresh()
+
+    def show_duplicates(self, clusters):
+        if not clusters:
+            self.status_var.set("查找重复: 未发现重复歌曲")
+            return
+        self.status_var.set(f"查找重复: {len(clusters)} 组")
+        win = tk.Toplevel(self.root)
+        win.title("重复歌曲")
+        win.geometry("600x400")
+        text = tk.Text(win, wrap=tk.NONE, font=('Segoe UI', 10))
+        yscroll = ttk.Scrollbar(win, orient=tk.VERTICAL, command=text.yview)
+        text.config(yscrollcommand=yscroll.set)
+        text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        yscroll.pack(side=tk.RIGHT, fill=tk.Y)
+        for n, cluster in enumerate(clusters, 1):
+            text.insert(tk.END, f"第 {n} 组\n")
+            for path in cluster:
+                text.insert(tk.END, f"    {path}\n")
+        text.config(state=tk.DISABLED)
+
+    def on_peaks_ready(self, file_path, peaks):
+        # Ignore results for a track the user has already skipped past
+        if peaks is not None and file_path == self.player.current_file:
+            self.progress_scale.set_peaks(peaks)
+
+    def stage_upcoming(self, index, previous_file=None):
+        staging = self.player.staging
+        if not staging:
+            return
+        current_file = split_virtual(self.library.path(self.playlist[index]))[0]
+        previous_file = split_virtual(previous_file)[0] if previous_file else None
+        if previous_file and previous_file != current_file:
+            staging.mark_played(previous_file)
+        upcoming = [split_virtual(self.library.path(tid))[0] for tid in self.playlist.upcoming(STAGING_LOOKAHEAD)]
+        upcoming = [p for p in dict.fromkeys(upcoming) if p != current_file]
+        staging.stage(upcoming + [current_file])
+
+    @tracing.traced("metadata_basic", arg="track_id")
+    def load_metadata_basic(self, track_id, file_path):
         # Load without network first
         meta = self.metadata_manager.get_metadata(file_path, fetch_network=False)
-        self.update_metadata_ui(meta)
+        self.apply_metadata(track_id, meta)
 
-    def load_metadata_network(self, file_path):
+    @tracing.traced("metadata_network", arg="track_id")
+    def load_metadata_network(self, track_id, file_path):
         # This will be slow but it runs in a thread
         meta = self.metadata_manager.get_metadata(file_path, fetch_network=True)
         # Update UI in main thread
-        self.root.after(0, self.update_metadata_ui, meta)
+        self.root.after(0, self.apply_metadata, track_id, meta)
 
+    @tracing.traced("apply_metadata", arg="track_id")
+    def apply_metadata(self, track_id, meta):
+        if track_id in self.library and is_virtual(self.library.path(track_id)):
+            # The file's tags describe the whole album; keep the CUE sheet's title/performer
+            track = self.library.get(track_id)
+            meta = dict(meta, lyrics=None)
+            meta['title'] = track.title or meta.get('title')
+            meta['artist'] = track.artist or meta.get('artist')
+        self.library.update(track_id, meta)
+        self.update_metadata_ui(meta)
+
+    @tracing.traced("update_metadata_ui")
     def update_metadata_ui(self, meta):
         # Update Labels
         self.title_label.config(text=meta.get('title', '未知标题'))
@@ -368,9 +947,11 @@ class MusicPlayerGUI:
         cover_path = meta.get('cover_path')
         if cover_path and os.path.exists(cover_path):
             try:
-                img = Image.open(cover_path)
-                img.thumbnail((200, 200)) # Resize
-                photo = ImageTk.PhotoImage(img)
+                from PIL import Image, ImageTk
+                with tracing.span("decode_cover", file=os.path.basename(cover_path)):
+                    img = Image.open(cover_path)
+                    img.thumbnail((200, 200)) # Resize
+                    photo = ImageTk.PhotoImage(img)
                 self.cover_label.config(image=photo)
                 self.cover_label.image = photo # Keep reference
             except Exception as e:
@@ -398,23 +979,7 @@ class MusicPlayerGUI:
         self.lyrics_text.config(state=tk.DISABLED)
 
     def _parse_and_display_lrc(self, lyrics_text):
-        lines = lyrics_text.splitlines()
-        regex = re.compile(r'\[(\d{2}):(\d{2}(?:\.\d+)?)\](.*)')
-        
-        parsed = []
-        for line in lines:
-            match = regex.match(line)
-            if match:
-                minutes = int(match.group(1))
-                seconds = float(match.group(2))
-                timestamp = minutes * 60 + seconds
-                content = match.group(3).strip()
-                if content: # Skip empty lines
-                    parsed.append((timestamp, content))
-        
-        # Sort by timestamp
-        parsed.sort(key=lambda x: x[0])
-        self.parsed_lyrics = parsed
+        self.parsed_lyrics = parse_lrc(lyrics_text)
         
         # Insert into text widget
         for _, content in self.parsed_lyrics:
@@ -422,8 +987,7 @@ class MusicPlayerGUI:
 
     def toggle_play(self):
         if self.current_index == -1:
-            if self.playlist:
-                self.play_index(0)
+            self.next_song()
             return
 
         if self.player.is_playing() or self.player.paused:
@@ -439,6 +1003,7 @@ class MusicPlayerGUI:
             self.play_index(self.current_index)
 
     def stop_song(self):
+        self._end_play()
         self.player.stop()
         self.play_btn.config(text="▶ 播放")
         self.status_var.set("已停止")
@@ -459,7 +1024,7 @@ class MusicPlayerGUI:
         if self.current_duration > 0:
             seek_pos = self.progress_scale.get()
             seek_seconds = (seek_pos / 100.0) * self.current_duration
-            self.player.seek(seek_seconds)
+            self.player.seek(self.track_offset + seek_seconds)
             
             # If was paused, play button needs to update to Pause
             if not self.player.paused:
@@ -468,28 +1033,64 @@ class MusicPlayerGUI:
         # Small delay to prevent update loop from snapping back immediately
         self.root.after(500, lambda: setattr(self, 'is_seeking', False))
 
-    def next_song(self):
-        if self.playlist:
-            next_idx = (self.current_index + 1) % len(self.playlist)
-            self.play_index(next_idx)
+    def next_song(self, manual=True):
+        # manual: the button, which skips past repeat-one; auto-advance passes False
+        track_id = self.playlist.peek_next(manual)
+        if track_id is not None:
+            self.play_index(self.playlist.index(track_id))
+        elif not manual:
+            # Repeat is off and the queue has run out; play starts over from the top
+            self.stop_song()
+            self.playlist.current = None
 
     def prev_song(self):
-        if self.playlist:
-            prev_idx = (self.current_index - 1) % len(self.playlist)
-            self.play_index(prev_idx)
+        track_id = self.playlist.peek_previous()
+        if track_id is not None:
+            self.play_index(self.playlist.index(track_id))
+
+    def toggle_shuffle(self):
+        self.playlist.set_shuffle(self.shuffle_var.get())
+        self._requeue()
+        self.save_playlist_state()
+
+    def cycle_repeat(self):
+        self.playlist.repeat = REPEAT_MODES[(REPEAT_MODES.index(self.playlist.repeat) + 1) % len(REPEAT_MODES)]
+        self.repeat_btn.config(text=REPEAT_LABELS[self.playlist.repeat])
+        self._requeue()
+        self.save_playlist_state()
+
+    def _requeue(self):
+        # The track handed to the engine for a gapless switch may no longer be the next one
+        if self.current_index != -1 and self._ready.is_set():
+            self.queue_following(self.current_index)
 
     def set_volume(self, val):
+        if not self._ready.is_set():
+            return  # _on_ready() applies the slider value
         volume = float(val) / 100
         self.player.set_volume(volume)
 
+    def set_eq_preset(self, event=None):
+        from dsp import DEFAULT_PRESET
+        dsp = getattr(self.player, "dsp", None)
+        if dsp is None:
+            self.eq_var.set(DEFAULT_PRESET)
+            self.status_var.set("均衡器需要 PCM 引擎 (--engine pcm)")
+            return
+        dsp.set_preset(self.eq_var.get())
+        self.status_var.set(f"均衡器: {self.eq_var.get()}")
+
     def format_time(self, seconds):
         minutes = int(seconds // 60)
         seconds = int(seconds % 60)
         return f"{minutes:02d}:{seconds:02d}"
 
     def update_status(self):
+        if hasattr(self.player, 'take_track_change') and self.player.take_track_change():
+            self.on_track_advanced()
+
         if self.current_index != -1 and (self.player.is_playing() or self.player.paused):
-            current_time = self.player.get_position()
+            current_time = max(0.0, self.player.get_position() - self.track_offset)
             total_time = self.current_duration
             self.time_var.set(f"{self.format_time(current_time)} / {self.format_time(total_time)}")
             
@@ -502,12 +1103,7 @@ class MusicPlayerGUI:
             if self.parsed_lyrics:
                 # Find current lyric index
                 # We want the last lyric that has timestamp <= current_time
-                new_index = -1
-                for i, (ts, _) in enumerate(self.parsed_lyrics):
-                    if ts <= current_time:
-                        new_index = i
-                    else:
-                        break
+                new_index = lyric_index(self.parsed_lyrics, current_time)
                 
                 if new_index != -1 and new_index != self.active_lyric_index:
                     self.active_lyric_index = new_index
@@ -525,11 +1121,18 @@ class MusicPlayerGUI:
                     self.lyrics_text.see(f"{line_num}.0")
                     self.lyrics_text.yview(f"{line_num}.0")
         
+        # A CUE track ends where the next one starts, not at the end of the file
+        if self.track_end is not None and self.current_index != -1 and self.player.is_playing() \
+                and self.player.get_position() >= self.track_end and self.playlist:
+            self._end_play(ended=True)
+            self.next_song(manual=False)
+
         # Check for auto next
         if self.current_index != -1 and not self.player.is_playing() and not self.player.paused:
              if not self.player.paused:
                  if self.playlist and len(self.playlist) > 0:
-                     self.next_song()
+                     self._end_play(ended=True)
+                     self.next_song(manual=False)
 
         # Schedule next update
         self.root.after(200, self.update_status) # Update faster for smoother lyrics
@@ -538,8 +1141,9 @@ class MusicPlayerGUI:
         if self.current_index == -1 or not self.playlist:
             messagebox.showinfo("提示", "请先选择歌曲。")
             return
-        file_path = self.playlist[self.current_index]
+        file_path = split_virtual(self.library.path(self.playlist[self.current_index]))[0]
         try:
+            from mutagen import File
             audio = File(file_path)
         except Exception as e:
             messagebox.showerror("错误", f"无法读取标签:\n{e}")
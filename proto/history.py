@@ -0,0 +1,191 @@
+"""
+Play history: every start, skip and completion is appended to
+cache/history.log (JSON lines) by a writer thread, so record() never
+touches the disk on the caller's thread.
+
+Queries are answered from rollups (per-track and per-artist counters, the
+recent skips) that record() updates as it goes. close() saves the rollups
+to cache/history_rollup.json with the log size they cover. On the next
+start, only the log written after that point is replayed; after a crash
+that is whatever was logged since the last clean exit.
+"""
+import os
+import json
+import time
+import heapq
+import threading
+from collections import deque
+
+START, SKIP, COMPLETE = "start", "skip", "complete"
+COMPLETE_FRACTION = 0.9  # A play that got this far counts as completed, not skipped
+FLUSH_INTERVAL = 2.0  # Seconds between writer wake-ups
+FLUSH_EVENTS = 4096  # Or sooner, once this many events are waiting
+RECENT_SKIPS = 200
+
+# Per-track rollup fields
+STARTS, COMPLETES, SKIPS, PCT_SUM, LAST = range(5)
+
+
+class PlayHistory:
+    def __init__(self, path=os.path.join("cache", "history.log"), rollup_path=None):
+        self.path = path
+        self.rollup_path = rollup_path or os.path.splitext(path)[0] + "_rollup.json"
+        self.tracks = {}  # path -> [starts, completes, skips, completion sum, last played]
+        self.artists = {}  # artist -> finished plays (completed or skipped)
+        self.recent_skips = deque(maxlen=RECENT_SKIPS)  # (timestamp, path, completion)
+        self._pending = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self.replayed = 0  # Log events read at startup, past the saved rollup
+        self._load()
+        self._writer = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._writer.start()
+
+    def record(self, kind, file_path, artist=None, completion=None, timestamp=None):
+        """
+        Log one event: kind is START, SKIP or COMPLETE; completion is the
+        fraction of the track played (0-1) for SKIP/COMPLETE.
+        """
+        event = (timestamp or time.time(), kind, file_path, artist, completion)
+        with self._lock:
+            self._apply(event)
+            self._pending.append(event)
+            if len(self._pending) >= FLUSH_EVENTS:
+                self._wake.set()
+
+    def finish(self, file_path, completion, artist=None, timestamp=None):
+        """Record the end of a play as COMPLETE or SKIP depending on how far it got."""
+        kind = COMPLETE if completion >= COMPLETE_FRACTION else SKIP
+        self.record(kind, file_path, artist, completion, timestamp)
+
+    def _apply(self, event):
+        timestamp, kind, file_path, artist, completion = event
+        stats = self.tracks.get(file_path)
+        if stats is None:
+            stats = self.tracks[file_path] = [0, 0, 0, 0.0, 0.0]
+        if kind == START:
+            stats[STARTS] += 1
+            stats[LAST] = timestamp
+            return
+        stats[COMPLETES if kind == COMPLETE else SKIPS] += 1
+        stats[PCT_SUM] += completion or 0.0
+        if artist:
+            self.artists[artist] = self.artists.get(artist, 0) + 1
+        if kind == SKIP:
+            self.recent_skips.append((timestamp, file_path, completion))
+
+    # Queries
+
+    def most_played(self, n=10):
+        """[(path, completions, starts)] of the n most completed tracks."""
+        with self._lock:
+            top = heapq.nlargest(n, self.tracks.items(), key=lambda item: (item[1][COMPLETES], item[1][STARTS]))
+        return [(path, stats[COMPLETES], stats[STARTS]) for path, stats in top]
+
+    def recently_skipped(self, n=10):
+        """[(timestamp, path, completion)], newest first."""
+        with self._lock:
+            return list(reversed(self.recent_skips))[:n]
+
+    def artist_counts(self, n=None):
+        """[(artist, plays)] by plays; all artists when n is None."""
+        with self._lock:
+            items = list(self.artists.items())
+        if n is None:
+            return sorted(items, key=lambda item: -item[1])
+        return heapq.nlargest(n, items, key=lambda item: item[1])
+
+    def track_stats(self, file_path):
+        with self._lock:
+            stats = self.tracks.get(file_path)
+            if stats is None:
+                return None
+            finished = stats[COMPLETES] + stats[SKIPS]
+            return {'starts': stats[STARTS], 'completes': stats[COMPLETES], 'skips': stats[SKIPS],
+                    'avg_completion': stats[PCT_SUM] / finished if finished else None,
+                    'last_played': stats[LAST] or None}
+
+    # Persistence
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(FLUSH_INTERVAL)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Write pending events to the log (normally done by the writer thread)."""
+        with self._lock:
+            events, self._pending = self._pending, []
+        if not events:
+            return
+        lines = "".join(json.dumps({'t': round(t, 3), 'e': kind, 'p': path, 'a': artist, 'c': completion},
+                                   ensure_ascii=False) + "\n"
+                        for t, kind, path, artist, completion in events)
+        try:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+        except Exception as e:
+            print(f"Failed to write play history: {e}")
+
+    def close(self):
+        """Stop the writer, flush and save the rollups so the next start skips the replay."""
+        self._closed = True
+        self._wake.set()
+        self._writer.join(5)
+        self.flush()
+        self._save_rollup()
+
+    def _save_rollup(self):
+        try:
+            directory = os.path.dirname(self.rollup_path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            offset = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+            with self._lock:
+                data = json.dumps({'offset': offset, 'tracks': self.tracks, 'artists': self.artists,
+                                   'recent_skips': list(self.recent_skips)}, ensure_ascii=False)
+            with open(self.rollup_path + ".tmp", 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(self.rollup_path + ".tmp", self.rollup_path)
+        except Exception as e:
+            print(f"Failed to save play history rollup: {e}")
+
+    def _load(self):
+        offset = 0
+        if os.path.exists(self.rollup_path):
+            try:
+                with open(self.rollup_path, 'r', encoding='utf-8') as f:
+                    rollup = json.load(f)
+                offset = rollup['offset']
+                self.tracks = rollup['tracks']
+                self.artists = rollup['artists']
+                self.recent_skips.extend(tuple(s) for s in rollup['recent_skips'])
+            except Exception as e:
+                print(f"Failed to load play history rollup: {e}")
+                offset = 0
+                self.tracks, self.artists = {}, {}
+                self.recent_skips.clear()
+        if not os.path.exists(self.path):
+            return
+        if offset > os.path.getsize(self.path):
+            # The log was replaced or truncated under us; rebuild from scratch
+            offset = 0
+            self.tracks, self.artists = {}, {}
+            self.recent_skips.clear()
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                for line in f:
+                    try:
+                        e = json.loads(line)
+                    except ValueError:
+                        continue  # Torn last line after a crash
+                    self._apply((e['t'], e['e'], e['p'], e.get('a'), e.get('c')))
+                    self.replayed += 1
+        except Exception as e:
+            print(f"Failed to read play history: {e}")
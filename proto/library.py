@@ -0,0 +1,163 @@
+import os
+import sys
+from lrc import LRC_LINE
+
+
+def _split_path(path):
+    # Split on the last separator but keep it on the directory part, so that
+    # dir + filename always round-trips to the exact original string
+    # (playlist.json mixes '/' and '\\', e.g. "F:/music\\10.mp3").
+    cut = max(path.rfind('/'), path.rfind('\\'), path.rfind(os.sep)) + 1
+    return path[:cut], path[cut:]
+
+
+class Track:
+    """Compact per-track record. Cover bytes are never stored here."""
+    __slots__ = ('dir_id', 'filename', 'title', 'artist', 'album', 'duration', 'has_lyrics', 'synced_lyrics')
+
+    def __init__(self, dir_id, filename):
+        self.dir_id = dir_id
+        self.filename = filename
+        self.title = None
+        self.artist = None
+        self.album = None
+        self.duration = 0.0
+        self.has_lyrics = False
+        self.synced_lyrics = False  # Lyrics carry LRC timestamps
+
+
+class Library:
+    """
+    In-memory track store keyed by stable integer track ids.
+
+    Paths are stored as (directory id, filename); directory strings and
+    artist/album names are interned so repeated values share one object.
+    """
+
+    def __init__(self):
+        self._dirs = []          # dir_id -> directory string (with trailing separator)
+        self._dir_ids = {}       # directory string -> dir_id
+        self._dir_files = []     # dir_id -> {filename: track id}
+        self._tracks = []        # track id -> Track or None once removed
+        self._count = 0
+        self._listeners = []
+
+    def watch(self, callback):
+        """
+        Call callback(tid) after a track is added, updated, reset or removed,
+        and callback(None) after clear(). Used to keep derived views current.
+        """
+        self._listeners.append(callback)
+
+    def _notify(self, tid):
+        for callback in self._listeners:
+            callback(tid)
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for tid, track in enumerate(self._tracks):
+            if track is not None:
+                yield tid
+
+    def __contains__(self, tid):
+        return 0 <= tid < len(self._tracks) and self._tracks[tid] is not None
+
+    def add(self, path):
+        """Register a path and return its track id (existing id if already known)."""
+        directory, filename = _split_path(path)
+        dir_id = self._dir_ids.get(directory)
+        if dir_id is None:
+            dir_id = len(self._dirs)
+            directory = sys.intern(directory)
+            self._dirs.append(directory)
+            self._dir_ids[directory] = dir_id
+            self._dir_files.append({})
+        files = self._dir_files[dir_id]
+        tid = files.get(filename)
+        if tid is not None:
+            return tid
+        tid = len(self._tracks)
+        self._tracks.append(Track(dir_id, filename))
+        files[filename] = tid
+        self._count += 1
+        if self._listeners:
+            self._notify(tid)
+        return tid
+
+    def find(self, path):
+        """Return the track id for a path, or None."""
+        directory, filename = _split_path(path)
+        dir_id = self._dir_ids.get(directory)
+        if dir_id is None:
+            return None
+        return self._dir_files[dir_id].get(filename)
+
+    def remove(self, tid):
+        track = self._tracks[tid]
+        if track is None:
+            return
+        del self._dir_files[track.dir_id][track.filename]
+        self._tracks[tid] = None
+        self._count -= 1
+        if self._listeners:
+            self._notify(tid)
+
+    def clear(self):
+        listeners = self._listeners
+        self.__init__()
+        self._listeners = listeners
+        if listeners:
+            self._notify(None)
+
+    def get(self, tid):
+        return self._tracks[tid]
+
+    def path(self, tid):
+        track = self._tracks[tid]
+        return self._dirs[track.dir_id] + track.filename
+
+    def directory(self, track):
+        """Directory (with its trailing separator) of a Track record."""
+        return self._dirs[track.dir_id]
+
+    def paths(self, tids=None):
+        if tids is None:
+            tids = self
+        return [self.path(tid) for tid in tids]
+
+    def reset(self, tid):
+        """Forget cached metadata, e.g. after the file changed on disk."""
+        track = self._tracks[tid]
+        if track is not None:
+            track.title = track.artist = track.album = None
+            track.duration = 0.0
+            track.has_lyrics = track.synced_lyrics = False
+            if self._listeners:
+                self._notify(tid)
+
+    def update(self, tid, meta=None, duration=None):
+        """
+        Copy the fields we keep from a get_metadata() dict onto the track.
+        Anything else in meta (cover_data, lyrics text, cover_path) is dropped.
+        """
+        track = self._tracks[tid]
+        if track is None:
+            return
+        if meta:
+            track.title = meta.get('title') or track.title
+            artist = meta.get('artist')
+            if artist:
+                track.artist = sys.intern(artist)
+            album = meta.get('album')
+            if album:
+                track.album = sys.intern(album)
+            lyrics = meta.get('lyrics')
+            if lyrics:
+                track.has_lyrics = True
+                track.synced_lyrics = LRC_LINE.search(lyrics) is not None
+        if duration:
+            track.duration = float(duration)
+        if self._listeners:
+            self._notify(tid)
@@ -0,0 +1,322 @@
+import os
+import sys
+import json
+import threading
+import tempfile
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import imageio_ffmpeg
+
+try:
+    from scipy.signal import lfilter
+except ImportError:
+    lfilter = None
+
+ANALYSIS_RATE = 48000
+TARGET_LOUDNESS = -18.0  # ReplayGain 2.0 reference level, LUFS
+
+# ITU-R BS.1770 K-weighting (pre-filter shelf + RLB high-pass), coefficients for 48 kHz
+_K_FILTERS = (
+    ((1.53512485958697, -2.69169618940638, 1.19839281085285), (1.0, -1.69065929318241, 0.73248077421585)),
+    ((1.0, -2.0, 1.0), (1.0, -1.99004745483398, 0.99007225036621)),
+)
+_IMPULSE_LENGTH = 8192  # The slowest pole decays below 1e-17 within this many samples
+_FFT_BLOCK = 65536
+_FFT_BATCH = 8
+READ_FRAMES = _FFT_BLOCK  # Frames decoded and filtered at a time (~1.4 s, one FFT block)
+
+
+def iter_pcm(file_path, rate=ANALYSIS_RATE, channels=2, seconds=None, block_frames=READ_FRAMES):
+    """
+    Decode a file with ffmpeg, yielding float32 (frames, channels) arrays of
+    at most block_frames frames, so memory stays flat for any track length.
+    Raises RuntimeError with ffmpeg's log after the last block if it failed.
+    """
+    cmd = [imageio_ffmpeg.get_ffmpeg_exe(), '-nostats', '-loglevel', 'error', '-i', file_path]
+    if seconds:
+        cmd += ['-t', str(seconds)]
+    cmd += ['-vn', '-ac', str(channels), '-ar', str(rate), '-f', 'f32le', 'pipe:1']
+    frame_bytes = 4 * channels
+    # stderr goes to a file, not a pipe nobody reads while stdout is streaming
+    with tempfile.TemporaryFile() as log:
+        process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=log)
+        try:
+            pending = b""
+            while True:
+                data = process.stdout.read(frame_bytes * block_frames)
+                if not data:
+                    break
+                data = pending + data
+                usable = len(data) - len(data) % frame_bytes
+                pending = data[usable:]
+                if usable:
+                    yield np.frombuffer(data[:usable], dtype='<f4').reshape(-1, channels)
+            process.wait()
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+        if process.returncode != 0:
+            log.seek(0)
+            raise RuntimeError(log.read().decode('utf-8', errors='ignore').strip() or "ffmpeg failed")
+
+
+def decode_pcm(file_path, rate=ANALYSIS_RATE, channels=2, seconds=None):
+    """Decode a file with ffmpeg into a float32 array of shape (frames, channels)."""
+    blocks = list(iter_pcm(file_path, rate, channels, seconds))
+    return np.concatenate(blocks) if blocks else np.zeros((0, channels), dtype=np.float32)
+
+
+def _k_impulse():
+    impulse = np.zeros(_IMPULSE_LENGTH)
+    impulse[0] = 1.0
+    # Direct-form recursion on a short impulse; done once per process
+    for b, a in _K_FILTERS:
+        out = np.zeros_like(impulse)
+        x1 = x2 = y1 = y2 = 0.0
+        for n, x in enumerate(impulse):
+            y = b[0] * x + b[1] * x1 + b[2] * x2 - a[1] * y1 - a[2] * y2
+            x2, x1, y2, y1 = x1, x, y1, y
+            out[n] = y
+        impulse = out
+    return impulse
+
+
+_k_impulse_cache = None
+
+
+def _convolve(samples):
+    """Full convolution (frames + _IMPULSE_LENGTH - 1) of samples with the K-weighting impulse response."""
+    # Overlap-add FFT convolution with the (truncated) filter impulse response
+    global _k_impulse_cache
+    if _k_impulse_cache is None:
+        _k_impulse_cache = _k_impulse()
+    h = _k_impulse_cache
+    frames, channels = samples.shape
+    n_fft = _FFT_BLOCK + _IMPULSE_LENGTH
+    block = n_fft - _IMPULSE_LENGTH + 1
+    n_blocks = -(-frames // block)
+    padded = np.zeros((n_blocks * block, channels))
+    padded[:frames] = samples
+    H = np.fft.rfft(h, n_fft)
+    out = np.zeros((n_blocks * block + n_fft, channels))
+    blocks = padded.reshape(n_blocks, block, channels)
+    # Batched FFTs over a few blocks at a time keep peak memory bounded
+    for first in range(0, n_blocks, _FFT_BATCH):
+        batch = blocks[first:first + _FFT_BATCH]
+        filtered = np.fft.irfft(np.fft.rfft(batch, n_fft, axis=1) * H[None, :, None], n_fft, axis=1)
+        for i, chunk in enumerate(filtered, first):
+            out[i * block:i * block + n_fft] += chunk
+    return out[:frames + _IMPULSE_LENGTH - 1]
+
+
+class KWeighting:
+    """K-weighting over consecutive (frames, channels) blocks of one signal, carrying the filter state."""
+
+    def __init__(self, channels):
+        if lfilter is not None:
+            self._zi = [np.zeros((2, channels)) for _ in _K_FILTERS]
+        else:
+            self._tail = np.zeros((_IMPULSE_LENGTH - 1, channels))  # Overlap into the next block
+
+    def process(self, samples):
+        if lfilter is not None:
+            for i, (b, a) in enumerate(_K_FILTERS):
+                samples, self._zi[i] = lfilter(b, a, samples, axis=0, zi=self._zi[i])
+            return samples
+        frames = samples.shape[0]
+        full = _convolve(samples)
+        full[:_IMPULSE_LENGTH - 1] += self._tail
+        self._tail = full[frames:].copy()
+        return full[:frames]
+
+
+def k_weight(samples):
+    """Apply K-weighting along axis 0 of a (frames, channels) array."""
+    return KWeighting(samples.shape[1]).process(samples)
+
+
+class LoudnessMeter:
+    """
+    Integrated loudness (BS.1770-4 / EBU R128 gating) and sample peak of a
+    signal fed in blocks with add(). Only the K-weighted energy of each
+    100 ms step is kept, so a 70-minute album costs ~42k floats; the
+    overlapping 400 ms gating blocks are sums of four steps.
+    """
+
+    def __init__(self, rate=ANALYSIS_RATE, channels=2):
+        self.step = int(0.1 * rate)
+        self.block = 4 * self.step
+        self.peak = 0.0
+        self._filter = KWeighting(channels)
+        self._steps = []  # Arrays of per-step energy
+        self._partial = 0.0  # Energy of the step still being filled
+        self._partial_frames = 0
+
+    def add(self, samples):
+        samples = np.asarray(samples, dtype=np.float64)
+        if samples.ndim == 1:
+            samples = samples[:, None]
+        if not samples.size:
+            return
+        self.peak = max(self.peak, float(np.abs(samples).max()))
+        energy = (self._filter.process(samples) ** 2).sum(axis=1)  # Channel weights are 1.0 for L/R/C
+        i = 0
+        if self._partial_frames:
+            i = min(self.step - self._partial_frames, energy.size)
+            self._partial += energy[:i].sum()
+            self._partial_frames += i
+            if self._partial_frames < self.step:
+                return
+            self._steps.append(np.array([self._partial]))
+        whole = (energy.size - i) // self.step
+        if whole:
+            self._steps.append(energy[i:i + whole * self.step].reshape(whole, self.step).sum(axis=1))
+            i += whole * self.step
+        self._partial = energy[i:].sum()
+        self._partial_frames = energy.size - i
+
+    def result(self):
+        """(loudness LUFS, peak); loudness is None for signals shorter than 400 ms or silent."""
+        steps = np.concatenate(self._steps) if self._steps else np.zeros(0)
+        if steps.size < 4:
+            return None, self.peak
+        total = np.concatenate([[0.0], np.cumsum(steps)])
+        power = (total[4:] - total[:-4]) / self.block
+
+        with np.errstate(divide='ignore'):
+            block_loudness = -0.691 + 10 * np.log10(power)
+        gated = power[block_loudness > -70.0]
+        if gated.size == 0:
+            return None, self.peak
+        relative_gate = -0.691 + 10 * np.log10(gated.mean()) - 10.0
+        gated = power[(block_loudness > -70.0) & (block_loudness > relative_gate)]
+        return float(-0.691 + 10 * np.log10(gated.mean())), self.peak
+
+
+def measure(samples, rate=ANALYSIS_RATE):
+    """
+    Integrated loudness (LUFS, gated per BS.1770-4 / EBU R128) and sample
+    peak of a (frames, channels) float array at `rate` (48 kHz filters).
+    Loudness is None when the signal is shorter than one 400 ms block or silent.
+    """
+    samples = np.asarray(samples)
+    if samples.ndim == 1:
+        samples = samples[:, None]
+    meter = LoudnessMeter(rate, samples.shape[1])
+    for first in range(0, samples.shape[0], READ_FRAMES):
+        meter.add(samples[first:first + READ_FRAMES])
+    return meter.result()
+
+
+def track_gain(loudness, peak):
+    """ReplayGain-style gain in dB towards TARGET_LOUDNESS, limited so the peak does not clip."""
+    if loudness is None:
+        return 0.0
+    gain = TARGET_LOUDNESS - loudness
+    if peak > 0:
+        gain = min(gain, -20 * np.log10(peak))
+    return float(gain)
+
+
+def analyze_file(file_path):
+    meter = LoudnessMeter()
+    for block in iter_pcm(file_path):
+        meter.add(block)
+    loudness, peak = meter.result()
+    return {'loudness': loudness, 'peak': peak, 'gain': track_gain(loudness, peak)}
+
+
+def _analyze_job(file_path):
+    try:
+        return file_path, analyze_file(file_path), None
+    except Exception as e:
+        return file_path, None, str(e)
+
+
+class LoudnessStore:
+    """Per-track analysis results in cache/loudness.json, invalidated by size/mtime."""
+
+    label = "loudness"
+
+    def __init__(self, path=os.path.join("cache", "loudness.json")):
+        self.path = path
+        self._entries = {}
+        self._lock = threading.Lock()
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except Exception as e:
+                print(f"Failed to load {self.label} store: {e}")
+
+    def _stamp(self, file_path):
+        st = os.stat(file_path)
+        return [st.st_size, st.st_mtime]
+
+    def get(self, file_path):
+        with self._lock:
+            entry = self._entries.get(file_path)
+        if entry is None:
+            return None
+        try:
+            if entry.get('stamp') != self._stamp(file_path):
+                return None
+        except OSError:
+            return None
+        return entry
+
+    def put(self, file_path, result):
+        entry = dict(result)
+        entry['stamp'] = self._stamp(file_path)
+        with self._lock:
+            self._entries[file_path] = entry
+
+    def missing(self, paths):
+        return [p for p in paths if self.get(p) is None]
+
+    def save(self):
+        with self._lock:
+            data = json.dumps(self._entries, ensure_ascii=False)
+        try:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            with open(self.path + ".tmp", 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(self.path + ".tmp", self.path)
+        except Exception as e:
+            print(f"Failed to save {self.label} store: {e}")
+
+
+def analyze_many(paths, store=None, workers=None, progress=None):
+    """
+    Analyze paths in a process pool. Results go into store (if given) and
+    are returned as {path: result}. progress(done, total) is called per track.
+    """
+    results = {}
+    total = len(paths)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for done, (path, result, error) in enumerate(pool.map(_analyze_job, paths, chunksize=4), 1):
+            if error:
+                print(f"Loudness analysis failed for {os.path.basename(path)}: {error}")
+            else:
+                results[path] = result
+                if store is not None:
+                    store.put(path, result)
+            if progress:
+                progress(done, total)
+    if store is not None:
+        store.save()
+    return results
+
+
+if __name__ == "__main__":
+    # Usage: python loudness.py <file, directory or playlist.json>...
+    from playlists_io import audio_files
+    store = LoudnessStore()
+    todo = store.missing(audio_files(sys.argv[1:]))
+    for path, result in analyze_many(todo, store).items():
+        print(f"{result['loudness'] or float('-inf'):7.2f} LUFS  peak {result['peak']:.3f}  gain {result['gain']:+6.2f} dB  {path}")
@@ -0,0 +1,29 @@
+import re
+
+LRC_LINE = re.compile(r'\[(\d{2}):(\d{2}(?:\.\d+)?)\](.*)')
+
+
+def parse_lrc(lyrics_text):
+    """[(timestamp seconds, text)] from LRC lyrics, sorted by time; untimed and empty lines are dropped."""
+    parsed = []
+    for line in lyrics_text.splitlines():
+        match = LRC_LINE.match(line)
+        if match:
+            minutes = int(match.group(1))
+            seconds = float(match.group(2))
+            content = match.group(3).strip()
+            if content:  # Skip empty lines
+                parsed.append((minutes * 60 + seconds, content))
+    parsed.sort(key=lambda x: x[0])
+    return parsed
+
+
+def lyric_index(parsed, position):
+    """Index of the last line whose timestamp is <= position, or -1 before the first line."""
+    index = -1
+    for i, (ts, _) in enumerate(parsed):
+        if ts <= position:
+            index = i
+        else:
+            break
+    return index
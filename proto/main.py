@@ -1,19 +1,59 @@
 from gui import MusicPlayerGUI
+import os
+import sys
+import argparse
+import tracing
 import tkinter as tk
-import pygame
 
 if __name__ == "__main__":
-    # Initialize pygame mixer early to ensure it's ready
-    pygame.mixer.init()
-    
+    parser = argparse.ArgumentParser(description="Python 音乐播放器")
+    parser.add_argument("--engine", choices=("pygame", "pcm"), default="pygame",
+                        help="playback engine: pygame.mixer.music or the ffmpeg PCM streaming engine")
+    parser.add_argument("--crossfade", type=float, default=0.0, metavar="SECONDS",
+                        help="crossfade between tracks with the pcm engine (0 = gapless)")
+    parser.add_argument("--output", default="device", metavar="{device,null,FILE.wav}",
+                        help="audio output: the sound card, nowhere (headless), or a WAV recording (pcm engine)")
+    parser.add_argument("--trace", metavar="FILE", default=os.environ.get("MUSICPLAYER_TRACE"),
+                        help="record timing spans and write a Chrome trace to FILE on exit")
+    parser.add_argument("--serve", type=int, metavar="PORT",
+                        help="stream the saved playlist over HTTP instead of opening the window")
+    parser.add_argument("--host", default="0.0.0.0", help="address to listen on with --serve")
+    args = parser.parse_args()
+    if args.trace:
+        tracing.enable()
+    if args.output.lower().endswith('.wav') and args.engine != "pcm":
+        print("Recording to WAV needs the PCM engine; using --engine pcm")
+        args.engine = "pcm"
+
+    if args.serve is not None:
+        from server import serve
+        from playlists_io import audio_files
+        # The server streams whole files: CUE tracks ("album.flac#t=...") become their file, once
+        serve(audio_files(['playlist.json']) if os.path.exists('playlist.json') else [], args.host, args.serve)
+        sys.exit(0)
+
+    # The player (and pygame's mixer) is created by the GUI's warm-up thread
+    # once the window is up, so it is initialized exactly once
     root = tk.Tk()
     # Set icon if available (skip for now)
     
-    app = MusicPlayerGUI(root)
+    app = MusicPlayerGUI(root, engine=args.engine, crossfade=args.crossfade, output=args.output)
     
     try:
         root.mainloop()
     except KeyboardInterrupt:
         pass
     finally:
-        pygame.mixer.quit()
+        app.history.close()
+        if hasattr(app._player, 'close'):
+            app._player.close()  # PCM engine: stops the pump and finishes a WAV recording
+        pygame = sys.modules.get("pygame")
+        if pygame is not None and pygame.mixer.get_init():
+            pygame.mixer.quit()
+        if args.trace:
+            tracing.export_chrome_trace(args.trace)
+            summary = tracing.latency_summary()
+            if summary:
+                print("Track change latency over {count} changes: p50 {p50:.0f} ms, p90 {p90:.0f} ms, "
+                      "p99 {p99:.0f} ms, max {max:.0f} ms".format(**summary))
+            print(f"Trace written to {args.trace}")
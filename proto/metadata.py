@@ -1,53 +1,62 @@
 import os
 import hashlib
-import requests
 import json
 from mutagen import File
-from mutagen.id3 import ID3, APIC, USLT, TIT2, TPE1, TALB
+from mutagen.id3 import ID3
 from mutagen.mp3 import MP3
-from mutagen.flac import FLAC, Picture
-from mutagen.mp4 import MP4, MP4Cover
+from mutagen.flac import FLAC
+from mutagen.mp4 import MP4
 from mutagen.dsf import DSF
-from PIL import Image
-from io import BytesIO
+import tracing
+
+# requests is imported by the network fetchers only; it is slow to import and
+# most get_metadata calls never touch the network
+
+
+def normalize_text(s):
+    """Decode bytes (UTF-8, then GBK) or repair GBK/UTF-8 text that was read back as Latin-1."""
+    if s is None:
+        return None
+    if isinstance(s, bytes):
+        for enc in ("utf-8", "gbk", "latin-1"):
+            try:
+                return s.decode(enc)
+            except:
+                pass
+        return s.decode("utf-8", errors="replace")
+    if isinstance(s, str):
+        def cjk_count(x):
+            return sum(1 for ch in x if '\u4e00' <= ch <= '\u9fff')
+        candidates = [s]
+        try:
+            candidates.append(s.encode("latin-1").decode("utf-8", errors="replace"))
+        except:
+            pass
+        try:
+            candidates.append(s.encode("latin-1").decode("gbk", errors="replace"))
+        except:
+            pass
+        best = max(candidates, key=lambda x: (cjk_count(x), -x.count('\ufffd')))
+        return best
+    return str(s)
+
 
 class MetadataManager:
     def __init__(self, cache_dir="cache"):
         self.cache_dir = cache_dir
         self.img_cache_dir = os.path.join(cache_dir, "images")
         self.lyric_cache_dir = os.path.join(cache_dir, "lyrics")
-        
-        if not os.path.exists(self.img_cache_dir):
-            os.makedirs(self.img_cache_dir)
-        if not os.path.exists(self.lyric_cache_dir):
-            os.makedirs(self.lyric_cache_dir)
+        # Cache directories are created on first write (see _writable)
+
+    def _writable(self, directory):
+        if not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        return directory
 
     def _normalize_text(self, s):
-        if s is None:
-            return None
-        if isinstance(s, bytes):
-            for enc in ("utf-8", "gbk", "latin-1"):
-                try:
-                    return s.decode(enc)
-                except:
-                    pass
-            return s.decode("utf-8", errors="replace")
-        if isinstance(s, str):
-            def cjk_count(x):
-                return sum(1 for ch in x if '\u4e00' <= ch <= '\u9fff')
-            candidates = [s]
-            try:
-                candidates.append(s.encode("latin-1").decode("utf-8", errors="replace"))
-            except:
-                pass
-            try:
-                candidates.append(s.encode("latin-1").decode("gbk", errors="replace"))
-            except:
-                pass
-            best = max(candidates, key=lambda x: (cjk_count(x), -x.count('\ufffd')))
-            return best
-        return str(s)
+        return normalize_text(s)
 
+    @tracing.traced("get_metadata", arg="file_path")
     def get_metadata(self, file_path, fetch_network=True):
         """
         Get metadata for a file.
@@ -71,13 +80,16 @@ class MetadataManager:
         cache_id = self._get_cache_id(meta['artist'], meta['title'])
         
         # Handle Cover Art
-        if meta['cover_data']:
+        # Embedded cover bytes are only needed long enough to write the cache file
+        cover_data = meta.pop('cover_data')
+        if cover_data:
             # Save embedded cover to cache if not already there
             cover_path = os.path.join(self.img_cache_dir, f"{cache_id}_embedded.jpg")
             if not os.path.exists(cover_path):
                 try:
+                    self._writable(self.img_cache_dir)
                     with open(cover_path, "wb") as f:
-                        f.write(meta['cover_data'])
+                        f.write(cover_data)
                 except Exception as e:
                     print(f"Error saving embedded cover: {e}")
             meta['cover_path'] = cover_path
@@ -103,7 +115,9 @@ class MetadataManager:
 
         return meta
 
-    def _extract_tags(self, file_path):
+    @tracing.traced("extract_tags", arg="file_path")
+    def _extract_tags(self, file_path, audio=None):
+        # audio: an already opened mutagen file, for paths whose name doesn't identify the format
         meta = {
             'title': None,
             'artist': None,
@@ -113,7 +127,8 @@ class MetadataManager:
         }
         
         try:
-            audio = File(file_path)
+            if audio is None:
+                audio = File(file_path)
             if not audio:
                 return meta
 
@@ -209,7 +224,9 @@ class MetadataManager:
         s = f"{artist or ''}-{title or ''}".lower().encode('utf-8')
         return hashlib.md5(s).hexdigest()
 
+    @tracing.traced("fetch_cover", arg="title")
     def _fetch_online_cover(self, title, artist, cache_id):
+        import requests
         # Using iTunes Search API
         try:
             term = f"{title} {artist}"
@@ -230,7 +247,7 @@ class MetadataManager:
                         artwork_url = artwork_url.replace("100x100", "600x600")
                         img_resp = requests.get(artwork_url, timeout=5)
                         if img_resp.status_code == 200:
-                            save_path = os.path.join(self.img_cache_dir, f"{cache_id}_online.jpg")
+                            save_path = os.path.join(self._writable(self.img_cache_dir), f"{cache_id}_online.jpg")
                             with open(save_path, "wb") as f:
                                 f.write(img_resp.content)
                             return save_path
@@ -238,6 +255,7 @@ class MetadataManager:
             print(f"Error fetching online cover: {e}")
         return None
 
+    @tracing.traced("fetch_lyrics", arg="title")
     def _fetch_online_lyrics(self, title, artist, cache_id):
         # Try 1: Netease Cloud Music (Unofficial) - Better for domestic network
         lyrics = self._fetch_netease_lyrics(title, artist)
@@ -255,13 +273,14 @@ class MetadataManager:
 
     def _save_lyrics(self, lyrics, cache_id):
         try:
-            save_path = os.path.join(self.lyric_cache_dir, f"{cache_id}.txt")
+            save_path = os.path.join(self._writable(self.lyric_cache_dir), f"{cache_id}.txt")
             with open(save_path, "w", encoding="utf-8") as f:
                 f.write(lyrics)
         except Exception as e:
             print(f"Error saving lyrics: {e}")
 
     def _fetch_lrclib_lyrics(self, title, artist):
+        import requests
         try:
             url = "https://lrclib.net/api/get"
             params = {
@@ -277,6 +296,7 @@ class MetadataManager:
         return None
 
     def _fetch_netease_lyrics(self, title, artist):
+        import requests
         try:
             # 1. Search
             search_url = "http://music.163.com/api/search/get/web"
@@ -0,0 +1,487 @@
+import os
+import time
+import threading
+import subprocess
+from collections import deque
+import numpy as np
+import imageio_ffmpeg
+from mutagen import File
+from dsp import DSPChain
+from audio_backend import MixerSink
+from player import drain_stderr
+import tracing
+
+BLOCK_FRAMES = 2048  # Frames handed to the output per block (~46 ms at 44.1 kHz)
+NEXT_READ_TIMEOUT = 0.02  # Max wait for the queued track's decoder while mixing a transition
+BUFFER_SECONDS = 120  # Decoded PCM kept per track; seeks inside it never touch ffmpeg
+KEEP_BEHIND_SECONDS = 30  # How much already-played audio the decoder must not overwrite
+
+
+class PCMStream:
+    """
+    Decodes one file with ffmpeg to interleaved int16 PCM on a background
+    thread, into a ring buffer addressed by absolute frame numbers.
+    Frames in [base, end) can be read instantly; seeking outside that
+    window restarts ffmpeg at the exact target frame.
+    """
+
+    def __init__(self, file_path, rate, channels, buffer_seconds=BUFFER_SECONDS, source_path=None):
+        self.file_path = file_path
+        self.source_path = source_path or file_path  # Path as the playlist knows it (before staging)
+        self.gain_db = 0.0
+        self.rate = rate
+        self.channels = channels
+        self.capacity = int(buffer_seconds * rate)
+        self.keep_behind = min(int(KEEP_BEHIND_SECONDS * rate), self.capacity // 2)
+        self._buf = np.zeros((self.capacity, channels), dtype=np.int16)
+        self._base = 0
+        self._end = 0
+        self._cursor = 0  # Last frame requested by the reader
+        self._eof = False
+        self.error = None
+        self._cond = threading.Condition()
+        self._process = None
+        self._generation = 0
+        self._closed = False
+        self._start_decoder(0)
+
+    @property
+    def eof(self):
+        return self._eof
+
+    @property
+    def total_frames(self):
+        """Length in frames once decoding has reached the end, else None."""
+        with self._cond:
+            return self._end if self._eof else None
+
+    def _start_decoder(self, frame):
+        # Called with the condition held (or from __init__)
+        self._generation += 1
+        self._kill_process()
+        self._base = self._end = self._cursor = frame
+        self._eof = False
+        self.error = None
+        cmd = [imageio_ffmpeg.get_ffmpeg_exe(), '-nostats', '-loglevel', 'error']
+        if frame:
+            # -ss before -i decodes from the previous keyframe and trims to the exact sample
+            cmd += ['-ss', f"{frame / self.rate:.6f}"]
+        cmd += ['-i', self.file_path, '-vn', '-ac', str(self.channels), '-ar', str(self.rate),
+                '-f', 's16le', 'pipe:1']
+        self._process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                         stderr=subprocess.PIPE)
+        threading.Thread(target=self._decode, args=(self._process, self._generation), daemon=True).start()
+
+    def _kill_process(self):
+        if self._process is not None:
+            try:
+                self._process.kill()
+            except OSError:
+                pass
+            self._process = None
+
+    def _decode(self, process, generation):
+        frame_bytes = 2 * self.channels
+        pending = b""
+        reader, log = drain_stderr(process)
+        while True:
+            data = process.stdout.read(frame_bytes * 4096)
+            if not data:
+                break
+            data = pending + data
+            usable = len(data) - len(data) % frame_bytes
+            pending = data[usable:]
+            frames = np.frombuffer(data[:usable], dtype=np.int16).reshape(-1, self.channels)
+            offset = 0
+            while offset < len(frames):
+                with self._cond:
+                    # Wait for space: never overwrite what the reader may still seek back to
+                    while (self._generation == generation and not self._closed and
+                           self._end - max(self._base, self._cursor - self.keep_behind) >= self.capacity):
+                        self._cond.wait()
+                    if self._generation != generation or self._closed:
+                        return
+                    floor = max(self._base, self._cursor - self.keep_behind)
+                    room = self.capacity - (self._end - floor)
+                    n = min(room, len(frames) - offset)
+                    start = self._end % self.capacity
+                    first = min(n, self.capacity - start)
+                    self._buf[start:start + first] = frames[offset:offset + first]
+                    self._buf[:n - first] = frames[offset + first:offset + n]
+                    self._end += n
+                    self._base = max(self._base, self._end - self.capacity)
+                    offset += n
+                    self._cond.notify_all()
+        process.wait()
+        reader.join()
+        stderr = b"".join(log)
+        with self._cond:
+            if self._generation != generation:
+                return
+            if process.returncode != 0 and self._end == self._base:
+                self.error = stderr.decode('utf-8', errors='ignore').strip() or "ffmpeg failed"
+            self._eof = True
+            self._cond.notify_all()
+
+    def seek(self, frame):
+        """Make `frame` the next frame to read. Instant when it is already buffered."""
+        with self._cond:
+            if not (self._base <= frame <= self._end):
+                self._start_decoder(frame)
+            self._cursor = frame
+            self._cond.notify_all()
+
+    def wait_for(self, frame, timeout=None):
+        """Wait until `frame` is decoded or the stream ends, without moving the read cursor."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._end > frame or self._eof or self._closed, timeout)
+
+    def read(self, frame, count, timeout=None):
+        """
+        Return up to `count` frames starting at `frame`, waiting for the
+        decoder if needed. An empty array means end of stream (or timeout).
+        """
+        with self._cond:
+            if not (self._base <= frame <= self._end):
+                self._start_decoder(frame)
+            self._cursor = frame
+            self._cond.notify_all()
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while self._end <= frame and not self._eof and not self._closed:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            n = min(count, self._end - frame)
+            if n <= 0:
+                return np.zeros((0, self.channels), dtype=np.int16)
+            start = frame % self.capacity
+            first = min(n, self.capacity - start)
+            if first == n:
+                return self._buf[start:start + n].copy()
+            return np.concatenate([self._buf[start:], self._buf[:n - first]])
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._generation += 1
+            self._kill_process()
+            self._cond.notify_all()
+
+
+class PCMPlayer:
+    """
+    Alternative to MusicPlayer with the same load_file/play/pause/seek/
+    get_position API. Audio is decoded by ffmpeg into a PCMStream and fed to
+    the output in blocks by a pump thread, so every format goes through the
+    same path, seeks inside the decoded window are buffer-local and
+    sample-accurate, and position is derived from frames the output consumed.
+
+    A track queued with queue_next() is decoded ahead and spliced in by the
+    pump with no gap, or blended over the last `crossfade` seconds. The GUI
+    learns about the switch from take_track_change().
+    """
+
+    def __init__(self, sink=None, staging=None, crossfade=0.0):
+        self.sink = sink or MixerSink()
+        self.rate = self.sink.rate
+        self.channels = self.sink.channels
+        self.current_file = None
+        self.paused = False
+        self.volume = 0.5
+        self.track_gain = 0.0
+        self.staging = staging
+        self.crossfade = crossfade  # Seconds of overlap between queued tracks; 0 = gapless
+        self.mix_seconds_max = 0.0  # Worst time spent rendering one block, vs. BLOCK_FRAMES / rate
+        self.dsp = DSPChain(self.rate, self.channels)  # EQ/preamp/limiter, bypassed on the flat preset
+        self.tap = None  # Optional spectrum.SpectrumTap fed with every block written to the sink
+
+        self._stream = None
+        self._next = None  # PCMStream queued to follow the current one
+        self._next_frame = 0  # Frames of the queued stream already mixed into a crossfade
+        self._serial = 0  # Bumped whenever the pump moves on to the queued stream
+        self._read_frame = 0  # Next frame to pull from the stream
+        self._written = 0  # Frames written to the sink since the last flush
+        self._timeline = deque()  # (sink frame, stream frame, frames, serial, path) per written block
+        self._position_base = 0  # Stream frame reported while nothing has been played yet
+        self._audible_serial = 0
+        self._track_change = None
+        self._playing = False
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._closed = False
+        self._thread = threading.Thread(target=self._pump, daemon=True)
+        self._thread.start()
+
+    def cleanup_temp(self):
+        with self._lock:
+            self._reset_output(0)
+            self._playing = False
+            for stream in (self._stream, self._next):
+                if stream:
+                    stream.close()
+            self._stream = self._next = None
+
+    def close(self):
+        self.cleanup_temp()
+        with self._lock:
+            self._closed = True
+            self._wake.notify_all()
+        self.sink.close()
+
+    def _open(self, file_path):
+        source_path = file_path
+        if self.staging:
+            file_path = self.staging.local_path(file_path) or file_path
+        if not os.path.exists(file_path):
+            raise FileNotFoundError("File not found")
+        return PCMStream(file_path, self.rate, self.channels, source_path=source_path)
+
+    @tracing.traced("load_file", arg="file_path")
+    def load_file(self, file_path):
+        stream = self._open(file_path)
+        with self._lock:
+            for old in (self._stream, self._next):
+                if old:
+                    old.close()
+            self._stream = stream
+            self._next = None
+            self._playing = False
+            self.paused = False
+            self.current_file = stream.source_path
+            self._track_change = None
+            stream.gain_db = self.track_gain
+            self._reset_output(0)
+        # Surface decode errors (unsupported/corrupt files) at load time like MusicPlayer does
+        if len(stream.read(0, 1, timeout=5)) == 0 and stream.error:
+            raise RuntimeError(stream.error)
+        return self._get_duration(stream.file_path)
+
+    def queue_next(self, file_path, gain_db=0.0):
+        """
+        Start decoding the track that should follow the current one, so the
+        transition needs no load time. Returns its duration like load_file().
+        """
+        stream = self._open(file_path)
+        stream.gain_db = gain_db or 0.0
+        with self._lock:
+            if self._next:
+                self._next.close()
+            self._next = stream
+            self._next_frame = 0
+        return self._get_duration(stream.file_path)
+
+    def clear_next(self):
+        """Drop the queued track, so the current one is the last to play."""
+        with self._lock:
+            if self._next:
+                self._next.close()
+            self._next = None
+            self._next_frame = 0
+
+    def take_track_change(self):
+        """Path of the queued track once it has become audible (reported once), else None."""
+        with self._lock:
+            self._audible_entry()
+            change, self._track_change = self._track_change, None
+            return change
+
+    def _get_duration(self, file_path):
+        try:
+            audio = File(file_path)
+            if audio is not None and audio.info is not None:
+                return audio.info.length
+        except:
+            pass
+        return 0
+
+    def _reset_output(self, frame):
+        # Called with the lock held
+        self._generation += 1
+        self.sink.flush()
+        self._written = 0
+        self._timeline.clear()
+        self._read_frame = frame
+        self._position_base = frame
+        self.dsp.reset()
+        if self.tap:
+            self.tap.clear()
+        if self._stream:
+            self._stream.seek(frame)
+        if self._next:
+            self._next_frame = 0
+            self._next.seek(0)
+
+    def play(self):
+        if not self.current_file:
+            return
+        with self._lock:
+            if self.paused:
+                self.sink.resume()
+                self.paused = False
+            else:
+                self._reset_output(0)
+            self._playing = True
+            self._wake.notify_all()
+
+    def pause(self):
+        if self.current_file and not self.paused:
+            with self._lock:
+                self.sink.pause()
+                self.paused = True
+
+    def stop(self):
+        with self._lock:
+            self._playing = False
+            self.paused = False
+            self._reset_output(0)
+
+    def seek(self, position):
+        if not self.current_file:
+            return
+        with self._lock:
+            frame = max(0, int(round(position * self.rate)))
+            self._reset_output(frame)
+            # Like pygame's play(start=...), seeking resumes a paused track
+            self.paused = False
+            self._playing = True
+            self._wake.notify_all()
+
+    def set_volume(self, volume):
+        self.volume = max(0.0, min(1.0, volume))
+
+    def set_track_gain(self, gain_db):
+        self.track_gain = gain_db or 0.0
+        with self._lock:
+            if self._stream:
+                self._stream.gain_db = self.track_gain
+
+    def _gain(self, stream):
+        return min(1.0, self.volume * 10 ** (stream.gain_db / 20.0))
+
+    def is_playing(self):
+        with self._lock:
+            if not self._playing or self.paused:
+                return False
+            if self._stream and self._stream.eof and self._next is None and self._read_frame >= self._stream_end():
+                # Decoding is done; busy until the output drains
+                return self.sink.frames_played() < self._written
+            return True
+
+    def _stream_end(self):
+        return self._stream._end if self._stream else 0
+
+    def _audible_entry(self):
+        # Called with the lock held. Drops timeline entries the sink has played
+        # past and notices when the audible block belongs to a newer track.
+        played = self.sink.frames_played()
+        while len(self._timeline) > 1 and self._timeline[1][0] <= played:
+            self._timeline.popleft()
+        if not self._timeline:
+            return None, played
+        entry = self._timeline[0]
+        if entry[3] != self._audible_serial and played >= entry[0]:
+            self._audible_serial = entry[3]
+            self.current_file = entry[4]
+            self._track_change = entry[4]
+        return entry, played
+
+    def played_frames(self):
+        """Frames the output has consumed since the last seek/stop; the clock for taps."""
+        return self.sink.frames_played()
+
+    def get_position(self):
+        if not self.current_file:
+            return 0.0
+        with self._lock:
+            entry, played = self._audible_entry()
+            if entry is None:
+                return self._position_base / self.rate
+            sink_frame, stream_frame, frames = entry[:3]
+            return (stream_frame + max(0, min(played - sink_frame, frames))) / self.rate
+
+    def _pump(self):
+        while True:
+            with self._lock:
+                while not self._closed and not (self._playing and not self.paused and self._stream):
+                    self._wake.wait()
+                if self._closed:
+                    return
+                if not self.sink.ready():
+                    # Output is full; seek/stop/play notify so they don't wait out the poll
+                    self._wake.wait(0.005)
+                    continue
+                stream = self._stream
+                nxt = self._next
+                next_frame = self._next_frame
+                frame = self._read_frame
+                generation = self._generation
+
+            block = stream.read(frame, BLOCK_FRAMES, timeout=0.5)
+            started = time.perf_counter()
+
+            if len(block) == 0:
+                with self._lock:
+                    if generation != self._generation:
+                        continue
+                    if stream.eof and nxt is not None and nxt is self._next:
+                        # Splice in the queued track where its crossfade (if any) left off
+                        self._stream = nxt
+                        self._next = None
+                        self._read_frame = next_frame
+                        self._serial += 1
+                        self.track_gain = nxt.gain_db
+                        stream.close()
+                        continue
+                    if stream.eof:
+                        # Nothing left to feed; is_playing() turns False once the sink drains
+                        self._wake.wait(0.05)
+                continue
+
+            # Work in float [-1, 1] from here until _finish()
+            out = block.astype(np.float32) * (self._gain(stream) / 32768.0)
+            consumed_next = 0
+            if nxt is not None and self.crossfade > 0:
+                out, consumed_next = self._mix_crossfade(out, stream, frame, nxt, next_frame)
+            out = self.dsp.process(out)
+            self.mix_seconds_max = max(self.mix_seconds_max, time.perf_counter() - started)
+
+            with self._lock:
+                if generation != self._generation or nxt is not self._next:
+                    continue
+                self._timeline.append((self._written, frame, len(block), self._serial, stream.source_path))
+                self.sink.write(self._finish(out))
+                if self.tap:
+                    self.tap.push(self._written, out)
+                self._written += len(block)
+                self._read_frame = frame + len(block)
+                self._next_frame = next_frame + consumed_next
+
+    def _mix_crossfade(self, out, stream, frame, nxt, next_frame):
+        """Blend the start of `nxt` into the tail of `stream` with an equal-power fade."""
+        fade = int(self.crossfade * self.rate)
+        total = stream.total_frames
+        if total is None:
+            # The fade can only start once we know where the track ends: make sure the
+            # decoder is at least one fade length ahead (normally it is far ahead already)
+            stream.wait_for(frame + len(out) + fade, timeout=0.5)
+            total = stream.total_frames
+            if total is None:
+                return out, 0
+        fade = min(fade, total)
+        fade_start = total - fade
+        first = max(0, fade_start - frame)
+        n = len(out) - first
+        if n <= 0:
+            return out, 0
+        incoming = nxt.read(next_frame, n, timeout=NEXT_READ_TIMEOUT)
+        m = len(incoming)
+        t = (np.arange(frame + first, frame + first + n, dtype=np.float32) - fade_start) / max(1, fade)
+        out[first:] *= np.cos(t * (np.pi / 2))[:, None]
+        if m:
+            out[first:first + m] += incoming.astype(np.float32) * (np.sin(t[:m] * (np.pi / 2))[:, None] * (self._gain(nxt) / 32768.0))
+        return out, m
+
+    def _finish(self, out):
+        return np.clip(out * 32768.0, -32768, 32767).astype(np.int16)
@@ -1,26 +1,79 @@
-import pygame
 import os
+import io
 import shutil
 import subprocess
+import tempfile
 from mutagen import File
 import imageio_ffmpeg
 import platform
+import threading
+from collections import deque
+import tracing
+from audio_backend import PygameBackend
+
+# Converted audio up to this size is kept in memory; larger outputs spill to a temp file
+DEFAULT_MEMORY_CAP = 64 * 1024 * 1024
+STDERR_KEEP_LINES = 50  # Last ffmpeg log lines kept for error messages
+
+
+def conversion_command(file_path, output):
+    """ffmpeg arguments that transcode file_path to OGG/Vorbis at `output` (a path or 'pipe:1')."""
+    # -vn: disable video
+    # -ar 44100: resample to 44.1kHz
+    # -acodec libvorbis: use Vorbis codec for OGG
+    return [
+        imageio_ffmpeg.get_ffmpeg_exe(),
+        '-y',
+        '-nostats', '-loglevel', 'error',
+        '-i', file_path,
+        '-vn',
+        '-ar', '44100',
+        '-acodec', 'libvorbis',
+        '-f', 'ogg',
+        output
+    ]
+
+
+def drain_stderr(process, keep=STDERR_KEEP_LINES):
+    """
+    Read process.stderr on a thread while the caller reads stdout, so a file
+    that logs an error per packet can't fill the pipe and block ffmpeg.
+    Returns (thread, lines): join the thread, then b''.join(lines) holds
+    the last `keep` lines.
+    """
+    lines = deque(maxlen=keep)
+
+    def run():
+        for line in process.stderr:
+            lines.append(line)
+        process.stderr.close()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread, lines
+
 
 class MusicPlayer:
-    def __init__(self):
-        pygame.mixer.init()
+    def __init__(self, memory_cap=DEFAULT_MEMORY_CAP, temp_root=None, staging=None, backend=None):
+        # pygame.mixer.music unless given another audio_backend (NullBackend for headless runs)
+        self.backend = backend or PygameBackend()
         self.current_file = None
         self.current_file_obj = None  # Handle for open file object
         self.temp_file = None
         self.paused = False
         self.start_time = 0.0  # Track start position for seeking
         self.volume = 0.5
-        pygame.mixer.music.set_volume(self.volume)
-        
-        # Create temp dir
-        self.temp_dir = os.path.join(os.getcwd(), "temp_audio")
-        if not os.path.exists(self.temp_dir):
-            os.makedirs(self.temp_dir)
+        self.track_gain = 0.0  # Loudness normalization in dB for the loaded track
+        self.backend.set_volume(self.volume)
+
+        # Conversion output above memory_cap bytes goes to a temp dir under
+        # temp_root (system default if None), created on first use. 0 = always disk.
+        self.memory_cap = memory_cap
+        self.temp_root = temp_root
+        self.temp_dir = None
+
+        # Optional StagingCache; tracks it has copied locally are played from the copy
+        self.staging = staging
 
     def __del__(self):
         self.cleanup_temp()
@@ -28,7 +81,7 @@ class MusicPlayer:
     def cleanup_temp(self):
         # Stop playback before deleting files
         try:
-            pygame.mixer.music.unload()
+            self.backend.unload()
         except:
             pass
             
@@ -44,8 +97,15 @@ class MusicPlayer:
                 shutil.rmtree(self.temp_dir)
             except:
                 pass
+        self.temp_dir = None
+        self.temp_file = None
 
+    @tracing.traced("load_file", arg="file_path")
     def load_file(self, file_path):
+        source_path = file_path
+        if self.staging:
+            file_path = self.staging.local_path(file_path) or file_path
+
         if not os.path.exists(file_path):
             raise FileNotFoundError("File not found")
 
@@ -57,7 +117,7 @@ class MusicPlayer:
                 pass
             self.current_file_obj = None
 
-        self.current_file = file_path
+        self.current_file = source_path
         self.start_time = 0.0
         
         # On macOS, force FFmpeg conversion for AAC/M4A/MP4 to avoid SDL_mixer issues
@@ -69,9 +129,9 @@ class MusicPlayer:
         # Use file object to handle unicode paths better on some systems
         try:
             self.current_file_obj = open(file_path, 'rb')
-            pygame.mixer.music.load(self.current_file_obj)
+            self.backend.load(self.current_file_obj)
             return self._get_duration(file_path)
-        except (pygame.error, OSError) as e:
+        except (self.backend.error, OSError) as e:
             # If direct load fails, close the file object
             if self.current_file_obj:
                 try:
@@ -92,45 +152,40 @@ class MusicPlayer:
         # Convert to ogg using ffmpeg directly (for reliable seeking on unsupported formats)
         return self._load_via_conversion(file_path)
 
+    @tracing.traced("ffmpeg_conversion", arg="file_path")
     def _load_via_conversion(self, file_path):
         try:
             # Unload previous file to release lock
             try:
-                pygame.mixer.music.unload()
+                self.backend.unload()
             except Exception:
                 pass
+            if self.current_file_obj:
+                try:
+                    self.current_file_obj.close()
+                except:
+                    pass
+                self.current_file_obj = None
 
-            # Generate temp file path with unique name
-            import uuid
             # Use .ogg for better seeking support in pygame
-            temp_file = os.path.join(self.temp_dir, f"playback_{uuid.uuid4().hex}.ogg")
-            ffmpeg_exe = imageio_ffmpeg.get_ffmpeg_exe()
-            
-            # Convert directly using ffmpeg
-            # -vn: disable video
-            # -ar 44100: resample to 44.1kHz
-            # -acodec libvorbis: use Vorbis codec for OGG
-            process = subprocess.run([
-                ffmpeg_exe, 
-                '-y', 
-                '-i', file_path, 
-                '-vn',
-                '-ar', '44100',
-                '-acodec', 'libvorbis',
-                temp_file
-            ], capture_output=True, check=True)
-            
-            # Load into pygame
-            pygame.mixer.music.load(temp_file)
-            
+            data, temp_file = self._convert_to_ogg(file_path)
+
             # Clean up previous temp file
             if self.temp_file and os.path.exists(self.temp_file) and self.temp_file != temp_file:
                 try:
                     os.remove(self.temp_file)
                 except:
                     pass
-                    
             self.temp_file = temp_file
+
+            if data is not None:
+                # Separate BytesIO objects share the same bytes without copying
+                self.current_file_obj = io.BytesIO(data)
+                self.backend.load(self.current_file_obj, "ogg")
+                return self._get_duration(io.BytesIO(data))
+
+            # Load into the backend
+            self.backend.load(temp_file)
             
             # Get duration
             return self._get_duration(temp_file)
@@ -141,6 +196,58 @@ class MusicPlayer:
             print(f"Error converting/loading file: {e}")
             raise e
 
+    def _convert_to_ogg(self, file_path):
+        """
+        Run ffmpeg with its output on a pipe. Returns (bytes, None) when the
+        result fits in memory_cap, otherwise (None, temp_file_path) after
+        spilling everything to disk.
+        """
+        process = subprocess.Popen(conversion_command(file_path, 'pipe:1'),
+                                   stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        reader, log = drain_stderr(process)
+        buf = bytearray()
+        spill = None
+        temp_file = None
+        try:
+            while True:
+                chunk = process.stdout.read(1024 * 1024)
+                if not chunk:
+                    break
+                if spill is not None:
+                    spill.write(chunk)
+                    continue
+                buf += chunk
+                if len(buf) > self.memory_cap:
+                    if not self.temp_dir:
+                        self.temp_dir = tempfile.mkdtemp(prefix="musicplayer_", dir=self.temp_root)
+                    # Generate temp file path with unique name
+                    import uuid
+                    temp_file = os.path.join(self.temp_dir, f"playback_{uuid.uuid4().hex}.ogg")
+                    spill = open(temp_file, 'wb')
+                    spill.write(buf)
+                    buf = None
+            process.wait()
+            reader.join()
+            stderr = b"".join(log)
+        except BaseException:
+            process.kill()
+            process.wait()
+            if spill is not None:
+                spill.close()
+                os.remove(temp_file)
+            raise
+        finally:
+            process.stdout.close()
+        if spill is not None:
+            spill.close()
+        if process.returncode != 0:
+            if temp_file:
+                os.remove(temp_file)
+            raise subprocess.CalledProcessError(process.returncode, process.args, stderr=stderr)
+        if spill is not None:
+            return None, temp_file
+        return bytes(buf), None
+
     def _get_duration(self, file_path):
         try:
             audio = File(file_path)
@@ -153,46 +260,54 @@ class MusicPlayer:
     def play(self):
         if self.current_file:
             if self.paused:
-                pygame.mixer.music.unpause()
+                self.backend.unpause()
                 self.paused = False
             else:
                 self.start_time = 0.0
-                pygame.mixer.music.play()
+                self.backend.play()
 
     def pause(self):
         if self.current_file and not self.paused:
-            pygame.mixer.music.pause()
+            self.backend.pause()
             self.paused = True
 
     def stop(self):
-        pygame.mixer.music.stop()
+        self.backend.stop()
         self.paused = False
         self.start_time = 0.0
 
     def set_volume(self, volume):
         # volume: 0.0 to 1.0
         self.volume = max(0.0, min(1.0, volume))
-        pygame.mixer.music.set_volume(self.volume)
+        self.backend.set_volume(self._effective_volume())
+
+    def set_track_gain(self, gain_db):
+        # Combined with the slider; the mixer cannot go above 1.0 so boosts are capped there
+        self.track_gain = gain_db or 0.0
+        self.backend.set_volume(self._effective_volume())
+
+    def _effective_volume(self):
+        return min(1.0, self.volume * 10 ** (self.track_gain / 20.0))
         
     def seek(self, position):
         if self.current_file:
             try:
                 # Play from new position
                 # Note: 'start' argument works for MP3 and OGG (absolute time)
-                pygame.mixer.music.play(start=position)
+                self.backend.play(start=position)
                 self.start_time = position
                 # If was paused, this will resume it, so update state
                 self.paused = False
-            except pygame.error as e:
+            except self.backend.error as e:
                 print(f"Seek error: {e}")
 
     def is_playing(self):
-        return pygame.mixer.music.get_busy()
+        return self.backend.get_busy()
 
     def get_position(self):
         # Returns current position in seconds
         if self.current_file:
-            pos = pygame.mixer.music.get_pos()
+            pos = self.backend.get_pos()
             if pos == -1:
                 return 0.0
             return self.start_time + (pos / 1000.0)
@@ -0,0 +1,322 @@
+"""
+Streaming readers and writers for M3U/M3U8, PLS and CUE playlists.
+
+Readers are generators over the file's lines, so a 100k-entry playlist is
+never held in memory whole. Every line is decoded with normalize_text
+(UTF-8, then GBK) since .m3u/.pls/.cue files from Windows players are
+often in the ANSI code page. Relative entries are resolved against the
+playlist's folder.
+
+Tracks inside a single-file rip (CUE sheets, or M3U entries carrying VLC
+start/stop options) become virtual tracks: the audio path plus a media
+fragment, "album.flac#t=245.32,512.1". split_virtual() turns that back
+into the file and the offsets the player seeks to.
+"""
+import os
+import re
+import json
+from urllib.parse import unquote, urlsplit
+
+EXTENSIONS = ('.m3u', '.m3u8', '.pls', '.cue')
+CUE_FRAMES = 75  # INDEX mm:ss:ff frames per second
+_VIRTUAL = re.compile(r'#t=(\d+(?:\.\d+)?)(?:,(\d+(?:\.\d+)?))?$')
+_PLS_KEY = re.compile(r'(file|title|length)(\d+)$', re.IGNORECASE)
+
+
+class PlaylistEntry:
+    __slots__ = ('path', 'title', 'artist', 'duration', 'start', 'end')
+
+    def __init__(self, path, title=None, artist=None, duration=None, start=None, end=None):
+        self.path = path
+        self.title = title
+        self.artist = artist
+        self.duration = duration
+        self.start = start
+        self.end = end
+
+    @property
+    def location(self):
+        """What goes into the playlist: the path, or a virtual track path."""
+        if not self.start and self.end is None:
+            return self.path  # Whole file
+        return virtual_path(self.path, self.start or 0.0, self.end)
+
+    def __repr__(self):
+        return f"PlaylistEntry({self.location!r}, title={self.title!r})"
+
+
+def virtual_path(path, start, end=None):
+    fragment = f"#t={start:.3f}" if end is None else f"#t={start:.3f},{end:.3f}"
+    return path + fragment
+
+
+def split_virtual(location):
+    """(file path, start seconds, end seconds or None); start is 0.0 for ordinary paths."""
+    match = _VIRTUAL.search(location)
+    if not match:
+        return location, 0.0, None
+    end = float(match.group(2)) if match.group(2) else None
+    return location[:match.start()], float(match.group(1)), end
+
+
+def is_virtual(location):
+    return _VIRTUAL.search(location) is not None
+
+
+def display_name(location):
+    path, start, _ = split_virtual(location)
+    name = os.path.basename(path)
+    if start or location != path:
+        minutes, seconds = divmod(int(start), 60)
+        name += f" @ {minutes:02d}:{seconds:02d}"
+    return name
+
+
+def audio_files(sources):
+    """
+    Distinct existing audio files behind command-line sources: playlist.json
+    files (CUE tracks count as their file, once), directories and plain
+    files, in order. Missing files are reported and skipped.
+    """
+    from scanner import iter_audio_files
+    locations = []
+    for source in sources:
+        if source.endswith('.json'):
+            with open(source, 'r', encoding='utf-8') as f:
+                locations.extend(json.load(f).get('playlist', []))
+        elif os.path.isdir(source):
+            locations.extend(iter_audio_files(source))
+        else:
+            locations.append(source)
+    files = list(dict.fromkeys(split_virtual(location)[0] for location in locations))
+    found = [path for path in files if os.path.exists(path)]
+    if len(found) < len(files):
+        print(f"Skipping {len(files) - len(found)} missing file(s)")
+    return found
+
+
+def _lines(path):
+    # Imported here: the GUI imports this module at startup for split_virtual/display_name
+    from metadata import normalize_text
+    with open(path, 'rb') as f:
+        first = True
+        for raw in f:
+            if first:
+                raw = raw[3:] if raw.startswith(b'\xef\xbb\xbf') else raw
+                first = False
+            line = normalize_text(raw.rstrip(b'\r\n')).strip()
+            if line:
+                yield line
+
+
+def _resolve(entry, base):
+    if entry.lower().startswith('file://'):
+        parts = urlsplit(entry)
+        entry = unquote(parts.path)
+        if re.match(r'^/[A-Za-z]:', entry):
+            entry = entry[1:]  # file:///C:/... on Windows
+    elif re.match(r'^[a-z][a-z0-9+.-]+://', entry, re.IGNORECASE):
+        return entry  # Stream URL: leave for the caller to skip or keep
+    if not os.path.isabs(entry) and not re.match(r'^[A-Za-z]:[\\/]', entry):
+        entry = os.path.normpath(os.path.join(base, entry.replace('\\', os.sep)))
+    return entry
+
+
+def read_m3u(path):
+    """PlaylistEntry per track; #EXTINF supplies duration/artist/title, #EXTVLCOPT start/stop-time."""
+    base = os.path.dirname(os.path.abspath(path))
+    info = {}
+    for line in _lines(path):
+        if line.startswith('#'):
+            upper = line[:16].upper()
+            if upper.startswith('#EXTINF:'):
+                length, _, name = line[8:].partition(',')
+                try:
+                    info['duration'] = float(length.split()[0]) if length.strip() else None
+                except ValueError:
+                    pass
+                artist, sep, title = name.partition(' - ')
+                if sep:
+                    info['artist'], info['title'] = artist.strip(), title.strip()
+                elif name.strip():
+                    info['title'] = name.strip()
+            elif upper.startswith('#EXTVLCOPT:'):
+                key, _, value = line[11:].partition('=')
+                key = key.strip().lower()
+                if key in ('start-time', 'stop-time'):
+                    try:
+                        info['start' if key == 'start-time' else 'end'] = float(value)
+                    except ValueError:
+                        pass
+            continue
+        entry = PlaylistEntry(_resolve(line, base), **info)
+        if entry.duration is not None and entry.duration < 0:
+            entry.duration = None  # -1 means unknown
+        info = {}
+        yield entry
+
+
+def read_pls(path):
+    """
+    PlaylistEntry per FileN. Entries are emitted as soon as a higher
+    number shows up, so only the entries in flight are kept.
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    pending = {}
+
+    def flush(below=None):
+        for number in sorted(n for n in pending if below is None or n < below):
+            fields = pending.pop(number)
+            if 'file' in fields:
+                length = fields.get('length')
+                try:
+                    duration = float(length) if length is not None and float(length) >= 0 else None
+                except ValueError:
+                    duration = None
+                yield PlaylistEntry(_resolve(fields['file'], base), fields.get('title'), duration=duration)
+
+    for line in _lines(path):
+        key, sep, value = line.partition('=')
+        match = _PLS_KEY.match(key.strip()) if sep else None
+        if not match:
+            continue
+        number = int(match.group(2))
+        yield from flush(number)
+        pending.setdefault(number, {})[match.group(1).lower()] = value.strip()
+    yield from flush()
+
+
+def _cue_value(rest):
+    rest = rest.strip()
+    if len(rest) >= 2 and rest[0] == '"':
+        end = rest.find('"', 1)
+        return rest[1:end] if end > 0 else rest[1:]
+    return rest
+
+
+def _cue_time(text):
+    minutes, seconds, frames = (int(x) for x in text.strip().split(':'))
+    return minutes * 60 + seconds + frames / CUE_FRAMES
+
+
+def read_cue(path):
+    """
+    Virtual PlaylistEntry per TRACK: start at its INDEX 01, end at the next
+    track's INDEX 01 in the same FILE (None for the last one, i.e. play to
+    the end of the file). A track is emitted once the next one starts.
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    audio = None
+    album_artist = None
+    current = None  # Track whose lines are being read
+    pending = None  # Previous track, waiting for its end
+
+    def finish(entry, end):
+        entry.end = end
+        if end is not None:
+            entry.duration = end - entry.start
+        return entry
+
+    for line in _lines(path):
+        command, _, rest = line.partition(' ')
+        command = command.upper()
+        if command == 'FILE':
+            # `FILE "name.flac" WAVE`: the name is quoted, or everything up to the type
+            audio = _resolve(_cue_value(rest) if rest.strip().startswith('"') else rest.rsplit(' ', 1)[0], base)
+            current = None
+        elif command == 'TRACK':
+            current = PlaylistEntry(audio, artist=album_artist) if audio else None
+        elif command == 'TITLE' and current is not None:
+            current.title = _cue_value(rest)
+        elif command == 'PERFORMER':
+            if current is not None:
+                current.artist = _cue_value(rest)
+            else:
+                album_artist = _cue_value(rest)
+        elif command == 'INDEX' and current is not None and current.start is None:
+            number, _, stamp = rest.strip().partition(' ')
+            if number != '01':
+                continue  # INDEX 00 is the pregap
+            try:
+                current.start = _cue_time(stamp)
+            except ValueError:
+                continue
+            if pending is not None:
+                yield finish(pending, current.start if pending.path == current.path else None)
+            pending = current
+    if pending is not None:
+        yield finish(pending, None)
+
+
+def read_playlist(path):
+    """Entries of any supported playlist, picked by extension."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.pls':
+        return read_pls(path)
+    if ext == '.cue':
+        return read_cue(path)
+    if ext in ('.m3u', '.m3u8'):
+        return read_m3u(path)
+    raise ValueError(f"Unsupported playlist type: {ext}")
+
+
+def _relative(location, base):
+    try:
+        rel = os.path.relpath(location, base)
+    except ValueError:
+        return location  # Different drive
+    return location if rel.startswith('..' + os.sep + '..') else rel
+
+
+def write_m3u(path, entries, relative=True):
+    """
+    Write entries (PlaylistEntry or path strings) as extended M3U, UTF-8.
+    Virtual tracks are written as the file plus #EXTVLCOPT start/stop-time,
+    which read_m3u (and VLC) understand. Returns the number written.
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        f.write("#EXTM3U\n")
+        for entry in entries:
+            if isinstance(entry, str):
+                file_path, start, end = split_virtual(entry)
+                entry = PlaylistEntry(file_path, start=start if is_virtual(entry) else None, end=end)
+            if entry.title or entry.duration:
+                name = f"{entry.artist} - {entry.title}" if entry.artist and entry.title else \
+                    entry.title or os.path.splitext(os.path.basename(entry.path))[0]
+                f.write(f"#EXTINF:{int(entry.duration) if entry.duration else -1},{name}\n")
+            if entry.start is not None:
+                f.write(f"#EXTVLCOPT:start-time={entry.start:.3f}\n")
+            if entry.end is not None:
+                f.write(f"#EXTVLCOPT:stop-time={entry.end:.3f}\n")
+            location = _relative(entry.path, base) if relative else entry.path
+            f.write(location.replace(os.sep, '/') + "\n")
+            count += 1
+    return count
+
+
+def write_pls(path, entries, relative=True):
+    """Write entries as PLS v2. Virtual tracks lose their offsets (PLS has no way to say them)."""
+    base = os.path.dirname(os.path.abspath(path))
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        f.write("[playlist]\n")
+        for entry in entries:
+            if isinstance(entry, str):
+                entry = PlaylistEntry(split_virtual(entry)[0])
+            count += 1
+            location = _relative(entry.path, base) if relative else entry.path
+            f.write(f"File{count}={location}\n")
+            if entry.title:
+                f.write(f"Title{count}={entry.title}\n")
+            f.write(f"Length{count}={int(entry.duration) if entry.duration else -1}\n")
+        f.write(f"NumberOfEntries={count}\nVersion=2\n")
+    return count
+
+
+def write_playlist(path, entries, relative=True):
+    """Write M3U/M3U8 or PLS, picked by extension."""
+    if os.path.splitext(path)[1].lower() == '.pls':
+        return write_pls(path, entries, relative)
+    return write_m3u(path, entries, relative)
@@ -0,0 +1,380 @@
+"""
+Play order for the playlist: the display order, an optional shuffle
+order, an up-next queue and a repeat mode, all keyed by stable track ids.
+
+Both orders are IdSequences: ids kept in blocks of at most 2 * BLOCK, a
+dict from id to its block, and a Fenwick tree over the block sizes. An
+id's position is the size of the blocks before it (a tree prefix sum)
+plus its offset in its own block; the id at a position is a tree descent
+plus a list index. So position lookups, removals, inserts and next/
+previous are O(log n) (plus a scan of one bounded block) instead of
+the list.pop/list.index and index fix-ups a plain list needs.
+
+The shuffle order is drawn once when shuffle is turned on. Tracks added
+later are inserted at a random place among those still to come, and
+removed tracks are simply dropped from it, so an edit never reshuffles.
+"""
+import random
+from collections import deque
+
+BLOCK = 512  # Blocks are split in two above 2 * BLOCK ids
+REPEAT_ALL = 'all'
+REPEAT_ONE = 'one'
+REPEAT_OFF = 'off'
+REPEAT_MODES = (REPEAT_ALL, REPEAT_ONE, REPEAT_OFF)  # Order the repeat button cycles through
+
+
+class _Block:
+    __slots__ = ('items', 'index')
+
+    def __init__(self, items, index):
+        self.items = items
+        self.index = index  # Position in IdSequence._blocks
+
+
+class IdSequence:
+    """An ordered set of ids with O(log n) id -> position and position -> id."""
+
+    def __init__(self, ids=()):
+        self._blocks = []
+        self._block_of = {}
+        self._len = 0
+        self._tree = [0]
+        self.extend(ids)
+
+    def _rebuild(self, start=0):
+        # Renumber blocks from `start` and rebuild the Fenwick tree over their sizes
+        for i in range(start, len(self._blocks)):
+            self._blocks[i].index = i
+        tree = [0] + [len(block.items) for block in self._blocks]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _add(self, index, delta):
+        i = index + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _before(self, index):
+        """Number of ids in the blocks before blocks[index]."""
+        total = 0
+        i = index
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _find(self, position):
+        """(block, offset) holding the id at position (0 <= position < len)."""
+        i = 0
+        step = 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            if i + step < len(self._tree) and self._tree[i + step] <= position:
+                i += step
+                position -= self._tree[i]
+            step >>= 1
+        return self._blocks[i], position
+
+    def _split(self, block):
+        half = len(block.items) // 2
+        tail = _Block(block.items[half:], block.index + 1)
+        del block.items[half:]
+        for tid in tail.items:
+            self._block_of[tid] = tail
+        self._blocks.insert(tail.index, tail)
+        self._rebuild(tail.index)
+
+    def __len__(self):
+        return self._len
+
+    def __contains__(self, tid):
+        return tid in self._block_of
+
+    def __iter__(self):
+        for block in self._blocks:
+            yield from block.items
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += self._len
+        if not 0 <= position < self._len:
+            raise IndexError("queue index out of range")
+        block, offset = self._find(position)
+        return block.items[offset]
+
+    def index(self, tid):
+        block = self._block_of.get(tid)
+        if block is None:
+            raise ValueError(f"{tid!r} is not in the queue")
+        return self._before(block.index) + block.items.index(tid)
+
+    def insert(self, position, tid):
+        """Insert tid before position (clamped to the ends). Returns False if it is already present."""
+        if tid in self._block_of:
+            return False
+        if not self._blocks:
+            self._blocks.append(_Block([], 0))
+            self._rebuild()
+        if position >= self._len:
+            block, offset = self._blocks[-1], len(self._blocks[-1].items)
+        else:
+            block, offset = self._find(max(0, position))
+        block.items.insert(offset, tid)
+        self._block_of[tid] = block
+        self._len += 1
+        self._add(block.index, 1)
+        if len(block.items) > 2 * BLOCK:
+            self._split(block)
+        return True
+
+    def append(self, tid):
+        return self.insert(self._len, tid)
+
+    def extend(self, ids):
+        """Append ids not already present; returns how many were added."""
+        fresh = [tid for tid in dict.fromkeys(ids) if tid not in self._block_of]
+        if not fresh:
+            return 0
+        start = len(self._blocks)
+        if self._blocks and len(self._blocks[-1].items) < BLOCK:
+            start -= 1
+            last = self._blocks[-1]
+            room = BLOCK - len(last.items)
+            last.items.extend(fresh[:room])
+            for tid in fresh[:room]:
+                self._block_of[tid] = last
+            rest = fresh[room:]
+        else:
+            rest = fresh
+        for i in range(0, len(rest), BLOCK):
+            block = _Block(rest[i:i + BLOCK], len(self._blocks))
+            for tid in block.items:
+                self._block_of[tid] = block
+            self._blocks.append(block)
+        self._len += len(fresh)
+        self._rebuild(start)
+        return len(fresh)
+
+    def remove(self, tid):
+        """Remove tid; returns False if it wasn't present."""
+        block = self._block_of.pop(tid, None)
+        if block is None:
+            return False
+        block.items.remove(tid)
+        self._len -= 1
+        if block.items:
+            self._add(block.index, -1)
+        else:
+            del self._blocks[block.index]
+            self._rebuild(block.index)
+        return True
+
+    def after(self, tid):
+        """The id following tid, or None at the end."""
+        block = self._block_of[tid]
+        offset = block.items.index(tid)
+        if offset + 1 < len(block.items):
+            return block.items[offset + 1]
+        if block.index + 1 < len(self._blocks):
+            return self._blocks[block.index + 1].items[0]
+        return None
+
+    def before(self, tid):
+        """The id preceding tid, or None at the start."""
+        block = self._block_of[tid]
+        offset = block.items.index(tid)
+        if offset > 0:
+            return block.items[offset - 1]
+        if block.index > 0:
+            return self._blocks[block.index - 1].items[-1]
+        return None
+
+    def first(self):
+        return self._blocks[0].items[0] if self._blocks else None
+
+    def last(self):
+        return self._blocks[-1].items[-1] if self._blocks else None
+
+
+class PlayQueue:
+    """
+    The playlist as the GUI sees it (len, iteration, [i], index(), append,
+    remove in display order) plus what decides the next track: `current`,
+    the up-next queue, shuffle and the repeat mode.
+    """
+
+    def __init__(self, ids=(), repeat=REPEAT_ALL, seed=None):
+        self.order = IdSequence(ids)
+        self.shuffled = None  # IdSequence while shuffle is on
+        self.up_next = deque()  # Ids to play before continuing in order
+        self.current = None
+        self.repeat = repeat
+        self._rng = random.Random(seed)
+
+    # Display order, list-style
+    def __len__(self):
+        return len(self.order)
+
+    def __iter__(self):
+        return iter(self.order)
+
+    def __contains__(self, tid):
+        return tid in self.order
+
+    def __getitem__(self, position):
+        return self.order[position]
+
+    def index(self, tid):
+        return self.order.index(tid)
+
+    def position(self):
+        """Display position of the current track, or -1."""
+        return self.order.index(self.current) if self.current in self.order else -1
+
+    def _shuffle_insert(self, tid):
+        # Somewhere among the tracks still to come in this pass, uniformly
+        start = self.shuffled.index(self.current) + 1 if self.current in self.shuffled else 0
+        self.shuffled.insert(self._rng.randint(start, len(self.shuffled)), tid)
+
+    def insert(self, position, tid):
+        if not self.order.insert(position, tid):
+            return False
+        if self.shuffled is not None:
+            self._shuffle_insert(tid)
+        return True
+
+    def append(self, tid):
+        """Add tid at the end; returns False (and changes nothing) if it is already queued."""
+        return self.insert(len(self.order), tid)
+
+    def extend(self, ids):
+        ids = [tid for tid in dict.fromkeys(ids) if tid not in self.order]
+        self.order.extend(ids)
+        if self.shuffled is not None:
+            for tid in ids:
+                self._shuffle_insert(tid)
+        return len(ids)
+
+    def remove(self, tid):
+        if not self.order.remove(tid):
+            return False
+        if self.shuffled is not None:
+            self.shuffled.remove(tid)
+        if tid in self.up_next:
+            self.up_next = deque(t for t in self.up_next if t != tid)
+        if self.current == tid:
+            self.current = None
+        return True
+
+    def clear(self):
+        self.order = IdSequence()
+        if self.shuffled is not None:
+            self.shuffled = IdSequence()
+        self.up_next.clear()
+        self.current = None
+
+    def replace(self, ids):
+        """New contents; shuffle and repeat settings stay."""
+        self.clear()
+        self.order.extend(ids)
+        if self.shuffled is not None:
+            self.set_shuffle(True)
+
+    @property
+    def shuffle(self):
+        return self.shuffled is not None
+
+    def set_shuffle(self, enabled):
+        """Turning shuffle on draws a new order with the current track first."""
+        if not enabled:
+            self.shuffled = None
+            return
+        ids = list(self.order)
+        self._rng.shuffle(ids)
+        if self.current in self.order:
+            ids.remove(self.current)
+            ids.insert(0, self.current)
+        self.shuffled = IdSequence(ids)
+
+    def play_next(self, tid):
+        """Queue tid to play after the current track, behind anything already queued."""
+        if tid in self.order:
+            self.up_next.append(tid)
+
+    def set_current(self, tid):
+        self.current = tid
+        if self.up_next and self.up_next[0] == tid:
+            self.up_next.popleft()
+
+    def _active(self):
+        return self.shuffled if self.shuffled is not None else self.order
+
+    def peek_next(self, manual=False):
+        """
+        The track that follows the current one, without moving. Repeat-one
+        only holds for automatic advances; `manual` (the next button) moves on.
+        None when the queue is empty or ran out with repeat off.
+        """
+        if self.repeat == REPEAT_ONE and not manual and self.current in self.order:
+            return self.current
+        if self.up_next:
+            return self.up_next[0]
+        active = self._active()
+        if self.current not in active:
+            return active.first()
+        following = active.after(self.current)
+        if following is None and self.repeat != REPEAT_OFF:
+            following = active.first()
+        return following
+
+    def peek_previous(self):
+        active = self._active()
+        if self.current not in active:
+            return active.last()
+        previous = active.before(self.current)
+        if previous is None and self.repeat != REPEAT_OFF:
+            previous = active.last()
+        return previous
+
+    def advance(self, manual=False):
+        """Move to peek_next(manual) and return it (None: nothing left to play)."""
+        tid = self.peek_next(manual)
+        if tid is not None:
+            self.set_current(tid)
+        return tid
+
+    def back(self):
+        tid = self.peek_previous()
+        if tid is not None:
+            self.current = tid
+        return tid
+
+    def upcoming(self, count):
+        """Up to `count` ids that will play after the current one, in order, without repeats."""
+        result = []
+        seen = {self.current}
+        for tid in self.up_next:
+            if len(result) >= count:
+                return result
+            if tid not in seen:
+                result.append(tid)
+                seen.add(tid)
+        active = self._active()
+        tid = self.current if self.current in active else None
+        while len(result) < count:
+            tid = active.after(tid) if tid is not None else active.first()
+            if tid is None:
+                if self.repeat == REPEAT_OFF:
+                    break
+                tid = active.first()
+            if tid in seen:
+                if tid == self.current or len(seen) > len(active):
+                    break
+                continue
+            result.append(tid)
+            seen.add(tid)
+        return result
@@ -0,0 +1,238 @@
+import os
+import json
+import threading
+
+SUPPORTED_EXTENSIONS = ('.mp3', '.flac', '.m4a', '.wav', '.ogg', '.dsf')
+
+
+def is_audio_file(name):
+    return name.lower().endswith(SUPPORTED_EXTENSIONS)
+
+
+def iter_audio_files(directory):
+    """Full walk of a directory tree, yielding supported audio file paths."""
+    for root, dirs, files in os.walk(directory):
+        for file in files:
+            if is_audio_file(file):
+                yield os.path.join(root, file)
+
+
+class ScanDelta:
+    __slots__ = ('added', 'removed', 'modified')
+
+    def __init__(self):
+        self.added = []
+        self.removed = []
+        self.modified = []
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.modified)
+
+    def __repr__(self):
+        return f"ScanDelta(added={len(self.added)}, removed={len(self.removed)}, modified={len(self.modified)})"
+
+
+class LibraryScanner:
+    """
+    Tracks registered library roots and finds changes by comparing directory
+    mtimes against a stored snapshot.
+
+    A directory's mtime only changes when entries are added, removed or
+    renamed in it, so an unchanged tree costs one stat() per directory and
+    no listing at all. Files rewritten in place (e.g. tag edits) do not touch
+    the directory mtime; pass deep=True to rescan() to also stat every file.
+    """
+
+    def __init__(self, snapshot_path=os.path.join("cache", "library_snapshot.json")):
+        self.snapshot_path = snapshot_path
+        self.roots = []
+        # dir path -> [dir mtime, {filename: [size, mtime]}, [subdir names]]
+        self._dirs = {}
+        self._lock = threading.Lock()
+        self._watch_thread = None
+        self._watch_stop = threading.Event()
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            self.roots = state.get('roots', [])
+            self._dirs = state.get('dirs', {})
+        except Exception as e:
+            print(f"Failed to load library snapshot: {e}")
+
+    def save(self):
+        state = {'roots': self.roots, 'dirs': self._dirs}
+        try:
+            directory = os.path.dirname(self.snapshot_path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            tmp_path = self.snapshot_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False)
+            os.replace(tmp_path, self.snapshot_path)
+        except Exception as e:
+            print(f"Failed to save library snapshot: {e}")
+
+    def add_root(self, directory):
+        """Register a root, walk it fully and return the audio files found."""
+        directory = os.path.normpath(directory)
+        delta = ScanDelta()
+        with self._lock:
+            if directory not in self.roots:
+                self.roots.append(directory)
+            self._drop_subtree(directory, None)
+            self._scan_new_dir(directory, delta)
+        self.save()
+        return delta.added
+
+    def remove_root(self, directory):
+        directory = os.path.normpath(directory)
+        with self._lock:
+            if directory in self.roots:
+                self.roots.remove(directory)
+                self._drop_subtree(directory, None)
+        self.save()
+
+    def rescan(self, deep=False):
+        """Compare the registered roots against the snapshot and return a ScanDelta."""
+        delta = ScanDelta()
+        with self._lock:
+            for root in self.roots:
+                if root in self._dirs:
+                    self._rescan_dir(root, delta, deep)
+                elif os.path.isdir(root):
+                    self._scan_new_dir(root, delta)
+        if delta:
+            self.save()
+        return delta
+
+    def _scan_new_dir(self, directory, delta):
+        try:
+            dir_mtime = os.stat(directory).st_mtime
+            entries = list(os.scandir(directory))
+        except OSError:
+            return
+        files = {}
+        subdirs = []
+        for entry in entries:
+            try:
+                if entry.is_dir():
+                    subdirs.append(entry.name)
+                elif is_audio_file(entry.name):
+                    st = entry.stat()
+                    files[entry.name] = [st.st_size, st.st_mtime]
+                    delta.added.append(entry.path)
+            except OSError:
+                pass
+        self._dirs[directory] = [dir_mtime, files, subdirs]
+        for name in subdirs:
+            self._scan_new_dir(os.path.join(directory, name), delta)
+
+    def _drop_subtree(self, directory, delta):
+        record = self._dirs.pop(directory, None)
+        if record is None:
+            return
+        _, files, subdirs = record
+        if delta is not None:
+            delta.removed.extend(os.path.join(directory, name) for name in files)
+        for name in subdirs:
+            self._drop_subtree(os.path.join(directory, name), delta)
+
+    def _rescan_dir(self, directory, delta, deep):
+        record = self._dirs[directory]
+        old_mtime, files, subdirs = record
+        try:
+            dir_mtime = os.stat(directory).st_mtime
+        except OSError:
+            self._drop_subtree(directory, delta)
+            return
+
+        if dir_mtime != old_mtime:
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                self._drop_subtree(directory, delta)
+                return
+            new_files = {}
+            new_subdirs = []
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        new_subdirs.append(entry.name)
+                    elif is_audio_file(entry.name):
+                        st = entry.stat()
+                        new_files[entry.name] = [st.st_size, st.st_mtime]
+                except OSError:
+                    continue
+            for name, stamp in new_files.items():
+                old = files.get(name)
+                if old is None:
+                    delta.added.append(os.path.join(directory, name))
+                elif old != stamp:
+                    delta.modified.append(os.path.join(directory, name))
+            for name in files:
+                if name not in new_files:
+                    delta.removed.append(os.path.join(directory, name))
+            old_subdirs = set(subdirs)
+            for name in old_subdirs.difference(new_subdirs):
+                self._drop_subtree(os.path.join(directory, name), delta)
+            record[0] = dir_mtime
+            record[1] = new_files
+            record[2] = new_subdirs
+            for name in new_subdirs:
+                path = os.path.join(directory, name)
+                if name in old_subdirs and path in self._dirs:
+                    self._rescan_dir(path, delta, deep)
+                else:
+                    self._scan_new_dir(path, delta)
+            return
+
+        if deep:
+            for name, stamp in files.items():
+                path = os.path.join(directory, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                new_stamp = [st.st_size, st.st_mtime]
+                if new_stamp != stamp:
+                    files[name] = new_stamp
+                    delta.modified.append(path)
+        for name in subdirs:
+            path = os.path.join(directory, name)
+            if path in self._dirs:
+                self._rescan_dir(path, delta, deep)
+            else:
+                self._scan_new_dir(path, delta)
+
+    def start_watch(self, interval, callback, deep=False):
+        """
+        Rescan every `interval` seconds in a background thread and call
+        callback(delta) for non-empty deltas. The callback runs on the watch
+        thread; GUI callers should hand it over with root.after.
+        """
+        self.stop_watch()
+        self._watch_stop.clear()
+
+        def run():
+            while not self._watch_stop.wait(interval):
+                try:
+                    delta = self.rescan(deep=deep)
+                except Exception as e:
+                    print(f"Library rescan failed: {e}")
+                    continue
+                if delta:
+                    callback(delta)
+
+        self._watch_thread = threading.Thread(target=run, daemon=True)
+        self._watch_thread.start()
+
+    def stop_watch(self):
+        if self._watch_thread:
+            self._watch_stop.set()
+            self._watch_thread.join(timeout=1)
+            self._watch_thread = None
@@ -0,0 +1,84 @@
+import tkinter as tk
+
+
+class WaveformSeekBar(tk.Canvas):
+    """
+    Canvas seek bar showing min/max peaks, driven by a 0-100 DoubleVar like
+    the ttk.Scale it replaces. Only columns that change colour are touched
+    when the position moves, so per-tick updates stay cheap.
+    """
+
+    def __init__(self, master, variable, command=None, height=48,
+                 fg="#9aa5b1", played="#ff4400", bg="#f0f0f0", **kwargs):
+        super().__init__(master, height=height, bg=bg, highlightthickness=0, **kwargs)
+        self._var = variable
+        self._command = command
+        self._fg = fg
+        self._played = played
+        self._peaks = None
+        self._items = []
+        self._played_cols = 0
+
+        # Our own bindtag runs before any bindings the owner adds to the widget
+        tag = f"WaveformSeekBar{id(self)}"
+        self.bindtags((tag,) + self.bindtags())
+        self.bind_class(tag, "<ButtonPress-1>", self._on_mouse)
+        self.bind_class(tag, "<B1-Motion>", self._on_mouse)
+        self.bind_class(tag, "<ButtonRelease-1>", self._on_mouse)
+        self.bind("<Configure>", lambda e: self._redraw())
+        self._var.trace_add('write', lambda *args: self._update_progress())
+
+    def get(self):
+        return self._var.get()
+
+    def set_peaks(self, peaks):
+        self._peaks = peaks
+        self._redraw()
+
+    def _on_mouse(self, event):
+        width = max(1, self.winfo_width())
+        value = max(0.0, min(100.0, event.x * 100.0 / width))
+        self._var.set(value)
+        if self._command:
+            self._command(value)
+
+    def _redraw(self):
+        self.delete("all")
+        self._items = []
+        self._played_cols = 0
+        width = self.winfo_width()
+        height = self.winfo_height()
+        if width <= 1:
+            return
+        mid = height / 2
+        scale = (height / 2 - 1) / 128.0
+        if self._peaks is None:
+            mins = maxs = [0] * width
+        else:
+            # Plain lists keep this module free of numpy, so the window can be built before it loads
+            peak_mins, peak_maxs = self._peaks[0].tolist(), self._peaks[1].tolist()
+            idx = [(x * len(peak_mins)) // width for x in range(width)]
+            mins = [peak_mins[i] for i in idx]
+            maxs = [peak_maxs[i] for i in idx]
+        for x in range(width):
+            top = mid - max(maxs[x] * scale, 1)
+            bottom = mid - min(mins[x] * scale, -1)
+            self._items.append(self.create_line(x, top, x, bottom, fill=self._fg))
+        self._update_progress()
+
+    def _update_progress(self):
+        if not self._items:
+            return
+        try:
+            value = self._var.get()
+        except tk.TclError:
+            return
+        cols = int(len(self._items) * max(0.0, min(100.0, value)) / 100.0)
+        old = self._played_cols
+        if cols > old:
+            for item in self._items[old:cols]:
+                self.itemconfigure(item, fill=self._played)
+        elif cols < old:
+            for item in self._items[cols:old]:
+                self.itemconfigure(item, fill=self._fg)
+        self._played_cols = cols
@@ -0,0 +1,298 @@
+"""
+LAN streaming server for the library:
+
+    python main.py --serve 8765          # serves the saved playlist
+    python server.py 8765 <dir or file>...
+
+    GET /tracks                 JSON list of tracks
+    GET /tracks/<id>/meta       title/artist/album/lyrics (MetadataManager)
+    GET /tracks/<id>/cover      cover image from the metadata cache
+    GET /tracks/<id>/stream     the audio; ?transcode=1 forces OGG
+
+Formats a browser or phone can play are sent as they are, with Range
+support and the body going out through loop.sendfile (os.sendfile, no
+copy through Python). Anything else (DSF, APE, ...) is transcoded to
+OGG/Vorbis on the fly with the same ffmpeg command MusicPlayer uses for
+its conversion fallback. One asyncio loop serves every listener; tag
+reading runs in the default executor.
+"""
+import os
+import sys
+import json
+import asyncio
+import threading
+from urllib.parse import urlsplit, parse_qs
+from library import Library
+from metadata import MetadataManager
+from player import conversion_command
+
+DEFAULT_PORT = 8765
+CHUNK = 64 * 1024  # Transcoder pipe reads
+MAX_HEADER = 16 * 1024
+BACKLOG = 1024  # asyncio's default of 100 makes a burst of listeners wait out a 1 s SYN retry
+# Served as-is; everything else goes through ffmpeg
+NATIVE_TYPES = {
+    '.mp3': 'audio/mpeg',
+    '.flac': 'audio/flac',
+    '.ogg': 'audio/ogg',
+    '.opus': 'audio/ogg',
+    '.m4a': 'audio/mp4',
+    '.wav': 'audio/wav',
+}
+STATUS = {200: "OK", 206: "Partial Content", 400: "Bad Request", 404: "Not Found",
+          405: "Method Not Allowed", 416: "Range Not Satisfiable", 500: "Internal Server Error"}
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single "bytes=" range, None for no/ignored
+    range (multi-range requests get the whole file), or ValueError when the
+    range can't be satisfied.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[6:].strip().partition("-")
+    try:
+        if not first:
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length <= 0:
+                raise ValueError(header)
+            return max(0, size - length), size - 1
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        raise ValueError(header)
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, end
+
+
+class StreamServer:
+    def __init__(self, paths, metadata_manager=None, fetch_network=False):
+        self.library = Library()
+        self.ids = [self.library.add(p) for p in paths]
+        self.metadata_manager = metadata_manager or MetadataManager()
+        self.fetch_network = fetch_network
+        self._meta = {}  # Track id -> get_metadata() result
+        self.server = None
+        self.port = None
+        self._loop = None
+        self._thread = None
+
+    async def start(self, host="0.0.0.0", port=DEFAULT_PORT):
+        self.server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER, backlog=BACKLOG)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+
+    def start_in_thread(self, host="127.0.0.1", port=0):
+        """Run on an event loop in a daemon thread (tests, benchmarks); returns the bound port."""
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.start(host, port))
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self.port
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self.server.close)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(5)
+            self._loop = None
+
+    def track_path(self, tid):
+        return self.library.path(tid) if tid in self.library else None
+
+    async def metadata(self, tid):
+        meta = self._meta.get(tid)
+        if meta is None:
+            loop = asyncio.get_running_loop()
+            meta = await loop.run_in_executor(None, self.metadata_manager.get_metadata,
+                                              self.track_path(tid), self.fetch_network)
+            self._meta[tid] = meta
+        return meta
+
+    async def handle(self, reader, writer):
+        try:
+            # Keep-alive until the client closes, or a response has no length
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                try:
+                    method, target, headers = self._parse_head(head)
+                except ValueError:
+                    await self._send_error(writer, 400)
+                    break
+                keep_alive = await self.respond(method, target, headers, writer)
+                if not keep_alive or headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        except Exception as e:
+            print(f"Stream server error: {e}")
+        finally:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _parse_head(head):
+        lines = head.decode("latin-1").split("\r\n")
+        method, target, _ = lines[0].split(" ", 2)
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+        return method, target, headers
+
+    async def respond(self, method, target, headers, writer):
+        """Write one response; returns whether the connection can be reused."""
+        if method not in ("GET", "HEAD"):
+            await self._send_error(writer, 405)
+            return True
+        url = urlsplit(target)
+        parts = [p for p in url.path.split("/") if p]
+        query = parse_qs(url.query)
+
+        if parts == ["tracks"] or not parts:
+            listing = [{'id': tid, 'name': os.path.basename(self.library.path(tid)),
+                        'native': self._native_type(self.library.path(tid)) is not None,
+                        'stream': f"/tracks/{tid}/stream", 'meta': f"/tracks/{tid}/meta"}
+                       for tid in self.ids if tid in self.library]
+            await self._send_json(writer, {'tracks': listing}, method)
+            return True
+
+        if len(parts) != 3 or parts[0] != "tracks" or not parts[1].isdigit():
+            await self._send_error(writer, 404)
+            return True
+        tid = int(parts[1])
+        path = self.track_path(tid)
+        if path is None or not os.path.exists(path):
+            await self._send_error(writer, 404)
+            return True
+
+        if parts[2] == "meta":
+            meta = await self.metadata(tid)
+            body = {k: meta.get(k) for k in ('title', 'artist', 'album', 'lyrics')}
+            body['cover'] = f"/tracks/{tid}/cover" if meta.get('cover_path') else None
+            await self._send_json(writer, body, method)
+            return True
+        if parts[2] == "cover":
+            cover = (await self.metadata(tid)).get('cover_path')
+            if not cover or not os.path.exists(cover):
+                await self._send_error(writer, 404)
+                return True
+            with open(cover, "rb") as f:
+                kind = "image/png" if f.read(8) == b"\x89PNG\r\n\x1a\n" else "image/jpeg"
+            return await self._send_file(writer, cover, kind, headers, method)
+        if parts[2] == "stream":
+            content_type = self._native_type(path)
+            if content_type and query.get("transcode", ["0"])[0] in ("0", ""):
+                return await self._send_file(writer, path, content_type, headers, method)
+            return await self._send_transcoded(writer, path, method)
+        await self._send_error(writer, 404)
+        return True
+
+    @staticmethod
+    def _native_type(path):
+        return NATIVE_TYPES.get(os.path.splitext(path)[1].lower())
+
+    @staticmethod
+    async def _write_head(writer, status, headers):
+        lines = [f"HTTP/1.1 {status} {STATUS[status]}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        await writer.drain()
+
+    async def _send_error(self, writer, status):
+        body = STATUS[status].encode()
+        await self._write_head(writer, status, {'Content-Type': "text/plain", 'Content-Length': len(body)})
+        writer.write(body)
+        await writer.drain()
+
+    async def _send_json(self, writer, data, method):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        await self._write_head(writer, 200, {'Content-Type': "application/json; charset=utf-8",
+                                             'Content-Length': len(body)})
+        if method != "HEAD":
+            writer.write(body)
+            await writer.drain()
+
+    async def _send_file(self, writer, path, content_type, headers, method):
+        size = os.path.getsize(path)
+        try:
+            span = parse_range(headers.get("range"), size)
+        except ValueError:
+            await self._write_head(writer, 416, {'Content-Range': f"bytes */{size}", 'Content-Length': 0})
+            return True
+        start, end = span if span else (0, size - 1)
+        length = end - start + 1 if size else 0
+        head = {'Content-Type': content_type, 'Content-Length': length, 'Accept-Ranges': "bytes"}
+        if span:
+            head['Content-Range'] = f"bytes {start}-{end}/{size}"
+        await self._write_head(writer, 206 if span else 200, head)
+        if method == "HEAD" or length == 0:
+            return True
+        with open(path, "rb") as f:
+            # os.sendfile on plain sockets; asyncio falls back to read/write elsewhere
+            await asyncio.get_running_loop().sendfile(writer.transport, f, start, length)
+        return True
+
+    async def _send_transcoded(self, writer, path, method):
+        # The length isn't known up front: no ranges, and the body ends when the connection closes
+        await self._write_head(writer, 200, {'Content-Type': "audio/ogg", 'Accept-Ranges': "none",
+                                             'Connection': "close"})
+        if method == "HEAD":
+            return False
+        process = await asyncio.create_subprocess_exec(*conversion_command(path, 'pipe:1'),
+                                                       stdin=asyncio.subprocess.DEVNULL,
+                                                       stdout=asyncio.subprocess.PIPE,
+                                                       stderr=asyncio.subprocess.DEVNULL)
+        try:
+            while True:
+                chunk = await process.stdout.read(CHUNK)
+                if not chunk:
+                    break
+                writer.write(chunk)
+                await writer.drain()
+            await process.wait()
+        finally:
+            # Listener went away mid-track: don't leave ffmpeg running
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+        return False
+
+
+def serve(paths, host="0.0.0.0", port=DEFAULT_PORT, fetch_network=False):
+    """Serve paths until interrupted."""
+    server = StreamServer(paths, fetch_network=fetch_network)
+
+    async def run():
+        await server.start(host, port)
+        print(f"Streaming {len(server.ids)} tracks on http://{host}:{server.port}/tracks")
+        async with server.server:
+            await server.server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    # Usage: python server.py <port> <file, directory or playlist.json>...
+    from playlists_io import audio_files
+    serve(audio_files(sys.argv[2:]), port=int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PORT)
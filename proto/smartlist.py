@@ -0,0 +1,285 @@
+"""
+Rule-based smart playlists over the Library:
+
+    artist = 周杰伦 and duration > 5 min
+    has synced lyrics
+    album contains "Test Album" or (format = dsf and not has lyrics)
+
+Fields: title, artist, album, duration, format (file extension), path,
+folder. Operators: = != > >= < <= contains. `has lyrics`, `has synced
+lyrics` and `has <field>` (non-empty) test flags. Text comparisons ignore
+case; durations take s/sec, m/min, h or m:ss.
+
+A rule is compiled once to a predicate over Track records. SmartPlaylists
+watches the Library, so each add, update (metadata enrichment included)
+or removal re-checks only that one track against every list.
+"""
+import os
+import re
+from playlists_io import split_virtual
+
+FIELDS = ('title', 'artist', 'album', 'duration', 'format', 'path', 'folder')
+TEXT_FIELDS = ('title', 'artist', 'album', 'format', 'path', 'folder')
+OPERATORS = ('=', '!=', '>', '>=', '<', '<=', 'contains')
+KEYWORDS = ('and', 'or', 'not', 'has')
+DURATION_UNITS = {'s': 1, 'sec': 1, 'secs': 1, 'm': 60, 'min': 60, 'mins': 60, 'h': 3600}
+
+_TOKEN = re.compile(r"""\s*(?:(\(|\))|(>=|<=|!=|=|>|<)|"([^"]*)"|'([^']*)'|([^\s()=<>!"']+))""")
+
+
+class RuleError(ValueError):
+    pass
+
+
+def tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if not match or match.end() == pos:
+            raise RuleError(f"无法解析: {text[pos:]}")
+        paren, op, dq, sq, word = match.groups()
+        if paren:
+            tokens.append(('paren', paren))
+        elif op:
+            tokens.append(('op', op))
+        elif dq is not None or sq is not None:
+            tokens.append(('str', dq if dq is not None else sq))
+        else:
+            lowered = word.lower()
+            if lowered in KEYWORDS or lowered == 'contains':
+                tokens.append(('op' if lowered == 'contains' else 'kw', lowered))
+            else:
+                tokens.append(('word', word))
+        pos = match.end()
+    return tokens
+
+
+def parse_duration(text):
+    """Seconds from '300', '5 min', '4.5m', '1 h' or '3:30'."""
+    text = text.strip().lower()
+    if ':' in text:
+        minutes, _, seconds = text.partition(':')
+        try:
+            return int(minutes) * 60 + float(seconds)
+        except ValueError:
+            raise RuleError(f"无效时长: {text}")
+    match = re.fullmatch(r'([\d.]+)\s*([a-z]*)', text)
+    if not match or match.group(2) not in DURATION_UNITS and match.group(2):
+        raise RuleError(f"无效时长: {text}")
+    try:
+        return float(match.group(1)) * DURATION_UNITS.get(match.group(2), 1)
+    except ValueError:
+        raise RuleError(f"无效时长: {text}")
+
+
+def _field_getter(field):
+    if field in ('title', 'artist', 'album'):
+        return lambda track, library: (getattr(track, field) or "").casefold()
+    if field == 'duration':
+        return lambda track, library: track.duration
+    # CUE tracks are "album.flac#t=...": format and path are those of the file
+    if field == 'format':
+        return lambda track, library: os.path.splitext(split_virtual(track.filename)[0])[1][1:].casefold()
+    if field == 'folder':
+        return lambda track, library: library.directory(track).casefold()
+    return lambda track, library: (library.directory(track) + split_virtual(track.filename)[0]).casefold()
+
+
+def _compare(field, op, value):
+    get = _field_getter(field)
+    if field == 'duration':
+        if op == 'contains':
+            raise RuleError("duration 不支持 contains")
+        limit = parse_duration(value)
+        return {
+            '=': lambda t, lib: abs(get(t, lib) - limit) < 0.5,
+            '!=': lambda t, lib: abs(get(t, lib) - limit) >= 0.5,
+            '>': lambda t, lib: get(t, lib) > limit,
+            '>=': lambda t, lib: get(t, lib) >= limit,
+            '<': lambda t, lib: get(t, lib) < limit,
+            '<=': lambda t, lib: get(t, lib) <= limit,
+        }[op]
+    value = value.casefold()
+    if op == '=':
+        return lambda t, lib: get(t, lib) == value
+    if op == '!=':
+        return lambda t, lib: get(t, lib) != value
+    if op == 'contains':
+        return lambda t, lib: value in get(t, lib)
+    raise RuleError(f"{field} 只支持 =, != 和 contains")
+
+
+class _Parser:
+    def __init__(self, text):
+        self.tokens = tokenize(text)
+        self.pos = 0
+        self.fields = set()
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def parse(self):
+        if not self.tokens:
+            raise RuleError("规则为空")
+        predicate = self.parse_or()
+        if self.pos != len(self.tokens):
+            raise RuleError(f"多余的内容: {self.peek()[1]}")
+        return predicate
+
+    def parse_or(self):
+        parts = [self.parse_and()]
+        while self.peek() == ('kw', 'or'):
+            self.take()
+            parts.append(self.parse_and())
+        if len(parts) == 1:
+            return parts[0]
+        return lambda t, lib: any(p(t, lib) for p in parts)
+
+    def parse_and(self):
+        parts = [self.parse_not()]
+        while self.peek() == ('kw', 'and'):
+            self.take()
+            parts.append(self.parse_not())
+        if len(parts) == 1:
+            return parts[0]
+        return lambda t, lib: all(p(t, lib) for p in parts)
+
+    def parse_not(self):
+        if self.peek() == ('kw', 'not'):
+            self.take()
+            inner = self.parse_not()
+            return lambda t, lib: not inner(t, lib)
+        return self.parse_atom()
+
+    def parse_atom(self):
+        kind, value = self.take()
+        if kind == 'paren' and value == '(':
+            inner = self.parse_or()
+            if self.take() != ('paren', ')'):
+                raise RuleError("缺少 )")
+            return inner
+        if kind == 'kw' and value == 'has':
+            return self.parse_has()
+        if kind != 'word' or value.lower() not in FIELDS:
+            raise RuleError(f"未知字段: {value}" if value else "规则不完整")
+        field = value.lower()
+        kind, op = self.take()
+        if kind != 'op':
+            raise RuleError(f"{field} 后面需要运算符 ({' '.join(OPERATORS)})")
+        self.fields.add(field)
+        return _compare(field, op, self.parse_value())
+
+    def parse_has(self):
+        words = []
+        while self.peek()[0] == 'word':
+            words.append(self.take()[1].lower())
+        if words == ['lyrics']:
+            self.fields.add('lyrics')
+            return lambda t, lib: t.has_lyrics
+        if words == ['synced', 'lyrics']:
+            self.fields.add('lyrics')
+            return lambda t, lib: t.synced_lyrics
+        if len(words) == 1 and words[0] in ('title', 'artist', 'album'):
+            field = words[0]
+            self.fields.add(field)
+            return lambda t, lib: bool(getattr(t, field))
+        raise RuleError(f"未知条件: has {' '.join(words)}")
+
+    def parse_value(self):
+        kind, value = self.peek()
+        if kind == 'str':
+            self.take()
+            return value
+        # Bare values run up to the next keyword or parenthesis, so `album contains Test Album` works
+        words = []
+        while self.peek()[0] == 'word':
+            words.append(self.take()[1])
+        if not words:
+            raise RuleError("缺少比较值")
+        return " ".join(words)
+
+
+def compile_rule(text):
+    """Predicate(track, library) -> bool for a rule; raises RuleError on syntax errors."""
+    return _Parser(text).parse()
+
+
+class SmartPlaylist:
+    def __init__(self, name, rule, library):
+        self.name = name
+        self.rule = rule
+        self.library = library
+        self._match = compile_rule(rule)
+        self.members = set()
+        self._ordered = None  # Cached sorted ids, dropped on any membership change
+        for tid in library:
+            if self._match(library.get(tid), library):
+                self.members.add(tid)
+
+    def update(self, tid):
+        """Re-check one track (None: the library was cleared)."""
+        if tid is None:
+            if self.members:
+                self.members.clear()
+                self._ordered = None
+            return
+        inside = tid in self.members
+        track = self.library.get(tid) if tid in self.library else None
+        if track is not None and self._match(track, self.library):
+            if not inside:
+                self.members.add(tid)
+                self._ordered = None
+        elif inside:
+            self.members.discard(tid)
+            self._ordered = None
+
+    def ids(self):
+        """Member track ids in library order."""
+        if self._ordered is None:
+            self._ordered = sorted(self.members)
+        return self._ordered
+
+    def __len__(self):
+        return len(self.members)
+
+
+class SmartPlaylists:
+    """Named smart playlists kept current by watching a Library."""
+
+    def __init__(self, library):
+        self.library = library
+        self.lists = {}
+        library.watch(self._changed)
+
+    def _changed(self, tid):
+        for smart in self.lists.values():
+            smart.update(tid)
+
+    def add(self, name, rule):
+        """Create or replace a list; raises RuleError for a bad rule."""
+        self.lists[name] = SmartPlaylist(name, rule, self.library)
+        return self.lists[name]
+
+    def remove(self, name):
+        self.lists.pop(name, None)
+
+    def get(self, name):
+        return self.lists.get(name)
+
+    def definitions(self):
+        """[{'name', 'rule'}] for saving alongside the playlist."""
+        return [{'name': s.name, 'rule': s.rule} for s in self.lists.values()]
+
+    def load(self, definitions):
+        for entry in definitions:
+            try:
+                self.add(entry['name'], entry['rule'])
+            except (RuleError, KeyError) as e:
+                print(f"Skipping smart playlist {entry.get('name')}: {e}")
@@ -0,0 +1,171 @@
+import time
+import threading
+from collections import deque
+import tkinter as tk
+import numpy as np
+
+FPS = 30
+BARS = 32
+FFT_SIZE = 4096  # ~93 ms at 44.1 kHz; consecutive 30 fps frames overlap by ~64%
+TAP_FRAMES = 1 << 15  # Mono history kept by the tap, well above FFT_SIZE + queued output
+FLOOR_DB = -60.0
+DECAY = 0.85  # Per-frame fall-off of bar heights, so bars drop smoothly
+
+
+class SpectrumTap:
+    """
+    Ring buffer of the mono mix the PCM engine has written to its sink,
+    addressed by sink frame, so the analyzer can look at exactly what the
+    device is playing now rather than what was decoded last.
+    """
+
+    def __init__(self, capacity=TAP_FRAMES):
+        self.capacity = capacity
+        self._ring = np.zeros(capacity, dtype=np.float32)
+        self._end = 0  # Sink frame just past the newest sample
+        self._lock = threading.Lock()
+
+    def push(self, frame, block):
+        mono = block.mean(axis=1) if block.ndim == 2 else block
+        mono = mono[-self.capacity:]
+        start = (frame + len(block) - len(mono)) % self.capacity
+        with self._lock:
+            first = min(len(mono), self.capacity - start)
+            self._ring[start:start + first] = mono[:first]
+            self._ring[:len(mono) - first] = mono[first:]
+            self._end = frame + len(block)
+
+    def window(self, end_frame, size):
+        """The `size` samples ending at `end_frame`, or None if they are not in the ring."""
+        with self._lock:
+            end_frame = min(end_frame, self._end)
+            if end_frame < size or end_frame - size < self._end - self.capacity:
+                return None
+            idx = np.arange(end_frame - size, end_frame) % self.capacity
+            return self._ring[idx]
+
+    def clear(self):
+        with self._lock:
+            self._ring[:] = 0.0
+            self._end = 0
+
+
+def bar_edges(rate, fft_size=FFT_SIZE, bars=BARS, low=40.0, high=16000.0):
+    """FFT bin index where each log-spaced bar starts; every bar gets at least one bin."""
+    high = min(high, rate / 2)
+    freqs = np.geomspace(low, high, bars + 1)
+    edges = np.round(freqs * fft_size / rate).astype(np.int64)
+    steps = np.arange(bars + 1)
+    edges = np.maximum.accumulate(edges - steps) + steps  # Strictly increasing
+    return edges[:-1], min(edges[-1], fft_size // 2 + 1)
+
+
+def compute_bars(samples, window, edges, stop):
+    """Bar heights in [0, 1] for one frame: Hann-windowed power, per-bar max, dB scaled."""
+    spectrum = np.fft.rfft(samples * window)
+    power = spectrum.real ** 2 + spectrum.imag ** 2
+    # A full-scale sine lands at 0 dB
+    power /= (window.sum() / 2) ** 2
+    peaks = np.maximum.reduceat(power[:stop], edges)
+    db = 10 * np.log10(np.maximum(peaks, 1e-12))
+    return np.clip((db - FLOOR_DB) / -FLOOR_DB, 0.0, 1.0).astype(np.float32)
+
+
+class SpectrumAnalyzer:
+    """
+    Background worker that turns the tap into bar heights FPS times a second.
+    Only the small heights array crosses to the Tk thread, through
+    `post(callback)` (e.g. root.after(0, ...)), and a new frame is not posted
+    until the previous one was drawn, so a busy Tk loop is never flooded.
+    """
+
+    def __init__(self, player, post, draw, bars=BARS, fps=FPS, fft_size=FFT_SIZE):
+        self.player = player
+        self.tap = SpectrumTap()
+        player.tap = self.tap
+        self._post = post
+        self._draw = draw
+        self.fps = fps
+        self.fft_size = fft_size
+        self._window = np.hanning(fft_size).astype(np.float32)
+        self._edges, self._stop = bar_edges(player.rate, fft_size, bars)
+        self._heights = np.zeros(bars, dtype=np.float32)
+        self._in_flight = False
+        self._last_shown = None
+        self.frame_times = deque(maxlen=2000)  # Seconds between frames reaching the screen
+        self.compute_times = deque(maxlen=2000)  # Seconds of worker time per frame
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self.player.tap is self.tap:
+            self.player.tap = None
+
+    def _run(self):
+        period = 1.0 / self.fps
+        next_tick = time.monotonic()
+        last_end = None
+        while not self._stopped.is_set():
+            next_tick += period
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                self._stopped.wait(delay)
+            else:
+                next_tick = time.monotonic()  # Fell behind; don't try to catch up
+            started = time.perf_counter()
+            end = self.player.played_frames()
+            samples = self.tap.window(end, self.fft_size) if end != last_end else None
+            last_end = end
+            if samples is not None:
+                fresh = compute_bars(samples, self._window, self._edges, self._stop)
+            else:
+                fresh = 0.0  # Paused, stopped or seeking: let the bars fall
+            heights = np.maximum(fresh, self._heights * DECAY)
+            heights[heights < 0.01] = 0.0
+            changed = heights.any() or self._heights.any()
+            self._heights = heights
+            self.compute_times.append(time.perf_counter() - started)
+            if changed and not self._in_flight:
+                self._in_flight = True
+                self._post(lambda h=heights: self._deliver(h))
+
+    def _deliver(self, heights):
+        # Runs on the Tk thread
+        self._in_flight = False
+        now = time.perf_counter()
+        if self._last_shown is not None:
+            self.frame_times.append(now - self._last_shown)
+        self._last_shown = now
+        self._draw(heights)
+
+
+class SpectrumView(tk.Canvas):
+    """Bar display; the rectangles are created once and only moved afterwards."""
+
+    def __init__(self, master, bars=BARS, height=60, fg="#ff4400", bg="#f0f0f0", **kwargs):
+        super().__init__(master, height=height, bg=bg, highlightthickness=0, **kwargs)
+        self._bars = bars
+        self._fg = fg
+        self._items = []
+        self._heights = np.zeros(bars, dtype=np.float32)
+        self.bind("<Configure>", lambda e: self._layout())
+
+    def _layout(self):
+        self.delete("all")
+        width = self.winfo_width()
+        step = width / self._bars
+        self._items = [self.create_rectangle(i * step + 1, 0, (i + 1) * step - 1, 0, fill=self._fg, width=0)
+                       for i in range(self._bars)]
+        self.set_heights(self._heights)
+
+    def set_heights(self, heights):
+        self._heights = heights
+        if not self._items:
+            return
+        height = self.winfo_height()
+        width = self.winfo_width()
+        step = width / self._bars
+        for i, (item, h) in enumerate(zip(self._items, heights)):
+            self.coords(item, i * step + 1, height - h * height, (i + 1) * step - 1, height)
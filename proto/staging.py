@@ -0,0 +1,156 @@
+import os
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+
+DEFAULT_BUDGET = 1024 * 1024 * 1024  # Bytes of local disk the staging cache may use
+CHUNK_SIZE = 8 * 1024 * 1024  # Large sequential reads are what slow shares handle best
+
+
+class StagingCache:
+    """
+    Copies upcoming tracks from slow or remote storage to a local directory in
+    a background thread, so playback opens a local file instead of the share.
+
+    Only sources on a different device than the cache directory are staged
+    (local files gain nothing from a copy). Played tracks are evicted first
+    when the byte budget is exceeded, unless they are wanted again.
+    """
+
+    def __init__(self, cache_dir=os.path.join("cache", "staging"), budget_bytes=DEFAULT_BUDGET, remote_only=True):
+        self.cache_dir = cache_dir
+        self.budget_bytes = budget_bytes
+        self.remote_only = remote_only
+        self._entries = OrderedDict()  # source path -> (local path, size), oldest first
+        self._played = set()
+        self._used = 0
+        self._wanted = []
+        self._skipped = set()  # Paths that failed to stage for the current stage() list
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._closed = False
+        self._cache_dev = None
+
+        # Staged copies are not tracked across runs, start from an empty directory
+        if os.path.exists(self.cache_dir):
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        try:
+            self._cache_dev = os.stat(self.cache_dir).st_dev
+        except OSError:
+            pass
+
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread.start()
+
+    def stage(self, paths):
+        """Replace the set of tracks to keep staged, in priority order."""
+        with self._lock:
+            self._wanted = list(paths)
+            # Failures may be transient (full budget, share offline, file locked): try again
+            self._skipped.clear()
+            self._wake.notify()
+
+    def local_path(self, path):
+        """Local copy of path if it has been fully staged, else None."""
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                return None
+            self._entries.move_to_end(path)
+            return entry[0]
+
+    def mark_played(self, path):
+        with self._lock:
+            if path in self._entries:
+                self._played.add(path)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._wake.notify()
+        self._thread.join(timeout=1)
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def _local_name(self, path):
+        ext = os.path.splitext(path)[1].lower()
+        return os.path.join(self.cache_dir, hashlib.md5(path.encode('utf-8')).hexdigest() + ext)
+
+    def _needs_staging(self, path, st):
+        if not self.remote_only or self._cache_dev is None:
+            return True
+        return st.st_dev != self._cache_dev
+
+    def _next_job(self):
+        for path in self._wanted:
+            if path not in self._entries:
+                return path
+        return None
+
+    def _worker(self):
+        while True:
+            with self._lock:
+                while not self._closed:
+                    path = self._next_job()
+                    while path in self._skipped:
+                        self._wanted.remove(path)
+                        path = self._next_job()
+                    if path is not None:
+                        break
+                    self._wake.wait()
+                if self._closed:
+                    return
+            try:
+                staged = self._copy(path)
+            except Exception as e:
+                print(f"Staging failed for {os.path.basename(path)}: {e}")
+                staged = False
+            if not staged:
+                with self._lock:
+                    self._skipped.add(path)
+
+    def _copy(self, path):
+        st = os.stat(path)
+        if not self._needs_staging(path, st):
+            return False
+        with self._lock:
+            if not self._make_room(st.st_size):
+                return False
+        local = self._local_name(path)
+        part = local + ".part"
+        with open(path, 'rb', buffering=0) as src, open(part, 'wb') as dst:
+            while True:
+                chunk = src.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                dst.write(chunk)
+        os.replace(part, local)
+        with self._lock:
+            self._entries[path] = (local, st.st_size)
+            self._used += st.st_size
+        return True
+
+    def _make_room(self, size):
+        # Called with the lock held
+        if size > self.budget_bytes:
+            return False
+        wanted = set(self._wanted)
+        # Played tracks go first, then the least recently used ones; never one that is
+        # wanted again (replays, repeat, the current track)
+        victims = [p for p in self._entries if p in self._played and p not in wanted]
+        victims += [p for p in self._entries if p not in self._played and p not in wanted]
+        for victim in victims:
+            if self._used + size <= self.budget_bytes:
+                break
+            self._evict(victim)
+        return self._used + size <= self.budget_bytes
+
+    def _evict(self, path):
+        local, size = self._entries.pop(path)
+        self._played.discard(path)
+        self._used -= size
+        try:
+            os.remove(local)
+        except OSError:
+            pass
@@ -0,0 +1,161 @@
+import os
+import sys
+import base64
+import struct
+import random
+import subprocess
+from io import BytesIO
+import imageio_ffmpeg
+from PIL import Image
+from mutagen.id3 import ID3, APIC, USLT, TIT2, TPE1, TALB
+from mutagen.flac import FLAC, Picture
+from mutagen.mp4 import MP4, MP4Cover
+from mutagen.oggvorbis import OggVorbis
+from mutagen.dsf import DSF
+
+FORMATS = ("mp3", "flac", "m4a", "ogg", "dsf")
+TRACK_SECONDS = 10
+DSF_SECONDS = 2  # DSD64 is ~1.4 MB per stereo second, keep these short
+DSD_RATE = 2822400
+DSF_BLOCK = 4096  # Bytes per channel per block, fixed by the format
+
+ARTISTS = ["周杰伦", "王菲", "Beyond", "陈奕迅", "The Synthetics", "邓丽君"]
+ALBUMS = ["叶惠美", "Test Album", "光辉岁月", "十年", "Sine Waves"]
+
+
+def mis_encode(text):
+    """A CJK title the way old taggers stored it: GBK bytes read back as Latin-1."""
+    return text.encode("gbk").decode("latin-1")
+
+
+def make_cover(seed, size=300):
+    image = Image.new("RGB", (size, size))
+    r, g, b = (seed * 37) % 256, (seed * 91) % 256, (seed * 53) % 256
+    image.putdata([((x + r) % 256, (y + g) % 256, (x * y + b) % 256) for y in range(size) for x in range(size)])
+    out = BytesIO()
+    image.save(out, "JPEG", quality=85)
+    return out.getvalue()
+
+
+def make_lrc(title, seconds, lines=40):
+    step = max(seconds, 1) / lines
+    rows = [f"[ti:{title}]"]
+    for i in range(lines):
+        t = i * step
+        rows.append(f"[{int(t // 60):02d}:{t % 60:05.2f}]第 {i + 1} 行歌词 line {i + 1}")
+    return "\n".join(rows)
+
+
+def write_dsf(path, seconds=DSF_SECONDS, channels=2):
+    """Minimal DSD64 DSF file (the bundled ffmpeg cannot write DSF); the payload is DSD idle pattern."""
+    blocks = -(-seconds * DSD_RATE // 8 // DSF_BLOCK)
+    data_size = blocks * DSF_BLOCK * channels
+    fmt = struct.pack("<4sQIIIIIIQI4x", b"fmt ", 52, 1, 0, 2, channels, DSD_RATE, 1, seconds * DSD_RATE, DSF_BLOCK)
+    header_size = 28 + len(fmt) + 12
+    with open(path, "wb") as f:
+        f.write(struct.pack("<4sQQQ", b"DSD ", 28, header_size + data_size, 0))
+        f.write(fmt)
+        f.write(struct.pack("<4sQ", b"data", 12 + data_size))
+        f.write(b"\x69" * data_size)
+
+
+def encode_tone(path, freq, seconds):
+    subprocess.run([imageio_ffmpeg.get_ffmpeg_exe(), '-y', '-loglevel', 'error', '-f', 'lavfi',
+                    '-i', f"sine=frequency={freq}:duration={seconds}:sample_rate=44100", '-ac', '2', path], check=True)
+
+
+def _id3_frames(tags, title, artist, album, cover, lyrics, legacy):
+    # Legacy tags are Latin-1 frames holding GBK bytes, which _normalize_text has to repair
+    encoding = 0 if legacy else 3
+    tags.add(TIT2(encoding=encoding, text=title))
+    tags.add(TPE1(encoding=encoding, text=artist))
+    tags.add(TALB(encoding=encoding, text=album))
+    if cover:
+        tags.add(APIC(encoding=3, mime="image/jpeg", type=3, desc="Cover", data=cover))
+    if lyrics:
+        tags.add(USLT(encoding=3, lang="chi", desc="", text=lyrics))
+
+
+def tag_file(path, fmt, title, artist, album, cover, lyrics, legacy):
+    if fmt == "mp3":
+        tags = ID3()
+        _id3_frames(tags, title, artist, album, cover, lyrics, legacy)
+        tags.save(path)
+    elif fmt == "dsf":
+        audio = DSF(path)
+        audio.add_tags()
+        _id3_frames(audio.tags, title, artist, album, cover, lyrics, legacy)
+        audio.save()
+    elif fmt == "flac":
+        audio = FLAC(path)
+        audio["title"], audio["artist"], audio["album"] = title, artist, album
+        if lyrics:
+            audio["lyrics"] = lyrics
+        if cover:
+            picture = Picture()
+            picture.type, picture.mime, picture.data = 3, "image/jpeg", cover
+            audio.add_picture(picture)
+        audio.save()
+    elif fmt == "m4a":
+        audio = MP4(path)
+        audio["\xa9nam"], audio["\xa9ART"], audio["\xa9alb"] = [title], [artist], [album]
+        if lyrics:
+            audio["\xa9lyr"] = [lyrics]
+        if cover:
+            audio["covr"] = [MP4Cover(cover, imageformat=MP4Cover.FORMAT_JPEG)]
+        audio.save()
+    elif fmt == "ogg":
+        audio = OggVorbis(path)
+        audio["title"], audio["artist"], audio["album"] = title, artist, album
+        if lyrics:
+            audio["lyrics"] = lyrics
+        if cover:
+            picture = Picture()
+            picture.type, picture.mime, picture.data = 3, "image/jpeg", cover
+            audio["metadata_block_picture"] = [base64.b64encode(picture.write()).decode("ascii")]
+        audio.save()
+
+
+def generate(directory, tracks_per_format=8, seed=0, formats=FORMATS):
+    """
+    Write a reproducible library under directory and return
+    [{'path', 'format', 'title', 'legacy', 'cover', 'lyrics'}] describing it.
+    Filenames are numbered like real downloads (10.mp3, 111.mp3) so the tags,
+    not the names, carry the titles. Every third track has a mis-encoded
+    CJK title, every other one embedded art and LRC lyrics.
+    """
+    rng = random.Random(seed)
+    covers = [make_cover(i) for i in range(4)]
+    tracks = []
+    n = 0
+    for fmt in formats:
+        folder = os.path.join(directory, ALBUMS[len(tracks) % len(ALBUMS)], fmt)
+        os.makedirs(folder, exist_ok=True)
+        for i in range(tracks_per_format):
+            n += 1
+            path = os.path.join(folder, f"{n * 10 + rng.randint(0, 9)}.{fmt}")
+            seconds = DSF_SECONDS if fmt == "dsf" else TRACK_SECONDS
+            if fmt == "dsf":
+                write_dsf(path, seconds)
+            else:
+                encode_tone(path, 220 + 20 * n, seconds)
+            legacy = fmt in ("mp3", "dsf") and n % 3 == 0
+            title = f"测试歌曲{n}" if n % 3 == 0 else f"Track {n}"
+            artist = rng.choice(ARTISTS)
+            album = rng.choice(ALBUMS)
+            if legacy:
+                title, artist, album = (mis_encode(x) for x in (title, artist, album))
+            cover = covers[n % len(covers)] if n % 2 == 0 else None
+            lyrics = make_lrc(title, seconds) if n % 2 == 0 else None
+            tag_file(path, fmt, title, artist, album, cover, lyrics, legacy)
+            tracks.append({'path': path, 'format': fmt, 'title': title, 'legacy': legacy,
+                           'cover': cover is not None, 'lyrics': lyrics is not None})
+    return tracks
+
+
+if __name__ == "__main__":
+    # Usage: python synthlib.py <output directory> [tracks per format]
+    target = sys.argv[1]
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    made = generate(target, count)
+    print(f"Wrote {len(made)} tracks to {target}")
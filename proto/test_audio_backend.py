@@ -0,0 +1,93 @@
+import time
+import wave
+import subprocess
+import numpy as np
+import imageio_ffmpeg
+from audio_backend import ManualClock, NullBackend, NullSink, WavSink
+from pcm_engine import PCMPlayer
+from player import MusicPlayer
+
+RATE = 44100
+
+
+def make_tone(path, seconds, freq=440):
+    subprocess.run([imageio_ffmpeg.get_ffmpeg_exe(), '-y', '-loglevel', 'error', '-f', 'lavfi',
+                    '-i', f"sine=frequency={freq}:duration={seconds}:sample_rate={RATE}", '-ac', '2', path], check=True)
+
+
+def test_music_player_on_null_backend(tmp_path):
+    path = str(tmp_path / "tone.ogg")
+    make_tone(path, 3)
+    clock = ManualClock()
+    player = MusicPlayer(backend=NullBackend(clock))
+    assert abs(player.load_file(path) - 3) < 0.05
+    player.play()
+    clock.advance(0.5)
+    assert player.is_playing() and abs(player.get_position() - 0.5) < 0.002
+
+    player.pause()
+    clock.advance(10)
+    assert not player.is_playing() and player.paused and abs(player.get_position() - 0.5) < 0.002
+    player.play()
+    clock.advance(0.25)
+    assert abs(player.get_position() - 0.75) < 0.002
+
+    player.seek(2.5)
+    clock.advance(0.2)
+    assert abs(player.get_position() - 2.7) < 0.002
+    clock.advance(0.5)
+    assert not player.is_playing() and player.get_position() == 0.0  # Ended, as auto-advance sees it
+
+
+def test_unsupported_format_takes_the_conversion_path(tmp_path):
+    path = str(tmp_path / "tone.flac")
+    make_tone(path, 1)
+    backend = NullBackend(ManualClock(), formats=('ogg',))
+    player = MusicPlayer(backend=backend)
+    assert abs(player.load_file(path) - 1) < 0.05
+    assert player.current_file_obj is not None and backend.loaded  # Played from the converted OGG
+
+
+def test_null_sink_consumes_by_the_clock():
+    clock = ManualClock()
+    sink = NullSink(clock=clock, buffer_frames=4096)
+    block = np.zeros((2048, 2), dtype=np.int16)
+    sink.write(block)
+    sink.write(block)
+    assert not sink.ready() and sink.frames_played() == 0
+    clock.advance(1024 / RATE)
+    assert sink.frames_played() == 1024 and sink.ready()
+    sink.pause()
+    clock.advance(1)
+    assert sink.frames_played() == 1024
+    sink.resume()
+    clock.advance(1)
+    assert sink.frames_played() == 4096  # Never past what was written
+    sink.flush()
+    assert sink.frames_played() == 0
+
+
+def test_wav_sink_records_gapless_playback(tmp_path):
+    a, b = str(tmp_path / "a.flac"), str(tmp_path / "b.flac")
+    make_tone(a, 1, 440)
+    make_tone(b, 1, 660)
+    out = str(tmp_path / "out.wav")
+    player = PCMPlayer(sink=WavSink(out, realtime=False))
+    player.set_volume(1.0)
+    player.load_file(a)
+    player.queue_next(b)
+    player._next.wait_for(RATE - 1, timeout=5)
+    player.play()
+    deadline = time.monotonic() + 10
+    while player.is_playing() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    player.close()
+
+    with wave.open(out, 'rb') as f:
+        assert (f.getframerate(), f.getnchannels()) == (RATE, 2)
+        samples = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16).reshape(-1, 2)
+    assert abs(len(samples) - 2 * RATE) < 2048
+    # 440 Hz then 660 Hz: count zero crossings in each second
+    left = samples[:, 0].astype(np.int32)
+    crossings = [int(np.count_nonzero(np.diff(np.sign(left[i * RATE:(i + 1) * RATE])))) for i in range(2)]
+    assert abs(crossings[0] - 880) < 20 and abs(crossings[1] - 1320) < 20
@@ -0,0 +1,65 @@
+import io
+import gzip
+import json
+import tarfile
+import pytest
+from cache_bundle import BundleError, export_bundle, import_bundle, verify_bundle
+
+
+def make_cache(root):
+    (root / "images").mkdir(parents=True)
+    (root / "lyrics").mkdir()
+    cover = bytes(range(256)) * 40
+    for name in ("a_online.jpg", "b_online.jpg", "c_online.jpg"):
+        (root / "images" / name).write_bytes(cover)  # One album cover per track
+    (root / "images" / "d_embedded.jpg").write_bytes(b"\xff\xd8other")
+    (root / "lyrics" / "a.txt").write_text("[00:01.00]晴天", encoding='utf-8')
+    (root / "staging").mkdir()
+    (root / "staging" / "big.flac").write_bytes(b"not cache metadata")
+
+
+def test_round_trip_dedups_and_merges(tmp_path):
+    make_cache(tmp_path / "old")
+    bundle = str(tmp_path / "cache.bundle")
+    report = export_bundle(str(tmp_path / "old"), bundle)
+    assert (report['files'], report['blobs']) == (5, 3)
+    assert verify_bundle(bundle) == []
+
+    new = tmp_path / "new"
+    (new / "lyrics").mkdir(parents=True)
+    (new / "lyrics" / "a.txt").write_text("local edit", encoding='utf-8')
+    report = import_bundle(bundle, str(new))
+    assert (report['written'], report['kept'], report['corrupt']) == (4, 1, 0)
+    assert (new / "images" / "c_online.jpg").read_bytes() == (tmp_path / "old" / "images" / "a_online.jpg").read_bytes()
+    assert (new / "lyrics" / "a.txt").read_text(encoding='utf-8') == "local edit"
+    assert not (new / "staging").exists()
+
+    again = import_bundle(bundle, str(new), overwrite=True)
+    assert (again['written'], again['present']) == (1, 4)
+    assert (new / "lyrics" / "a.txt").read_text(encoding='utf-8') == "[00:01.00]晴天"
+
+
+def test_corrupt_blob_is_not_written(tmp_path):
+    (tmp_path / "c" / "lyrics").mkdir(parents=True)
+    (tmp_path / "c" / "lyrics" / "x.txt").write_text("original lyric text", encoding='utf-8')
+    bundle = tmp_path / "b.bundle"
+    export_bundle(str(tmp_path / "c"), str(bundle))
+    data = gzip.decompress(bundle.read_bytes()).replace(b"original lyric text", b"tampered lyric text")
+    bundle.write_bytes(gzip.compress(data))
+
+    assert len(verify_bundle(str(bundle))) == 1
+    report = import_bundle(str(bundle), str(tmp_path / "fresh"))
+    assert (report['written'], report['corrupt']) == (0, 1)
+    assert not (tmp_path / "fresh" / "lyrics" / "x.txt").exists()
+    assert not (tmp_path / "fresh" / "lyrics" / "x.txt.part").exists()
+
+
+def test_rejects_paths_outside_the_cache(tmp_path):
+    manifest = json.dumps({'version': 1, 'files': {"../evil.txt": ["0" * 64, 1]}}).encode()
+    bundle = tmp_path / "evil.bundle"
+    with tarfile.open(str(bundle), 'w:gz') as tar:
+        info = tarfile.TarInfo("manifest.json")
+        info.size = len(manifest)
+        tar.addfile(info, io.BytesIO(manifest))
+    with pytest.raises(BundleError):
+        import_bundle(str(bundle), str(tmp_path / "cache"))
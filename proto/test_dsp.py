@@ -0,0 +1,46 @@
+import numpy as np
+from dsp import DSPChain, Biquad, design_biquad
+
+RATE = 48000
+
+
+def tone(freq, seconds=1.0, amplitude=0.25):
+    t = np.arange(int(seconds * RATE)) / RATE
+    return np.repeat((np.sin(2 * np.pi * freq * t) * amplitude)[:, None], 2, axis=1).astype(np.float32)
+
+
+def level_db(block):
+    tail = block[len(block) // 2:, 0]  # Skip the filter's settling time
+    return 20 * np.log10(np.sqrt((tail.astype(np.float64) ** 2).mean()))
+
+
+def test_flat_preset_is_bypassed():
+    block = tone(1000)
+    chain = DSPChain(RATE)
+    assert chain.bypass
+    assert chain.process(block) is block
+
+
+def test_bass_preset_boosts_low_frequencies():
+    chain = DSPChain(RATE, preset="低音增强")
+    low = chain.process(tone(50))
+    chain.reset()
+    mid = chain.process(tone(4000))
+    # +6 dB shelf on top of a -4 dB preamp at 50 Hz; only the preamp at 4 kHz
+    assert level_db(low) - level_db(tone(50)) > 1.0
+    assert abs(level_db(mid) - level_db(tone(4000)) + 4.0) < 0.5
+
+
+def test_biquad_state_carries_across_blocks():
+    coeffs = design_biquad("peak", 1000, 6.0, 1.0, RATE)
+    signal = np.random.default_rng(0).standard_normal((5000, 2))
+    whole = Biquad(coeffs, 2).process(signal)
+    split = Biquad(coeffs, 2)
+    pieces = [split.process(signal[i:i + 777]) for i in range(0, len(signal), 777)]
+    assert np.allclose(np.concatenate(pieces), whole)
+
+
+def test_limiter_keeps_output_below_full_scale():
+    chain = DSPChain(RATE, preset="低音增强")
+    out = chain.process(tone(60, amplitude=0.99))
+    assert np.abs(out).max() <= 1.0
@@ -0,0 +1,68 @@
+import os
+import json
+import time
+from mutagen import File
+from synthlib import generate
+from export import MANIFEST_NAME, export_tracks, output_paths
+
+
+def library(tmp_path):
+    tracks = generate(str(tmp_path / "library"), 1, formats=("flac", "dsf"))
+    return [t['path'] for t in tracks], tracks
+
+
+def test_export_copies_tags_and_cover(tmp_path):
+    paths, tracks = library(tmp_path)
+    dest = str(tmp_path / "out")
+    report = export_tracks(paths, dest, "mp3", workers=2, playlist_name="list")
+    assert (report['exported'], report['skipped'], report['failed']) == (2, 0, 0)
+    assert report['audio_seconds'] > 0 and report['hours_per_minute'] > 0
+
+    outputs = output_paths(paths, dest, "mp3")
+    for track in tracks:
+        audio = File(outputs[track['path']])
+        assert audio.info.sample_rate == 44100
+        assert str(audio.tags["TIT2"]) == track['title']
+        assert any(k.startswith("APIC") for k in audio.tags.keys()) == track['cover']
+    with open(os.path.join(dest, "list.m3u8"), encoding='utf-8') as f:
+        assert len(f.read().splitlines()) == 1 + len(paths)
+
+
+def test_repeat_export_skips_up_to_date_outputs(tmp_path):
+    paths, _ = library(tmp_path)
+    dest = str(tmp_path / "out")
+    export_tracks(paths, dest, "ogg")
+    again = export_tracks(paths, dest, "ogg")
+    assert (again['exported'], again['skipped']) == (0, 2)
+
+    # A changed source, or different settings, is exported again
+    stamp = time.time() + 10
+    os.utime(paths[0], (stamp, stamp))
+    assert export_tracks(paths, dest, "ogg")['exported'] == 1
+    assert export_tracks(paths, dest, "ogg", bitrate="96k")['exported'] == 2
+
+
+def test_interrupted_export_resumes(tmp_path):
+    paths, _ = library(tmp_path)
+    dest = str(tmp_path / "out")
+    export_tracks(paths, dest, "mp3")
+    outputs = output_paths(paths, dest, "mp3")
+
+    # As if killed while encoding the second track: a .part left over, no manifest entry
+    manifest_path = os.path.join(dest, MANIFEST_NAME)
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    manifest['outputs'] = {k: v for k, v in manifest['outputs'].items() if v['source'] != os.path.abspath(paths[1])}
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(outputs[paths[1]], outputs[paths[1]] + ".part")
+
+    report = export_tracks(paths, dest, "mp3")
+    assert (report['exported'], report['skipped']) == (1, 1)
+    assert os.path.exists(outputs[paths[1]])
+    assert not os.path.exists(outputs[paths[1]] + ".part")
+
+
+def test_colliding_names_get_suffixes(tmp_path):
+    outputs = output_paths([str(tmp_path / "a" / "x.flac"), str(tmp_path / "a" / "x.dsf")], "out", "aac")
+    assert sorted(os.path.basename(p) for p in outputs.values()) == ["x (2).m4a", "x.m4a"]
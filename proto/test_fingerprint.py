@@ -0,0 +1,65 @@
+import wave
+import numpy as np
+import fingerprint
+from fingerprint import FP_RATE, FingerprintIndex, FingerprintStore, find_duplicates, landmarks, minhash, similarity
+
+
+def melody(seed, seconds=10):
+    rng = np.random.default_rng(seed)
+    out = np.zeros(seconds * FP_RATE, np.float32)
+    t = 0
+    while t < len(out):
+        length = int(rng.uniform(0.12, 0.5) * FP_RATE)
+        freq = 220 * 2 ** (rng.integers(0, 36) / 12)
+        tt = np.arange(min(length, len(out) - t)) / FP_RATE
+        out[t:t + len(tt)] += 0.3 * np.sin(2 * np.pi * freq * tt) * np.exp(-3 * tt)
+        t += length
+    return out
+
+
+def test_signature_survives_gain_and_noise():
+    a = melody(1)
+    noisy = a * 0.5 + 0.01 * np.random.default_rng(0).standard_normal(len(a)).astype(np.float32)
+    original = minhash(landmarks(a))
+    assert similarity(original, minhash(landmarks(noisy))) > 0.6
+    assert similarity(original, minhash(landmarks(melody(2)))) < 0.2
+
+
+def test_silence_has_no_signature():
+    assert minhash(landmarks(np.zeros(5 * FP_RATE, np.float32))) is None
+
+
+def test_index_clusters_duplicates():
+    signatures = {name: minhash(landmarks(melody(seed))) for name, seed in [("10.mp3", 1), ("111.mp3", 2), ("song.flac", 3)]}
+    signatures["10 (1).mp3"] = minhash(landmarks(melody(1)[300:] * 0.8))
+    index = FingerprintIndex()
+    for name, signature in signatures.items():
+        index.add(name, signature)
+    assert [sorted(c) for c in index.clusters()] == [["10 (1).mp3", "10.mp3"]]
+    assert index.query(signatures["10.mp3"])[0] == ("10.mp3", 1.0)
+
+
+def test_store_round_trip(tmp_path):
+    track = tmp_path / "a.mp3"
+    track.write_bytes(b"x")
+    signature = minhash(landmarks(melody(4)))
+    store = FingerprintStore(str(tmp_path / "fp.json"))
+    store.put_signature(str(track), signature)
+    store.save()
+    assert np.array_equal(FingerprintStore(str(tmp_path / "fp.json")).signature(str(track)), signature)
+
+
+def test_silent_tracks_stay_cached(tmp_path, monkeypatch):
+    silent = str(tmp_path / "silent.wav")
+    with wave.open(silent, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(FP_RATE)
+        f.writeframes(bytes(4 * FP_RATE))
+    store = FingerprintStore(str(tmp_path / "fp.json"))
+    assert find_duplicates([silent], store) == []
+
+    def no_work(*args, **kwargs):
+        raise AssertionError("silent track fingerprinted again")
+    monkeypatch.setattr(fingerprint, "ProcessPoolExecutor", no_work)
+    assert find_duplicates([silent], FingerprintStore(str(tmp_path / "fp.json"))) == []
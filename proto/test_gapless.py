@@ -0,0 +1,214 @@
+import time
+import threading
+import subprocess
+import numpy as np
+import imageio_ffmpeg
+from pcm_engine import PCMPlayer
+from gui import MusicPlayerGUI
+from library import Library
+from loudness import LoudnessStore
+from playqueue import PlayQueue
+
+RATE = 44100
+
+
+class RecordingSink:
+    """Consumes audio instantly and keeps every block, so the pump runs faster than real time."""
+
+    rate = RATE
+    channels = 2
+
+    def __init__(self):
+        self.blocks = []
+        self.written = 0
+
+    def ready(self):
+        return True
+
+    def write(self, block):
+        self.blocks.append(block.copy())
+        self.written += len(block)
+
+    def frames_played(self):
+        return self.written
+
+    def pause(self):
+        pass
+
+    def resume(self):
+        pass
+
+    def flush(self):
+        self.blocks = []
+        self.written = 0
+
+    def close(self):
+        pass
+
+    def recording(self):
+        return np.concatenate(self.blocks).astype(np.float32) / 32768.0
+
+
+def make_tone(path, freq, seconds):
+    subprocess.run([imageio_ffmpeg.get_ffmpeg_exe(), '-y', '-loglevel', 'error', '-f', 'lavfi',
+                    '-i', f"sine=frequency={freq}:duration={seconds}:sample_rate={RATE}", '-ac', '2', path], check=True)
+
+
+class Widget:
+    """Stands in for the Tk widgets the playlist methods touch."""
+
+    def __init__(self):
+        self.selection = ()
+        self.value = None
+
+    def curselection(self):
+        return self.selection
+
+    def delete(self, *args):
+        pass
+
+    def config(self, **kwargs):
+        pass
+
+    def set(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+def headless_gui(player, paths, tmp_path):
+    """A MusicPlayerGUI without a window, holding just the state the queue methods use."""
+    app = MusicPlayerGUI.__new__(MusicPlayerGUI)
+    app._ready = threading.Event()
+    app._ready.set()
+    app._player = player
+    app._loudness_store = LoudnessStore(str(tmp_path / "loudness.json"))
+    app.library = Library()
+    app.playlist = PlayQueue(app.library.add(path) for path in paths)
+    app.queued_track_id = None
+    app.playlist_box = app.repeat_btn = app.status_var = Widget()
+    app.shuffle_var = Widget()
+    app.save_playlist_state = lambda: None
+    return app
+
+
+def start_gui_playback(tmp_path, names, index):
+    """Tones for names, a headless GUI over them, and playlist[index] loaded with its follower queued."""
+    paths = []
+    for i, name in enumerate(names):
+        paths.append(str(tmp_path / f"{name}.flac"))
+        make_tone(paths[-1], 440 + 220 * i, 1)
+    sink = RecordingSink()
+    player = PCMPlayer(sink=sink)
+    app = headless_gui(player, paths, tmp_path)
+    player.load_file(paths[index])
+    app.current_index = index
+    app.queue_following(index)
+    return app, player, sink, paths
+
+
+def play_out(player, sink):
+    """Play until the engine runs dry; returns (track change reported, frames played)."""
+    if player._next:
+        player._next.wait_for(RATE - 1, timeout=5)
+    player.play()
+    deadline = time.monotonic() + 10
+    while player.is_playing() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    change = player.take_track_change()
+    frames = sink.written
+    player.close()
+    return change, frames
+
+
+def play_two(tmp_path, crossfade):
+    a = str(tmp_path / "a.flac")
+    b = str(tmp_path / "b.flac")
+    make_tone(a, 440, 1)
+    make_tone(b, 660, 1)
+    sink = RecordingSink()
+    player = PCMPlayer(sink=sink, crossfade=crossfade)
+    player.set_volume(1.0)
+    player.load_file(a)
+    player.queue_next(b)
+    # The sink consumes faster than real time, so let the queued track decode ahead
+    # as it would have during the first track's playback
+    player._next.wait_for(RATE - 1, timeout=5)
+    player.play()
+    deadline = time.monotonic() + 10
+    while player.is_playing() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    change = player.take_track_change()
+    recording = sink.recording()
+    player.close()
+    return recording, change, b, player
+
+
+def longest_silence(recording, window=32):
+    # Frames covered by consecutive windows whose RMS is below -60 dBFS
+    frames = len(recording) - len(recording) % window
+    rms = np.sqrt((recording[:frames, 0].reshape(-1, window) ** 2).mean(axis=1))
+    quiet = np.concatenate([[0], (rms < 1e-3).astype(np.int8), [0]])
+    edges = np.flatnonzero(np.diff(quiet))
+    runs = edges[1::2] - edges[::2]
+    return int(runs.max()) * window if runs.size else 0
+
+
+def test_gapless_transition_has_no_gap(tmp_path):
+    recording, change, b, _ = play_two(tmp_path, crossfade=0.0)
+    assert change == b
+    assert len(recording) == 2 * RATE
+    assert longest_silence(recording) == 0
+
+
+def test_crossfade_overlaps_tracks(tmp_path):
+    recording, change, b, player = play_two(tmp_path, crossfade=0.5)
+    assert change == b
+    assert len(recording) == int(1.5 * RATE)
+    assert longest_silence(recording) == 0
+    # Mixing a transition block must fit well inside that block's playback time
+    assert player.mix_seconds_max < 2048 / RATE
+
+
+def test_removing_the_queued_track_queues_the_one_after(tmp_path):
+    app, player, sink, (a, b, c) = start_gui_playback(tmp_path, "abc", 0)
+    assert app.queued_track_id == app.library.find(b)
+    app.playlist_box.selection = (1,)
+    app.remove_file()
+    assert app.queued_track_id == app.library.find(c)
+    change, frames = play_out(player, sink)
+    assert change == c
+    assert frames == 2 * RATE
+
+
+def test_repeat_off_on_the_last_track_ends_playback(tmp_path):
+    app, player, sink, (a, b) = start_gui_playback(tmp_path, "ab", 1)
+    assert app.queued_track_id == app.library.find(a)  # Repeat all wraps around
+    app.cycle_repeat()  # One: the same track again
+    assert app.queued_track_id == app.library.find(b)
+    app.cycle_repeat()  # Off
+    assert app.queued_track_id is None
+    change, frames = play_out(player, sink)
+    assert change is None
+    assert frames == RATE
+
+
+def test_play_next_and_shuffle_requeue_the_engine(tmp_path):
+    app, player, sink, paths = start_gui_playback(tmp_path, "abcd", 0)
+    a, b, c, d = (app.library.find(path) for path in paths)
+    app.playlist_box.selection = (3,)
+    app.play_selected_next()
+    assert app.queued_track_id == d
+    # Removing the up-next track falls back to the normal order
+    app.remove_file()
+    assert app.queued_track_id == b
+
+    app.playlist._rng.seed(1)
+    app.shuffle_var.set(True)
+    app.toggle_shuffle()
+    following = app.playlist.shuffled.after(a)
+    assert app.queued_track_id == following
+    change, frames = play_out(player, sink)
+    assert change == app.library.path(following)
+    assert frames == 2 * RATE
@@ -0,0 +1,51 @@
+from history import PlayHistory, START, SKIP, COMPLETE
+
+
+def make(tmp_path):
+    return PlayHistory(str(tmp_path / "history.log"))
+
+
+def test_rollups_answer_queries(tmp_path):
+    history = make(tmp_path)
+    for _ in range(3):
+        history.record(START, "a.mp3", "周杰伦")
+        history.finish("a.mp3", 1.0, "周杰伦")
+    history.record(START, "b.mp3", "王菲")
+    history.finish("b.mp3", 0.2, "王菲", timestamp=100.0)
+    history.record(START, "c.mp3")
+    history.finish("c.mp3", 0.5, timestamp=200.0)
+
+    assert history.most_played(1) == [("a.mp3", 3, 3)]
+    assert history.recently_skipped() == [(200.0, "c.mp3", 0.5), (100.0, "b.mp3", 0.2)]
+    assert history.artist_counts() == [("周杰伦", 3), ("王菲", 1)]
+    assert history.track_stats("b.mp3")['avg_completion'] == 0.2
+    history.close()
+
+
+def test_events_are_written_off_the_caller_thread(tmp_path):
+    history = make(tmp_path)
+    history.record(START, "a.mp3")
+    # Nothing is written until the writer flushes
+    assert not (tmp_path / "history.log").exists()
+    history.close()
+    assert (tmp_path / "history.log").read_text(encoding='utf-8').count("\n") == 1
+
+
+def test_reopen_replays_only_the_tail(tmp_path):
+    history = make(tmp_path)
+    for i in range(50):
+        history.record(COMPLETE, f"{i % 5}.mp3", "x", 1.0)
+    history.close()
+
+    reopened = make(tmp_path)
+    assert reopened.replayed == 0
+    assert reopened.artist_counts() == [("x", 50)]
+    reopened.record(SKIP, "0.mp3", "x", 0.1)
+    reopened.flush()  # As if the process died here: logged, but no rollup saved
+
+    crashed = make(tmp_path)
+    assert crashed.replayed == 1
+    assert crashed.track_stats("0.mp3")['skips'] == 1
+    assert crashed.most_played(1)[0][1] == 10
+    crashed.close()
+    reopened.close()
@@ -0,0 +1,34 @@
+from library import Library
+
+
+def test_paths_round_trip():
+    library = Library()
+    paths = ["F:/music\\10.mp3", "F:/music\\111.mp3", "/home/u/a//b.flac", "plain.ogg"]
+    ids = [library.add(p) for p in paths]
+    assert library.paths(ids) == paths
+    assert library.add("F:/music\\10.mp3") == ids[0]
+    assert library.find("F:/music\\111.mp3") == ids[1]
+    assert library.find("F:/music\\missing.mp3") is None
+
+
+def test_remove_keeps_ids_stable():
+    library = Library()
+    a = library.add("/x/a.mp3")
+    b = library.add("/x/b.mp3")
+    library.remove(a)
+    assert len(library) == 1
+    assert a not in library
+    assert library.path(b) == "/x/b.mp3"
+    assert library.find("/x/a.mp3") is None
+
+
+def test_update_drops_cover_and_interns():
+    library = Library()
+    a = library.add("/x/a.mp3")
+    b = library.add("/y/b.mp3")
+    library.update(a, {'title': 't', 'artist': "".join("Some Artist"), 'cover_data': b'\xff' * 10, 'lyrics': '[00:01.00]x'})
+    library.update(b, {'title': 'u', 'artist': "".join("Some Artist")}, duration=12.5)
+    assert library.get(a).artist is library.get(b).artist
+    assert library.get(a).has_lyrics and not library.get(b).has_lyrics
+    assert library.get(b).duration == 12.5
+    assert not hasattr(library.get(a), '__dict__')
@@ -0,0 +1,61 @@
+import subprocess
+import numpy as np
+import imageio_ffmpeg
+from loudness import ANALYSIS_RATE, LoudnessMeter, analyze_file, measure, track_gain
+
+
+def sine(dbfs, seconds, freq=997.0, channels=2):
+    t = np.arange(int(seconds * ANALYSIS_RATE)) / ANALYSIS_RATE
+    tone = 10 ** (dbfs / 20) * np.sin(2 * np.pi * freq * t)
+    return np.repeat(tone[:, None], channels, axis=1)
+
+
+def test_stereo_sine_matches_reference_level():
+    # EBU Tech 3341 case 1/2: stereo 1 kHz sine at X dBFS reads X LUFS
+    for level in (-23.0, -33.0, -13.0):
+        loudness, peak = measure(sine(level, 20))
+        assert abs(loudness - level) < 0.1
+        assert abs(peak - 10 ** (level / 20)) < 1e-3
+
+
+def test_relative_gate_ignores_quiet_passages():
+    # EBU Tech 3341 case 3: -36 / -23 / -36 dBFS for 10 s each reads -23 LUFS
+    signal = np.concatenate([sine(-36, 10), sine(-23, 60), sine(-36, 10)])
+    loudness, _ = measure(signal)
+    assert abs(loudness - (-23.0)) < 0.1
+
+
+def test_silence_and_short_signals():
+    assert measure(np.zeros((ANALYSIS_RATE * 2, 2)))[0] is None
+    assert measure(sine(-20, 0.2))[0] is None
+    assert track_gain(None, 0.0) == 0.0
+
+
+def test_meter_is_independent_of_block_boundaries():
+    signal = np.concatenate([sine(-30, 3.03), sine(-20, 2), sine(-45, 1)])
+    meter = LoudnessMeter()
+    first = 0
+    for size in (7, 4799, 65536, 1, 33333) * 10:
+        meter.add(signal[first:first + size])
+        first += size
+    meter.add(signal[first:])
+    loudness, peak = measure(signal)
+    assert abs(meter.result()[0] - loudness) < 1e-9
+    assert meter.result()[1] == peak
+
+
+def test_gain_is_peak_limited():
+    assert abs(track_gain(-28.0, 0.1) - 10.0) < 1e-9
+    assert abs(track_gain(-28.0, 0.5) - 20 * np.log10(2)) < 1e-9
+    assert track_gain(-8.0, 1.0) == -10.0
+
+
+def test_analyze_file_decodes_via_ffmpeg(tmp_path):
+    path = str(tmp_path / "tone.flac")
+    # lavfi sine is 1/8 full scale (-18.06 dBFS). ffmpeg upmixes mono at -3 dB per
+    # channel, which reads the same as BS.1770 single-channel mono: -21.07 LUFS
+    subprocess.run([imageio_ffmpeg.get_ffmpeg_exe(), '-y', '-loglevel', 'error', '-f', 'lavfi',
+                    '-i', 'sine=frequency=997:duration=5:sample_rate=44100', path], check=True)
+    result = analyze_file(path)
+    assert abs(result['loudness'] - (-21.07)) < 0.15
+    assert abs(result['gain'] - 3.07) < 0.15
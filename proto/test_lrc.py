@@ -0,0 +1,20 @@
+from lrc import parse_lrc, lyric_index
+
+LRC = """[ti:Song]
+[00:12.50]second
+[00:01.00]first
+
+[00:20.00]
+[01:02.25]third"""
+
+
+def test_parse_sorts_and_drops_untimed_lines():
+    assert parse_lrc(LRC) == [(1.0, "first"), (12.5, "second"), (62.25, "third")]
+
+
+def test_lyric_index():
+    parsed = parse_lrc(LRC)
+    assert lyric_index(parsed, 0.5) == -1
+    assert lyric_index(parsed, 1.0) == 0
+    assert lyric_index(parsed, 30) == 1
+    assert lyric_index(parsed, 600) == 2
@@ -0,0 +1,87 @@
+import os
+import json
+import tracemalloc
+from playlists_io import (PlaylistEntry, audio_files, display_name, read_cue, read_m3u, read_playlist, read_pls,
+                          split_virtual, write_m3u, write_pls)
+
+
+def test_m3u_bom_extinf_and_gbk(tmp_path):
+    (tmp_path / "a.m3u8").write_bytes(
+        "﻿#EXTM3U\n#EXTINF:215,周杰伦 - 晴天\nsub/晴天.mp3\r\n\n#EXTINF:-1,Intro\n/abs/intro.flac\n".encode('utf-8'))
+    (tmp_path / "b.m3u").write_bytes("#EXTINF:300,稻香\n稻香.mp3\n".encode('gbk'))
+    first, second = read_m3u(str(tmp_path / "a.m3u8"))
+    assert first.path == os.path.join(str(tmp_path), "sub", "晴天.mp3")
+    assert (first.artist, first.title, first.duration) == ("周杰伦", "晴天", 215)
+    assert second.path == "/abs/intro.flac" and second.duration is None and second.title == "Intro"
+    [gbk] = read_playlist(str(tmp_path / "b.m3u"))
+    assert gbk.title == "稻香" and gbk.path.endswith("稻香.mp3")
+
+
+def test_pls(tmp_path):
+    (tmp_path / "x.pls").write_text(
+        "[playlist]\nFile1=one.mp3\nTitle1=One\nLength1=61\nFile2=two.ogg\nLength2=-1\nNumberOfEntries=2\n",
+        encoding='utf-8')
+    one, two = read_pls(str(tmp_path / "x.pls"))
+    assert (os.path.basename(one.path), one.title, one.duration) == ("one.mp3", "One", 61)
+    assert os.path.basename(two.path) == "two.ogg" and two.duration is None
+
+
+def test_cue_virtual_tracks(tmp_path):
+    (tmp_path / "album.cue").write_bytes((
+        'PERFORMER "Album Artist"\nTITLE "Album"\nFILE "album.flac" WAVE\n'
+        '  TRACK 01 AUDIO\n    TITLE "第一首"\n    INDEX 01 00:00:00\n'
+        '  TRACK 02 AUDIO\n    TITLE "Second"\n    PERFORMER "Guest"\n    INDEX 00 04:03:00\n    INDEX 01 04:05:24\n'
+        '  TRACK 03 AUDIO\n    INDEX 01 08:00:00\n').encode('gbk'))
+    tracks = list(read_cue(str(tmp_path / "album.cue")))
+    assert [t.title for t in tracks] == ["第一首", "Second", None]
+    assert [t.artist for t in tracks] == ["Album Artist", "Guest", "Album Artist"]
+    assert tracks[1].start == 245.32 and tracks[1].end == 480 and round(tracks[1].duration, 2) == 234.68
+    assert tracks[2].end is None
+
+    path, start, end = split_virtual(tracks[1].location)
+    assert path == os.path.join(str(tmp_path), "album.flac") and (start, end) == (245.32, 480.0)
+    assert split_virtual("/m/plain.mp3") == ("/m/plain.mp3", 0.0, None)
+    assert display_name(tracks[1].location) == "album.flac @ 04:05"
+    assert display_name(tracks[0].location) == "album.flac @ 00:00"
+
+
+def test_m3u_round_trip_keeps_virtual_tracks(tmp_path):
+    entries = [PlaylistEntry(str(tmp_path / "album.flac"), "A", "X", 245.3, 0.0, 245.32),
+               PlaylistEntry(str(tmp_path / "album.flac"), "B", None, None, 245.32, None),
+               str(tmp_path / "music" / "c.mp3")]
+    target = str(tmp_path / "out.m3u8")
+    assert write_m3u(target, entries) == 3
+    assert "music/c.mp3" in open(target, encoding='utf-8').read()
+    back = list(read_m3u(target))
+    assert [e.location for e in back] == [entries[0].location, entries[1].location, entries[2]]
+    assert (back[0].artist, back[0].title, back[1].title) == ("X", "A", "B")
+    assert write_pls(str(tmp_path / "out.pls"), back) == 3
+    assert [e.path for e in read_pls(str(tmp_path / "out.pls"))] == [e.path for e in back]
+
+
+def test_large_playlist_streams_in_bounded_memory(tmp_path):
+    target = str(tmp_path / "big.m3u")
+    count = 100000
+    write_m3u(target, (PlaylistEntry(f"/music/{i}.mp3", f"Track {i}", duration=200) for i in range(count)),
+              relative=False)
+    tracemalloc.start()
+    try:
+        seen = sum(1 for _ in read_playlist(target))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert seen == count
+    assert peak < 1 << 20  # The file is ~4 MB; nothing close to it is held
+
+
+def test_audio_files_keeps_cue_tracks(tmp_path):
+    album = tmp_path / "album.flac"
+    single = tmp_path / "music" / "single.mp3"
+    single.parent.mkdir()
+    album.write_bytes(b"")
+    single.write_bytes(b"")
+    playlist = tmp_path / "playlist.json"
+    playlist.write_text(json.dumps({'playlist': [
+        f"{album}#t=0.000,245.320", f"{album}#t=245.320,480.000", str(single), str(tmp_path / "gone.mp3")]}),
+        encoding='utf-8')
+    assert audio_files([str(playlist), str(single.parent), str(album)]) == [str(album), str(single)]
@@ -0,0 +1,78 @@
+import random
+import playqueue
+from playqueue import IdSequence, PlayQueue, REPEAT_OFF, REPEAT_ONE
+
+
+def test_sequence_matches_a_list_under_random_edits(monkeypatch):
+    monkeypatch.setattr(playqueue, "BLOCK", 4)  # Small blocks so splits and empty blocks happen
+    rng = random.Random(3)
+    seq, model = IdSequence(range(10)), list(range(10))
+    next_id = 10
+    for _ in range(3000):
+        op = rng.random()
+        if op < 0.4 or not model:
+            position = rng.randint(0, len(model))
+            seq.insert(position, next_id)
+            model.insert(position, next_id)
+            next_id += 1
+        elif op < 0.8:
+            tid = rng.choice(model)
+            assert seq.remove(tid)
+            model.remove(tid)
+        else:
+            fresh = list(range(next_id, next_id + rng.randint(0, 9)))
+            next_id += len(fresh)
+            seq.extend(fresh)
+            model.extend(fresh)
+        if model:
+            tid = rng.choice(model)
+            i = model.index(tid)
+            assert seq.index(tid) == i and seq[i] == tid and seq[-1] == model[-1]
+            assert seq.after(tid) == (model[i + 1] if i + 1 < len(model) else None)
+            assert seq.before(tid) == (model[i - 1] if i else None)
+    assert list(seq) == model and len(seq) == len(model)
+    assert not seq.append(model[0]) and not seq.remove(-1)
+
+
+def test_repeat_modes_and_up_next():
+    queue = PlayQueue([10, 11, 12, 13])
+    assert [queue.advance() for _ in range(5)] == [10, 11, 12, 13, 10]  # Repeat all wraps
+    assert queue.peek_previous() == 13
+
+    queue.play_next(12)
+    queue.play_next(11)
+    assert queue.upcoming(4) == [12, 11, 13]
+    assert [queue.advance(), queue.advance(), queue.advance()] == [12, 11, 12]  # Back in order after 11
+    assert queue.position() == 2
+
+    queue.repeat = REPEAT_ONE
+    assert queue.advance() == 12 and queue.advance(manual=True) == 13
+    queue.repeat = REPEAT_OFF
+    assert queue.advance() is None and queue.current == 13
+
+    queue.remove(13)
+    assert queue.current is None and queue.position() == -1 and queue.peek_next() == 10
+    queue.play_next(11)
+    queue.remove(11)
+    assert list(queue.up_next) == [] and list(queue) == [10, 12]
+
+
+def test_shuffle_is_kept_across_edits():
+    queue = PlayQueue(range(100), seed=1)
+    queue.set_current(5)
+    queue.set_shuffle(True)
+    order = list(queue.shuffled)
+    assert order[0] == 5 and sorted(order) == list(range(100)) and order != list(range(100))
+
+    played = [queue.advance() for _ in range(10)]
+    assert played == order[1:11]
+    queue.remove(order[20])
+    queue.append(100)
+    queue.extend([101, 102])
+    # Existing tracks keep their relative order; new ones land after the current track
+    assert [t for t in queue.shuffled if t < 100] == [t for t in order if t != order[20]]
+    assert all(queue.shuffled.index(t) > queue.shuffled.index(queue.current) for t in (100, 101, 102))
+
+    rest = [queue.advance() for _ in range(len(queue) - 11)]
+    assert sorted(played + rest + [5]) == sorted(list(queue))  # One full pass plays everything once
+    assert list(queue)[:3] == [0, 1, 2]  # Display order is untouched
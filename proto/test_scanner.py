@@ -0,0 +1,47 @@
+import os
+from scanner import LibraryScanner
+
+
+def touch(path, data=b""):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def bump_mtime(path, delta=10):
+    st = os.stat(path)
+    os.utime(path, (st.st_atime, st.st_mtime + delta))
+
+
+def test_rescan_reports_deltas(tmp_path):
+    root = str(tmp_path / "music")
+    touch(os.path.join(root, "a", "1.mp3"))
+    touch(os.path.join(root, "a", "cover.jpg"))
+    touch(os.path.join(root, "b", "2.flac"))
+    scanner = LibraryScanner(str(tmp_path / "snap.json"))
+    assert sorted(scanner.add_root(root)) == sorted([os.path.join(root, "a", "1.mp3"), os.path.join(root, "b", "2.flac")])
+    assert not scanner.rescan()
+
+    touch(os.path.join(root, "a", "3.ogg"))
+    os.remove(os.path.join(root, "b", "2.flac"))
+    touch(os.path.join(root, "c", "d", "4.m4a"))
+    for d in ("a", "b", ""):
+        bump_mtime(os.path.join(root, d))
+    delta = LibraryScanner(str(tmp_path / "snap.json")).rescan()
+    assert sorted(delta.added) == [os.path.join(root, "a", "3.ogg"), os.path.join(root, "c", "d", "4.m4a")]
+    assert delta.removed == [os.path.join(root, "b", "2.flac")]
+    assert delta.modified == []
+
+
+def test_deep_rescan_finds_in_place_edits(tmp_path):
+    root = str(tmp_path / "music")
+    path = os.path.join(root, "1.mp3")
+    touch(path)
+    scanner = LibraryScanner(str(tmp_path / "snap.json"))
+    scanner.add_root(root)
+    dir_stat = os.stat(root)
+    with open(path, "ab") as f:
+        f.write(b"tag")
+    os.utime(root, (dir_stat.st_atime, dir_stat.st_mtime))
+    assert not scanner.rescan()
+    assert scanner.rescan(deep=True).modified == [path]
@@ -0,0 +1,78 @@
+import json
+import http.client
+import pytest
+from synthlib import generate
+from metadata import MetadataManager
+from server import StreamServer, parse_range
+
+
+@pytest.fixture(scope="module")
+def served(tmp_path_factory):
+    root = tmp_path_factory.mktemp("served")
+    tracks = generate(str(root / "library"), 1, formats=("mp3", "dsf"))
+    server = StreamServer([t['path'] for t in tracks], MetadataManager(cache_dir=str(root / "cache")))
+    port = server.start_in_thread()
+    yield server, port, tracks
+    server.stop()
+
+
+def get(port, path, headers=None, method="GET"):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.request(method, path, headers=headers or {})
+    response = conn.getresponse()
+    body = response.read()
+    conn.close()
+    return response, body
+
+
+def test_parse_range():
+    assert parse_range(None, 100) is None
+    assert parse_range("bytes=10-19", 100) == (10, 19)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-5", 100) == (95, 99)
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    for bad in ("bytes=100-", "bytes=9-3", "bytes=x-"):
+        with pytest.raises(ValueError):
+            parse_range(bad, 100)
+
+
+def test_listing_and_metadata(served):
+    server, port, tracks = served
+    response, body = get(port, "/tracks")
+    listing = json.loads(body)['tracks']
+    assert [t['native'] for t in listing] == [True, False]
+
+    # The DSF track carries embedded art and lyrics (see synthlib)
+    response, body = get(port, listing[1]['meta'])
+    meta = json.loads(body)
+    assert meta['title'] == tracks[1]['title'] and meta['lyrics']
+    response, cover = get(port, meta['cover'])
+    assert response.status == 200 and response.getheader("Content-Type") == "image/jpeg"
+    assert cover[:2] == b"\xff\xd8"
+
+
+def test_native_stream_honours_ranges(served):
+    server, port, tracks = served
+    with open(tracks[0]['path'], "rb") as f:
+        data = f.read()
+    response, body = get(port, "/tracks/0/stream")
+    assert response.status == 200 and body == data
+    response, body = get(port, "/tracks/0/stream", {"Range": "bytes=100-1099"})
+    assert response.status == 206 and body == data[100:1100]
+    assert response.getheader("Content-Range") == f"bytes 100-1099/{len(data)}"
+    response, body = get(port, "/tracks/0/stream", {"Range": f"bytes={len(data)}-"})
+    assert response.status == 416
+
+
+def test_unsupported_format_is_transcoded(served):
+    server, port, tracks = served
+    response, body = get(port, "/tracks/1/stream")
+    assert response.status == 200 and response.getheader("Content-Type") == "audio/ogg"
+    assert body[:4] == b"OggS"
+
+
+def test_unknown_tracks_are_404(served):
+    server, port, tracks = served
+    assert get(port, "/tracks/99/stream")[0].status == 404
+    assert get(port, "/nothing")[0].status == 404
@@ -0,0 +1,66 @@
+import pytest
+from library import Library
+from smartlist import RuleError, SmartPlaylists, compile_rule, parse_duration
+
+
+def test_parse_duration():
+    assert parse_duration("300") == 300
+    assert parse_duration("5 min") == 300
+    assert parse_duration("1.5m") == 90
+    assert parse_duration("3:30") == 210
+    with pytest.raises(RuleError):
+        parse_duration("soon")
+
+
+def test_rules_match_track_fields():
+    library = Library()
+    tid = library.add("/music/周杰伦/叶惠美\\以父之名.dsf")
+    library.update(tid, {'title': '以父之名', 'artist': '周杰伦', 'album': 'Test Album', 'lyrics': '[00:01.00]x'},
+                   duration=342)
+    track = library.get(tid)
+    for rule, expected in [
+        ("artist = 周杰伦 and duration > 5 min", True),
+        ("artist = 周杰伦 and duration > 6 min", False),
+        ("has synced lyrics", True),
+        ("album contains test album", True),
+        ('album contains "Other" or (format = dsf and not has album)', False),
+        ("not (format = mp3) and folder contains 叶惠美", True),
+    ]:
+        assert compile_rule(rule)(track, library) is expected, rule
+
+    cue = library.get(library.add("/m/album.flac#t=245.320,480.000"))
+    for rule, expected in [("format = flac", True), ("path = /m/album.flac", True), ("path contains 245", False)]:
+        assert compile_rule(rule)(cue, library) is expected, rule
+
+
+def test_bad_rules_raise():
+    for rule in ("", "artist", "tempo > 3", "title > a", "(artist = a", "has nothing", "duration contains 3"):
+        with pytest.raises(RuleError):
+            compile_rule(rule)
+
+
+def test_membership_follows_library_changes():
+    library = Library()
+    smart = SmartPlaylists(library)
+    a = library.add("/m/a.mp3")
+    long_tracks = smart.add("long", "duration >= 5 min")
+    synced = smart.add("synced", "has synced lyrics")
+    assert len(long_tracks) == 0
+
+    b = library.add("/m/b.mp3")
+    library.update(a, duration=400)
+    library.update(b, {'lyrics': '[00:01.00]line'}, duration=60)
+    assert long_tracks.ids() == [a] and synced.ids() == [b]
+
+    library.update(b, {'lyrics': 'plain text'})
+    library.reset(a)
+    assert long_tracks.ids() == [] and synced.ids() == []
+
+    library.update(a, duration=600)
+    library.remove(a)
+    assert long_tracks.ids() == []
+    library.update(b, duration=900)
+    library.clear()
+    assert long_tracks.ids() == []
+    assert smart.definitions() == [{'name': 'long', 'rule': 'duration >= 5 min'},
+                                   {'name': 'synced', 'rule': 'has synced lyrics'}]
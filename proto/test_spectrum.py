@@ -0,0 +1,34 @@
+import numpy as np
+from spectrum import FFT_SIZE, SpectrumTap, bar_edges, compute_bars
+
+RATE = 44100
+
+
+def test_bar_edges_give_every_bar_a_bin():
+    edges, stop = bar_edges(RATE)
+    assert np.all(np.diff(edges) > 0)
+    assert edges[-1] < stop <= FFT_SIZE // 2 + 1
+
+
+def test_tone_lights_its_bar_only():
+    edges, stop = bar_edges(RATE)
+    t = np.arange(FFT_SIZE) / RATE
+    heights = compute_bars(np.sin(2 * np.pi * 1000 * t), np.hanning(FFT_SIZE), edges, stop)
+    peak = int(np.argmax(heights))
+    bin_1k = round(1000 * FFT_SIZE / RATE)
+    assert edges[peak] <= bin_1k and (peak + 1 == len(edges) or bin_1k < edges[peak + 1])
+    assert heights[peak] > 0.95
+    assert np.sort(heights)[-3] < 0.2
+
+
+def test_tap_window_wraps_and_expires():
+    tap = SpectrumTap(capacity=1000)
+    frame = 0
+    for _ in range(7):
+        block = np.repeat(np.arange(frame, frame + 300, dtype=np.float32)[:, None], 2, axis=1)
+        tap.push(frame, block)
+        frame += 300
+    assert np.array_equal(tap.window(2000, 500), np.arange(1500, 2000, dtype=np.float32))
+    assert tap.window(1100, 200) is None  # Overwritten by newer audio
+    tap.clear()
+    assert tap.window(2000, 500) is None
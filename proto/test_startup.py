@@ -0,0 +1,56 @@
+import os
+import sys
+import time
+import subprocess
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+IMPORT_BUDGET_MS = 150  # `import gui` was ~360 ms before the heavy imports were deferred
+FIRST_WINDOW_BUDGET_S = 1.0
+HEAVY = ("pygame", "numpy", "requests", "PIL", "mutagen")
+
+
+def import_times(module):
+    """{module: cumulative microseconds} from `python -X importtime -c "import <module>"`."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, cwd=HERE, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_gui_import_skips_heavy_modules():
+    times = import_times("gui")
+    assert not [name for name in times if name.split(".")[0] in HEAVY]
+
+
+def test_gui_import_budget():
+    # Best of three, so a busy machine does not fail the run
+    best = min(import_times("gui")["gui"] for _ in range(3)) / 1000
+    assert best < IMPORT_BUDGET_MS, f"import gui took {best:.0f} ms"
+
+
+def test_time_to_first_window(tmp_path, monkeypatch):
+    tk = pytest.importorskip("tkinter")
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pytest.skip("no display")
+    monkeypatch.chdir(tmp_path)  # Keep the playlist/cache files out of the tree
+    monkeypatch.setenv("SDL_AUDIODRIVER", "dummy")
+    from gui import MusicPlayerGUI
+    try:
+        start = time.perf_counter()
+        app = MusicPlayerGUI(root)
+        root.update()
+        elapsed = time.perf_counter() - start
+        assert root.winfo_ismapped()
+        assert elapsed < FIRST_WINDOW_BUDGET_S, f"first window after {elapsed:.2f} s"
+        assert app._ready.wait(30)
+        root.update()
+    finally:
+        root.destroy()
@@ -0,0 +1,15 @@
+from metadata import MetadataManager
+from synthlib import generate
+
+
+def test_generated_tags_round_trip(tmp_path):
+    tracks = generate(str(tmp_path / "library"), tracks_per_format=3, formats=("mp3", "flac", "m4a", "dsf"))
+    manager = MetadataManager(cache_dir=str(tmp_path / "cache"))
+    legacy = [t for t in tracks if t['legacy']]
+    assert legacy  # At least one GBK-as-Latin-1 title to repair
+    for track in tracks:
+        meta = manager._extract_tags(track['path'])
+        expected = track['title'].encode("latin-1").decode("gbk") if track['legacy'] else track['title']
+        assert meta['title'] == expected
+        assert bool(meta['cover_data']) == track['cover']
+        assert bool(meta['lyrics']) == track['lyrics']
@@ -0,0 +1,59 @@
+import json
+import threading
+import tracing
+
+
+def setup_function():
+    tracing.clear()
+
+
+def teardown_function():
+    tracing.enable(False)
+    tracing.clear()
+
+
+def test_disabled_spans_record_nothing():
+    tracing.enable(False)
+    with tracing.span("load_file", track=1):
+        pass
+    with tracing.track_change(1):
+        pass
+    assert tracing.chrome_trace()['traceEvents'] == []
+    assert tracing.latency_summary() is None
+
+
+def test_spans_export_as_chrome_trace(tmp_path):
+    tracing.enable()
+
+    @tracing.traced("extract_tags", arg="file_path")
+    def extract(file_path):
+        return 42
+
+    with tracing.track_change(7):
+        with tracing.span("load_file", track=7):
+            assert extract("/music/a.mp3") == 42
+    worker = threading.Thread(target=lambda: tracing.span("fetch_cover").__enter__().__exit__(None, None, None), name="net")
+    worker.start()
+    worker.join()
+
+    path = tmp_path / "trace.json"
+    tracing.export_chrome_trace(str(path))
+    events = json.loads(path.read_text(encoding="utf-8"))['traceEvents']
+    spans = {e['name']: e for e in events if e['ph'] == 'X'}
+    assert spans['extract_tags']['args'] == {'file_path': 'a.mp3'}
+    assert spans['track_change']['args'] == {'track': 7}
+    # Nested spans sit inside their parent on the same thread
+    outer, inner = spans['track_change'], spans['load_file']
+    assert outer['ts'] <= inner['ts'] and inner['ts'] + inner['dur'] <= outer['ts'] + outer['dur']
+    assert spans['fetch_cover']['tid'] != outer['tid']
+    names = {e['args']['name'] for e in events if e['ph'] == 'M'}
+    assert "net" in names
+
+
+def test_latency_summary_percentiles():
+    tracing.enable()
+    for ms in range(1, 101):
+        tracing._latencies.append(ms / 1000)
+    summary = tracing.latency_summary()
+    assert summary['count'] == 100
+    assert round(summary['p50']) == 51 and round(summary['p99']) == 100 and round(summary['max']) == 100
@@ -0,0 +1,62 @@
+import os
+import wave
+import numpy as np
+from waveform import DECODE_RATE, WaveformCache, compute_peaks, reduce_peaks
+
+
+def write_wav(path, samples, rate=DECODE_RATE):
+    with wave.open(str(path), 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(samples.astype('<i2').tobytes())
+
+
+def test_reduce_peaks_keeps_each_buckets_extremes():
+    # Half a second at full scale, then half a second at a quarter of it
+    t = np.arange(DECODE_RATE) / DECODE_RATE
+    samples = (np.sin(2 * np.pi * 100 * t) * 32767).astype(np.int16)
+    samples[DECODE_RATE // 2:] //= 4
+    mins, maxs = reduce_peaks(samples, 10)
+    assert mins.dtype == maxs.dtype == np.int8 and mins.size == maxs.size == 10
+    assert (maxs[:5] >= 126).all() and (mins[:5] <= -127).all()
+    assert (abs(maxs[5:] - 32) <= 1).all() and (abs(mins[5:] + 32) <= 1).all()
+    # Fewer samples than buckets: one bucket per sample
+    mins, maxs = reduce_peaks(np.array([256, -512, 1024], dtype=np.int16))
+    assert list(mins) == list(maxs) == [1, -2, 4]
+
+
+def test_compute_peaks_decodes_via_ffmpeg(tmp_path):
+    t = np.arange(DECODE_RATE * 2) / DECODE_RATE
+    path = tmp_path / "tone.wav"
+    write_wav(path, np.sin(2 * np.pi * 200 * t) * 16384)
+    mins, maxs = compute_peaks(str(path), 50)
+    assert mins.size == 50
+    assert (abs(maxs - 64) <= 2).all() and (abs(mins + 64) <= 2).all()
+
+    empty = tmp_path / "empty.wav"
+    write_wav(empty, np.zeros(0))
+    assert compute_peaks(str(empty)) is None
+
+
+def test_cache_round_trip_and_invalidation(tmp_path):
+    path = tmp_path / "tone.wav"
+    write_wav(path, np.arange(-16000, 16000, 4))
+    cache = WaveformCache(str(tmp_path / "waveforms"))
+    assert cache.load(str(path)) is None
+
+    peaks = cache.get(str(path))
+    loaded = cache.load(str(path))
+    assert loaded is not None
+    assert (loaded[0] == peaks[0]).all() and (loaded[1] == peaks[1]).all()
+
+    # A new mtime or size is a different entry
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 5_000_000_000))
+    assert cache.load(str(path)) is None
+    cache.save(str(path), peaks)
+    assert cache.load(str(path)) is not None
+    with open(path, 'ab') as f:
+        f.write(b"\0\0")
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 5_000_000_000))
+    assert cache.load(str(path)) is None
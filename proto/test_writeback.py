@@ -0,0 +1,72 @@
+import os
+import pytest
+import writeback
+from metadata import MetadataManager
+from synthlib import generate, make_cover, make_lrc
+from writeback import PART_SUFFIX, write_back_tracks
+
+
+def warm_cache(tmp_path, tracks):
+    """A cache with fetched lyrics and a cover for every track, as get_metadata() leaves it."""
+    manager = MetadataManager(cache_dir=str(tmp_path / "cache"))
+    os.makedirs(manager.lyric_cache_dir)
+    os.makedirs(manager.img_cache_dir)
+    cover = make_cover(9)
+    for track in tracks:
+        meta = manager._extract_tags(track['path'])
+        cache_id = manager._get_cache_id(meta['artist'], meta['title'])
+        with open(os.path.join(manager.lyric_cache_dir, f"{cache_id}.txt"), 'w', encoding='utf-8') as f:
+            f.write(make_lrc("fetched", 10))
+        with open(os.path.join(manager.img_cache_dir, f"{cache_id}_online.jpg"), 'wb') as f:
+            f.write(cover)
+    return manager
+
+
+def test_fills_missing_lyrics_and_covers(tmp_path):
+    tracks = generate(str(tmp_path / "library"), 2, formats=("mp3", "flac", "m4a", "dsf", "ogg"))
+    manager = warm_cache(tmp_path, tracks)
+    paths = [t['path'] for t in tracks]
+    before = {p: manager._extract_tags(p) for p in paths}
+
+    dry = write_back_tracks(paths, dry_run=True, workers=2, manager=manager)
+    assert (dry['written'], dry['current'], dry['unsupported']) == (4, 4, 2)
+    assert all(manager._extract_tags(p)['lyrics'] == before[p]['lyrics'] for p in paths)
+
+    report = write_back_tracks(paths, workers=2, manager=manager)
+    assert (report['written'], report['lyrics'], report['covers'], report['failed']) == (4, 4, 4, 0)
+    for track in tracks:
+        meta = manager._extract_tags(track['path'])
+        if track['format'] == 'ogg':
+            continue
+        assert meta['lyrics'] and meta['cover_data']
+        if track['lyrics']:
+            assert meta['lyrics'] == before[track['path']]['lyrics']  # Embedded lyrics are kept
+        assert meta['title'] == before[track['path']]['title']
+    assert not [n for _, _, files in os.walk(tmp_path) for n in files if n.endswith(PART_SUFFIX)]
+    assert write_back_tracks(paths, manager=manager)['written'] == 0
+
+
+def test_failed_write_leaves_original_untouched(tmp_path, monkeypatch):
+    tracks = generate(str(tmp_path / "library"), 1, formats=("flac",))
+    manager = warm_cache(tmp_path, tracks)
+    path = tracks[0]['path']
+    with open(path, 'rb') as f:
+        original = f.read()
+
+    def crash(part, *args):
+        with open(part, 'r+b') as f:
+            f.truncate(100)  # Half-written copy
+        raise OSError("disk full")
+
+    monkeypatch.setattr(writeback, "embed", crash)
+    report = write_back_tracks([path], manager=manager)
+    assert report['failed'] == 1
+    with open(path, 'rb') as f:
+        assert f.read() == original
+    assert not os.path.exists(path + PART_SUFFIX)
+
+
+def test_embed_rejects_unsupported_formats(tmp_path):
+    tracks = generate(str(tmp_path / "library"), 1, formats=("ogg",))
+    with pytest.raises(writeback.UnsupportedFormat):
+        writeback.embed(tracks[0]['path'], "lyrics")
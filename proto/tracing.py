@@ -0,0 +1,163 @@
+"""
+Lightweight timing spans for the playback hot paths.
+
+    with tracing.span("load_file", track=track_id):
+        ...
+
+    @tracing.traced("extract_tags", arg="file_path")
+    def _extract_tags(self, file_path): ...
+
+Tracing is off unless MUSICPLAYER_TRACE is set (to the Chrome trace file
+to write at exit) or enable() is called; while off, span() hands back one
+shared no-op object, so instrumented code pays a function call and nothing
+else. Recorded spans can be exported with export_chrome_trace() and opened
+in chrome://tracing or https://ui.perfetto.dev.
+"""
+import os
+import json
+import time
+import threading
+import functools
+from collections import deque
+
+MAX_EVENTS = 100000  # Oldest spans are dropped beyond this
+LATENCY_WINDOW = 200  # Track changes kept for the rolling latency summary
+
+_enabled = False
+_events = deque(maxlen=MAX_EVENTS)  # (name, start ns, duration ns, thread id, args)
+_thread_names = {}
+_latencies = deque(maxlen=LATENCY_WINDOW)  # Seconds per track change
+_origin = time.perf_counter_ns()
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('name', 'args', 'start', 'latency')
+
+    def __init__(self, name, args, latency=False):
+        self.name = name
+        self.args = args
+        self.latency = latency
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter_ns() - self.start
+        thread = threading.current_thread()
+        _thread_names.setdefault(thread.ident, thread.name)
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        _events.append((self.name, self.start, duration, thread.ident, self.args))
+        if self.latency:
+            _latencies.append(duration / 1e9)
+        return False
+
+    def set(self, **args):
+        """Attach more arguments once they are known inside the span."""
+        self.args.update(args)
+
+
+def enable(on=True):
+    global _enabled
+    _enabled = on
+
+
+def enabled():
+    return _enabled
+
+
+def span(name, **args):
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def traced(name, arg=None):
+    """
+    Decorator form of span(). `arg` names a parameter whose value (basename
+    for paths) is recorded with the span, e.g. traced("load_file", arg="file_path").
+    """
+    def decorate(fn):
+        # co_varnames rather than inspect.signature: inspect is slow to import at startup
+        position = fn.__code__.co_varnames[:fn.__code__.co_argcount].index(arg) if arg else None
+
+        @functools.wraps(fn)
+        def wrapper(*a, **kw):
+            if not _enabled:
+                return fn(*a, **kw)
+            value = kw.get(arg) if arg in kw else (a[position] if position is not None and position < len(a) else None)
+            args = {arg: os.path.basename(value) if isinstance(value, str) else value} if arg else {}
+            with _Span(name, args):
+                return fn(*a, **kw)
+        return wrapper
+    return decorate
+
+
+def track_change(track_id, **args):
+    """Span covering one track change; its duration feeds latency_summary()."""
+    if not _enabled:
+        return _NULL_SPAN
+    args['track'] = track_id
+    return _Span("track_change", args, latency=True)
+
+
+def clear():
+    _events.clear()
+    _latencies.clear()
+
+
+def latency_summary():
+    """Percentiles (ms) of the last LATENCY_WINDOW track changes, or None before the first one."""
+    if not _latencies:
+        return None
+    ordered = sorted(_latencies)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000
+
+    return {'count': len(ordered), 'p50': pct(50), 'p90': pct(90), 'p99': pct(99), 'max': ordered[-1] * 1000}
+
+
+def chrome_trace():
+    """Recorded spans as a Chrome trace event dict ("X" complete events, microseconds)."""
+    pid = os.getpid()
+    events = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+              for tid, name in list(_thread_names.items())]
+    for name, start, duration, tid, args in list(_events):
+        events.append({'name': name, 'ph': 'X', 'pid': pid, 'tid': tid,
+                       'ts': (start - _origin) / 1000, 'dur': duration / 1000,
+                       'args': {k: v if isinstance(v, (int, float, str, bool)) or v is None else str(v)
+                                for k, v in args.items()}})
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+def export_chrome_trace(path):
+    try:
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(chrome_trace(), f, ensure_ascii=False)
+    except Exception as e:
+        print(f"Failed to write trace: {e}")
+
+
+if os.environ.get("MUSICPLAYER_TRACE"):
+    enable()
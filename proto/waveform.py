@@ -0,0 +1,117 @@
+import os
+import struct
+import hashlib
+import threading
+import subprocess
+import numpy as np
+import imageio_ffmpeg
+
+PEAK_BUCKETS = 1000  # Min/max pairs stored per track, independent of track length
+DECODE_RATE = 8000  # Peaks don't need full bandwidth; decoding at a low rate is much faster
+
+_MAGIC = b"WVPK"
+_HEADER = struct.Struct("<4sHI")  # magic, version, bucket count
+
+
+def compute_peaks(file_path, buckets=PEAK_BUCKETS):
+    """
+    Decode file_path to mono PCM with ffmpeg and reduce it to per-bucket
+    (mins, maxs) int8 arrays. Returns None if nothing could be decoded.
+    """
+    process = subprocess.run([
+        imageio_ffmpeg.get_ffmpeg_exe(),
+        '-nostats', '-loglevel', 'error',
+        '-i', file_path,
+        '-vn', '-ac', '1', '-ar', str(DECODE_RATE),
+        '-f', 's16le', 'pipe:1'
+    ], stdin=subprocess.DEVNULL, capture_output=True)
+    samples = np.frombuffer(process.stdout, dtype='<i2')
+    if samples.size == 0:
+        return None
+    return reduce_peaks(samples, buckets)
+
+
+def reduce_peaks(samples, buckets=PEAK_BUCKETS):
+    buckets = min(buckets, samples.size)
+    starts = (np.arange(buckets, dtype=np.int64) * samples.size) // buckets
+    mins = np.minimum.reduceat(samples, starts) >> 8
+    maxs = np.maximum.reduceat(samples, starts) >> 8
+    return mins.astype(np.int8), maxs.astype(np.int8)
+
+
+class WaveformCache:
+    """
+    Binary peak cache stored next to the metadata cache (cache/waveforms).
+    Entries are keyed by path, size and mtime so edited files are redone.
+    Generation runs on one background thread; only the latest request is kept.
+    """
+
+    def __init__(self, cache_dir=os.path.join("cache", "waveforms")):
+        self.cache_dir = cache_dir
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        self._pending = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread.start()
+
+    def _cache_path(self, file_path):
+        st = os.stat(file_path)
+        key = f"{file_path}|{st.st_size}|{st.st_mtime}".encode('utf-8')
+        return os.path.join(self.cache_dir, hashlib.md5(key).hexdigest() + ".peaks")
+
+    def load(self, file_path):
+        try:
+            with open(self._cache_path(file_path), 'rb') as f:
+                magic, version, count = _HEADER.unpack(f.read(_HEADER.size))
+                if magic != _MAGIC or version != 1:
+                    return None
+                data = np.frombuffer(f.read(2 * count), dtype=np.int8)
+            if data.size != 2 * count:
+                return None
+            return data[:count], data[count:]
+        except (OSError, struct.error):
+            return None
+
+    def save(self, file_path, peaks):
+        mins, maxs = peaks
+        path = self._cache_path(file_path)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, 1, mins.size))
+            f.write(mins.tobytes())
+            f.write(maxs.tobytes())
+        os.replace(tmp_path, path)
+
+    def get(self, file_path):
+        """Cached peaks or freshly computed ones (blocking)."""
+        peaks = self.load(file_path)
+        if peaks is None:
+            peaks = compute_peaks(file_path)
+            if peaks is not None:
+                self.save(file_path, peaks)
+        return peaks
+
+    def request(self, file_path, callback):
+        """Compute peaks in the background and call callback(file_path, peaks) on the worker thread."""
+        with self._lock:
+            self._pending = (file_path, callback)
+        self._wake.set()
+
+    def _worker(self):
+        while True:
+            self._wake.wait()
+            with self._lock:
+                job = self._pending
+                self._pending = None
+                self._wake.clear()
+            if job is None:
+                continue
+            file_path, callback = job
+            try:
+                peaks = self.get(file_path)
+            except Exception as e:
+                print(f"Error generating waveform: {e}")
+                peaks = None
+            callback(file_path, peaks)
@@ -0,0 +1,245 @@
+"""
+Embed lyrics and covers that were fetched online (and so only live in
+cache/) into the audio files' own tags, so other players and machines
+find them without another lookup:
+
+    python writeback.py playlist.json --dry-run
+    python writeback.py /music --workers 4
+
+Tags are written where MetadataManager._extract_tags reads them: USLT and
+APIC frames for MP3 and DSF, the `lyrics` comment and a front-cover
+picture for FLAC, ©lyr and covr for MP4. Only fields a file lacks are
+filled in; existing embedded lyrics and art are never replaced.
+
+Each file is rewritten as a copy next to it (name + PART_SUFFIX), checked
+by reading the tags back, and renamed over the original only if the
+original did not change meanwhile. A crash leaves either the old file or
+the new one, plus at most a stray .writeback copy that the next run
+replaces.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from mutagen import File
+from mutagen.id3 import APIC, USLT
+from mutagen.mp3 import MP3
+from mutagen.flac import FLAC, Picture
+from mutagen.mp4 import MP4, MP4Cover
+from mutagen.dsf import DSF
+from metadata import MetadataManager
+from export import cover_mime
+
+PART_SUFFIX = ".writeback"  # Not an audio extension, so the scanner never picks a leftover up
+IN_FLIGHT_PER_WORKER = 2  # Queued files per worker; bounds memory for huge libraries
+SUPPORTED = (MP3, DSF, FLAC, MP4)  # The formats _extract_tags reads lyrics and covers from
+
+
+class UnsupportedFormat(Exception):
+    pass
+
+
+def cached_assets(manager, path, meta):
+    """(lyrics text, cover bytes) cached for a file's _extract_tags() dict, each None if not cached."""
+    # Same id get_metadata() caches under, including its fallbacks for untagged files
+    title = meta['title'] or os.path.splitext(os.path.basename(path))[0]
+    artist = meta['artist'] or "Unknown Artist"
+    cache_id = manager._get_cache_id(artist, title)
+    lyrics = cover = None
+    lyric_path = os.path.join(manager.lyric_cache_dir, f"{cache_id}.txt")
+    if os.path.exists(lyric_path):
+        with open(lyric_path, 'r', encoding='utf-8') as f:
+            lyrics = f.read().strip() or None
+    cover_path = os.path.join(manager.img_cache_dir, f"{cache_id}_online.jpg")
+    if os.path.exists(cover_path):
+        with open(cover_path, 'rb') as f:
+            cover = f.read() or None
+    return lyrics, cover
+
+
+def open_supported(path):
+    """The mutagen file for path; raises UnsupportedFormat for formats _extract_tags doesn't read."""
+    audio = File(path)
+    if not isinstance(audio, SUPPORTED):
+        raise UnsupportedFormat(type(audio).__name__ if audio is not None else "unknown format")
+    return audio
+
+
+def plan(path, manager):
+    """(lyrics, cover, mutagen class) for path: cached values for the fields its tags lack."""
+    audio = open_supported(path)
+    meta = manager._extract_tags(path, audio)
+    lyrics, cover = cached_assets(manager, path, meta)
+    return (lyrics if not meta['lyrics'] else None), (cover if not meta['cover_data'] else None), type(audio)
+
+
+def embed(path, lyrics=None, cover=None, kind=None):
+    """Write lyrics/cover into path's tags in place. kind: mutagen class, when path's name doesn't tell."""
+    audio = kind(path) if kind else File(path)
+    if isinstance(audio, (MP3, DSF)):
+        if audio.tags is None:
+            audio.add_tags()
+        if lyrics:
+            audio.tags.setall("USLT", [USLT(encoding=3, lang="chi", desc="", text=lyrics)])
+        if cover:
+            audio.tags.setall("APIC", [APIC(encoding=3, mime=cover_mime(cover), type=3, desc="Cover", data=cover)])
+    elif isinstance(audio, FLAC):
+        if lyrics:
+            audio["lyrics"] = lyrics
+        if cover:
+            picture = Picture()
+            picture.type, picture.mime, picture.data = 3, cover_mime(cover), cover
+            audio.add_picture(picture)
+    elif isinstance(audio, MP4):
+        if audio.tags is None:
+            audio.add_tags()
+        if lyrics:
+            audio["\xa9lyr"] = [lyrics]
+        if cover:
+            imageformat = MP4Cover.FORMAT_PNG if cover_mime(cover) == "image/png" else MP4Cover.FORMAT_JPEG
+            audio["covr"] = [MP4Cover(cover, imageformat=imageformat)]
+    else:
+        raise UnsupportedFormat(type(audio).__name__ if audio is not None else "unknown format")
+    audio.save()
+
+
+def write_back(path, lyrics, cover, manager=None, kind=None):
+    """
+    Embed lyrics/cover into path through a verified copy and an atomic
+    rename. kind is the mutagen class from plan(). Returns the bytes
+    copied. Raises UnsupportedFormat, or RuntimeError when verification
+    fails or the file changed meanwhile.
+    """
+    manager = manager or MetadataManager()
+    before = os.stat(path)
+    kind = kind or type(open_supported(path))
+    part = path + PART_SUFFIX
+    try:
+        shutil.copy2(path, part)
+        embed(part, lyrics, cover, kind)
+        with open(part, 'rb+') as f:
+            os.fsync(f.fileno())
+        check = manager._extract_tags(part, kind(part))
+        if (lyrics and not check['lyrics']) or (cover and not check['cover_data']):
+            raise RuntimeError("tags missing after write")
+        now = os.stat(path)
+        if (now.st_size, now.st_mtime_ns) != (before.st_size, before.st_mtime_ns):
+            raise RuntimeError("file changed during write-back")
+        os.replace(part, path)
+    finally:
+        if os.path.exists(part):
+            os.remove(part)
+    return before.st_size
+
+
+def write_back_tracks(paths, dry_run=False, workers=None, progress=None, manager=None, stop=None):
+    """
+    Fill in missing lyrics/covers for paths from the cache, up to `workers`
+    files at a time (default: one per CPU, at most 8; each job is mostly
+    copying the file). paths may be any iterable; at most
+    IN_FLIGHT_PER_WORKER files per worker are queued ahead. With dry_run
+    nothing is written, but the report counts what would be.
+    Returns {'scanned', 'written', 'lyrics', 'covers', 'current',
+    'unsupported', 'failed', 'bytes', 'seconds', 'files_per_second'};
+    report['planned'] lists (path, has lyrics, has cover) in dry-run mode.
+    """
+    manager = manager or MetadataManager()
+    workers = workers or min(8, os.cpu_count() or 1)
+    stop = stop or threading.Event()
+    report = {'scanned': 0, 'written': 0, 'lyrics': 0, 'covers': 0, 'current': 0,
+              'unsupported': 0, 'failed': 0, 'bytes': 0}
+    if dry_run:
+        report['planned'] = []
+    lock = threading.Lock()
+    slots = threading.Semaphore(workers * IN_FLIGHT_PER_WORKER)
+
+    def job(path):
+        try:
+            if stop.is_set():
+                return
+            error = None
+            copied = 0
+            try:
+                lyrics, cover, kind = plan(path, manager)
+                if (lyrics or cover) and not dry_run:
+                    copied = write_back(path, lyrics, cover, manager, kind)
+            except UnsupportedFormat:
+                lyrics = cover = None
+                error = UnsupportedFormat
+            except Exception as e:
+                error = str(e)
+            with lock:
+                report['scanned'] += 1
+                if error is UnsupportedFormat:
+                    report['unsupported'] += 1
+                elif error:
+                    print(f"Write-back failed for {os.path.basename(path)}: {error}")
+                    report['failed'] += 1
+                elif lyrics or cover:
+                    report['written'] += 1
+                    report['lyrics'] += bool(lyrics)
+                    report['covers'] += bool(cover)
+                    report['bytes'] += copied
+                    if dry_run:
+                        report['planned'].append((path, bool(lyrics), bool(cover)))
+                else:
+                    report['current'] += 1
+                count = report['scanned']
+            if progress:
+                progress(count)
+        finally:
+            slots.release()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        try:
+            for path in paths:
+                slots.acquire()
+                if stop.is_set():
+                    slots.release()
+                    break
+                pool.submit(job, path)
+        except BaseException:
+            stop.set()  # Ctrl+C: let queued jobs drop out instead of waiting for all of them
+            raise
+    report['seconds'] = time.perf_counter() - start
+    report['files_per_second'] = report['scanned'] / report['seconds'] if report['seconds'] > 0 else 0.0
+    return report
+
+
+def format_report(report, dry_run=False):
+    verb = "would update" if dry_run else "updated"
+    return (f"{report['written']} {verb} ({report['lyrics']} lyrics, {report['covers']} covers), "
+            f"{report['current']} nothing to add, {report['unsupported']} unsupported, {report['failed']} failed; "
+            f"{report['scanned']} files in {report['seconds']:.1f} s ({report['files_per_second']:.0f} files/s, "
+            f"{report['bytes'] / 1e6 / max(report['seconds'], 1e-9):.0f} MB/s rewritten)")
+
+
+if __name__ == "__main__":
+    from playlists_io import audio_files
+    parser = argparse.ArgumentParser(description="Embed cached lyrics and covers into audio file tags")
+    parser.add_argument("sources", nargs="+", help="audio files, directories or playlist.json")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be written")
+    parser.add_argument("--workers", type=int, help="files processed at once (default: CPU count, max 8)")
+    parser.add_argument("--cache", default="cache", metavar="DIR", help="metadata cache directory")
+    args = parser.parse_args()
+
+    def show(done):
+        print(f"\r{done}", end="", flush=True)
+
+    stop = threading.Event()
+    try:
+        result = write_back_tracks(audio_files(args.sources), args.dry_run, args.workers,
+                                   show, MetadataManager(cache_dir=args.cache), stop)
+    except KeyboardInterrupt:
+        stop.set()
+        print("\nInterrupted; files already updated keep their new tags")
+        sys.exit(1)
+    print()
+    if args.dry_run:
+        for path, lyrics, cover in result['planned']:
+            print(f"  {path}: {'lyrics ' if lyrics else ''}{'cover' if cover else ''}")
+    print(format_report(result, args.dry_run))